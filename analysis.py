@@ -0,0 +1,283 @@
+# =============================================================================================
+# ANALISI OFFLINE - rilevamento volti e YOLO sui video registrati, in parallelo su tutti i core
+# =============================================================================================
+#   Ogni record_*.mp4 viene diviso in blocchi di frame; i blocchi di tutti i file vanno a un
+#   pool di processi (uno per core), ognuno con il proprio cascade e il proprio modello YOLO.
+#   Quando tutti i blocchi di un file sono finiti viene scritto <video>.analysis.json: i file
+#   che hanno già un riepilogo aggiornato vengono saltati, quindi un'analisi interrotta
+#   riprende dal primo file non completato.
+#
+#       python analysis.py [cartella] [--stride 5] [--workers 8] [--no-yolo] [--force]
+# =============================================================================================
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import datetime
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+ANALYSIS_PATTERN = "record_*.mp4"
+ANALYSIS_SUFFIX = ".analysis.json"
+ANALYSIS_STRIDE = 5               # si analizza un frame ogni N
+ANALYSIS_CHUNK_FRAMES = 900       # frame per blocco (30 s a 30 fps)
+ANALYSIS_MIN_AGE = 10.0           # secondi dall'ultima modifica: più recenti = ancora in registrazione
+
+_worker = {}                      # stato del processo di analisi: cascade e YOLO
+
+
+# =============================================================================================
+# PROCESSO DI ANALISI
+# =============================================================================================
+def _init_worker(use_yolo):
+    """Load the detectors once per process; one core per process, no nested threading."""
+    from engine import load_face_detector, load_yolo_model
+    from yolo_worker import YoloWorker
+
+    cv2.setNumThreads(1)
+    _worker["faces"] = load_face_detector()
+    _worker["yolo"] = None
+    if use_yolo:
+        try:
+            import torch
+            torch.set_num_threads(1)
+        except ImportError:
+            pass
+        try:
+            _worker["yolo"] = YoloWorker(model=load_yolo_model())
+        except Exception as e:
+            logger.warning(f"Analysis: YOLO not available, faces only: {e}")
+
+
+def analyse_chunk(path, start, end, stride):
+    """Decode frames [start, end) of a video and run detection on every stride-th one."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    faces_detector = _worker["faces"]
+    yolo = _worker["yolo"]
+    analysed = 0
+    face_frames = []              # indici dei frame analizzati con almeno un volto
+    max_faces = 0
+    objects = Counter()           # classe YOLO -> frame in cui compare
+
+    index = start
+    while index < end:
+        if index % stride:
+            # frame saltato: grab() senza conversione del colore
+            if not cap.grab():
+                break
+            index += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        analysed += 1
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        faces = faces_detector.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(40, 40))
+        if len(faces):
+            face_frames.append(index)
+            max_faces = max(max_faces, len(faces))
+        if yolo is not None:
+            result = yolo.detect(frame, index, index / fps)
+            objects.update({d['name'] for d in result.detections})
+        index += 1
+
+    cap.release()
+    return {
+        "start": start,
+        "end": index,
+        "analysed": analysed,
+        "face_frames": face_frames,
+        "max_faces": max_faces,
+        "objects": dict(objects),
+    }
+
+
+# =============================================================================================
+# RIEPILOGHI PER FILE
+# =============================================================================================
+def summary_path(path):
+    """Return the path of the analysis summary of a video."""
+    return os.path.splitext(path)[0] + ANALYSIS_SUFFIX
+
+
+def is_analysed(path, stride, use_yolo):
+    """True if the video already has a summary made with the same settings and contents."""
+    try:
+        with open(summary_path(path), "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(path)
+    return (
+        summary.get("size") == stat.st_size
+        and summary.get("mtime") == int(stat.st_mtime)
+        and summary.get("stride") == stride
+        and summary.get("yolo") == use_yolo
+    )
+
+
+def video_chunks(path, chunk_frames=ANALYSIS_CHUNK_FRAMES):
+    """Return (fps, frame_count, [(start, end), ...]) for a video."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if count <= 0:
+        # numero di frame sconosciuto: un solo blocco fino alla fine del file
+        return fps, 0, [(0, sys.maxsize)]
+    return fps, count, [(s, min(s + chunk_frames, count)) for s in range(0, count, chunk_frames)]
+
+
+def face_intervals(frames, fps, stride):
+    """Merge the analysed frames with faces into [start_s, end_s] intervals."""
+    intervals = []
+    for frame in sorted(frames):
+        t = frame / fps
+        if intervals and frame - intervals[-1][2] <= stride:
+            intervals[-1][1] = t
+            intervals[-1][2] = frame
+        else:
+            intervals.append([t, t, frame])
+    return [[round(a, 2), round(b, 2)] for a, b, _ in intervals]
+
+
+def write_summary(path, fps, frame_count, stride, use_yolo, chunks, elapsed):
+    """Combine the chunk results of one video and write its summary atomically."""
+    stat = os.stat(path)
+    face_frames = [f for c in chunks for f in c["face_frames"]]
+    objects = Counter()
+    for c in chunks:
+        objects.update(c["objects"])
+    summary = {
+        "file": os.path.basename(path),
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "fps": fps,
+        "frames": frame_count or max(c["end"] for c in chunks),
+        "stride": stride,
+        "yolo": use_yolo,
+        "frames_analysed": sum(c["analysed"] for c in chunks),
+        "frames_with_faces": len(face_frames),
+        "max_faces": max((c["max_faces"] for c in chunks), default=0),
+        "face_intervals": face_intervals(face_frames, fps, stride),
+        "objects": dict(objects.most_common()),
+        "analysis_seconds": round(elapsed, 2),
+        "analysed_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    target = summary_path(path)
+    tmp = target + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+    os.replace(tmp, target)       # un riepilogo esiste solo se completo
+    return summary
+
+
+# =============================================================================================
+# ANALISI DI UNA CARTELLA
+# =============================================================================================
+def find_videos(folder, stride, use_yolo, force=False):
+    """Return the recordings in folder that still need to be analysed."""
+    now = time.time()
+    pending = []
+    for path in sorted(glob.glob(os.path.join(folder, ANALYSIS_PATTERN))):
+        if now - os.path.getmtime(path) < ANALYSIS_MIN_AGE:
+            continue              # probabilmente ancora in scrittura
+        if not force and is_analysed(path, stride, use_yolo):
+            continue
+        pending.append(path)
+    return pending
+
+
+def analyse_folder(folder, stride=ANALYSIS_STRIDE, workers=None, use_yolo=True, force=False):
+    """Analyse every pending recording in folder with a process pool; returns the summaries."""
+    stride = max(1, int(stride))
+    workers = workers or os.cpu_count() or 1
+    videos = find_videos(folder, stride, use_yolo, force)
+    logger.info("Analisi INIZIATA | cartella=%s | video da analizzare=%d | processi=%d | stride=%d",
+                folder, len(videos), workers, stride)
+    if not videos:
+        return []
+
+    start = time.monotonic()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_yolo,)) as pool:
+        # i blocchi vengono accodati file per file, così i primi file finiscono per primi
+        futures = {}
+        jobs = {}
+        for path in videos:
+            try:
+                fps, count, chunks = video_chunks(path)
+            except OSError as e:
+                logger.warning(f"Analysis: {e}")
+                continue
+            jobs[path] = {"fps": fps, "count": count, "left": len(chunks), "results": [],
+                          "start": time.monotonic(), "failed": False}
+            for chunk_start, chunk_end in chunks:
+                futures[pool.submit(analyse_chunk, path, chunk_start, chunk_end, stride)] = path
+
+        for future in as_completed(futures):
+            path = futures[future]
+            job = jobs[path]
+            job["left"] -= 1
+            try:
+                job["results"].append(future.result())
+            except Exception as e:
+                job["failed"] = True
+                logger.warning(f"Analysis of {path} failed: {e}")
+            if job["left"] or job["failed"]:
+                continue
+
+            summary = write_summary(path, job["fps"], job["count"], stride, use_yolo,
+                                    job["results"], time.monotonic() - job["start"])
+            summaries.append(summary)
+            logger.info(
+                "Analisi COMPLETATA | file=%s | frame analizzati=%d | con volti=%d | oggetti=%s",
+                summary["file"], summary["frames_analysed"], summary["frames_with_faces"],
+                ", ".join(f"{k}={v}" for k, v in summary["objects"].items()) or "-"
+            )
+
+    elapsed = time.monotonic() - start
+    analysed = sum(s["frames_analysed"] for s in summaries)
+    logger.info("Analisi TERMINATA | video=%d | frame analizzati=%d | durata=%.1fs | frame/s=%.1f",
+                len(summaries), analysed, elapsed, analysed / elapsed if elapsed > 0 else 0.0)
+    return summaries
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO
+# =============================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rianalisi offline dei video registrati.")
+    parser.add_argument("folder", nargs="?", default=os.getcwd(), help="cartella con i record_*.mp4")
+    parser.add_argument("--stride", type=int, default=ANALYSIS_STRIDE, help="analizza un frame ogni N")
+    parser.add_argument("--workers", type=int, default=None, help="processi (default: uno per core)")
+    parser.add_argument("--no-yolo", action="store_true", help="solo rilevamento volti")
+    parser.add_argument("--force", action="store_true", help="rianalizza anche i file già completati")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+    analyse_folder(args.folder, args.stride, args.workers, not args.no_yolo, args.force)
+
+
+if __name__ == "__main__":
+    main()
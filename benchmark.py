@@ -0,0 +1,374 @@
+# =============================================================================================
+# BENCHMARK - latenza per stadio e della pipeline completa, senza webcam, risultati in JSON
+# =============================================================================================
+#   Gli stessi frame (sintetici con seme fisso, oppure un clip registrato) passano per ogni
+#   stadio di update_frame a 720p, 1080p e 4K. Per ogni stadio: percentili di latenza,
+#   frame/s e picco di memoria; tutto finisce in un file JSON confrontabile tra due run:
+#
+#       python benchmark.py [--clip video.mp4] [--frames 120] [--resolutions 720p 1080p]
+#       python benchmark.py --compare benchmark_A.json benchmark_B.json
+# =============================================================================================
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import tempfile
+import subprocess
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from capture import CapturedFrame
+from motion import MotionDetector
+from face_tracker import FaceTracker
+from overlay import Overlay, box_ops
+from recorder import RECORD_FOURCC
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+BENCH_RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+BENCH_FRAMES = 120                # frame misurati per stadio e risoluzione
+BENCH_WARMUP = 10                 # frame iniziali esclusi (cache, allocazioni, modello di sfondo)
+BENCH_MEMORY_FRAMES = 10          # frame del secondo passaggio, con tracemalloc attivo
+BENCH_SEED = 1234
+BENCH_DISPLAY_SIZE = (1280, 720)  # dimensione della label video simulata
+BENCH_ZOOM = 1.5
+BENCH_PERCENTILES = (50, 90, 99)
+
+
+# =============================================================================================
+# SORGENTI DI FRAME (deterministiche)
+# =============================================================================================
+class SyntheticFrames:
+    """Seeded textured background with moving shapes: the same frames on every run."""
+
+    def __init__(self, size, seed=BENCH_SEED):
+        w, h = size
+        rng = np.random.default_rng(seed)
+        # texture a bassa frequenza ingrandita: dà al Haar e al movimento qualcosa di realistico
+        small = rng.integers(0, 256, (max(h // 16, 1), max(w // 16, 1), 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC), (0, 0), 3)
+        self.size = size
+
+    def frame(self, i):
+        w, h = self.size
+        frame = self.background.copy()
+        r = h // 8
+        cx = r + (i * w // 60) % max(w - 2 * r, 1)
+        cv2.circle(frame, (cx, h // 2), r, (230, 230, 230), -1)
+        cv2.rectangle(frame, (w - cx - r, h // 5), (w - cx + r, h // 5 + r), (40, 40, 200), -1)
+        return frame
+
+
+class ClipFrames:
+    """Frames of a recorded clip, looped and resized to the benchmark resolution."""
+
+    def __init__(self, path, size):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            sys.exit(f"Impossibile aprire il clip {path}.")
+        self.frames = []
+        # al massimo BENCH_FRAMES frame sorgente, ridimensionati una volta sola
+        while len(self.frames) < BENCH_FRAMES:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.frames.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        cap.release()
+        if not self.frames:
+            sys.exit(f"Il clip {path} non contiene frame.")
+
+    def frame(self, i):
+        return self.frames[i % len(self.frames)].copy()
+
+
+# =============================================================================================
+# STADI
+# =============================================================================================
+def stage_flip_cvtcolor(ctx, frame):
+    frame = cv2.flip(frame, 1)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def stage_zoom(ctx, frame):
+    h, w = frame.shape[:2]
+    new_w, new_h = int(w / BENCH_ZOOM), int(h / BENCH_ZOOM)
+    x1, y1 = (w - new_w) // 2, (h - new_h) // 2
+    return cv2.resize(frame[y1:y1 + new_h, x1:x1 + new_w], (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def stage_motion(ctx, frame):
+    return ctx["motion"].update(ctx["gray"])
+
+
+def stage_haar(ctx, frame):
+    return ctx["haar"].detectMultiScale(ctx["gray"], scaleFactor=1.3, minNeighbors=5, minSize=(40, 40))
+
+
+def stage_faces_tracked(ctx, frame):
+    return ctx["tracker"].update(ctx["gray"])
+
+
+def stage_yolo(ctx, frame):
+    return ctx["yolo"].detect(frame, ctx["index"], 0.0)
+
+
+def stage_overlay(ctx, frame):
+    # stessi elementi dell'HUD; il contenuto cambia a ogni secondo simulato, come in diretta
+    overlay = ctx["overlay"]
+    h = frame.shape[0]
+    second = ctx["index"] // 30
+    overlay.update("fps", ctx["index"] // 15, lambda: [("text", f"FPS: {30 + second % 3}", (10, 30), 1, (0, 255, 255), 2)])
+    overlay.update("date", second, lambda: [("text", f"16/10/2026 12:00:{second % 60:02d}", (10, h - 10), 0.6, (200, 200, 200), 2)])
+    overlay.update("rec", second, lambda: [
+        ("circle", (20, 60), 10, (0, 0, 255), -1),
+        ("text", "REC", (40, 65), 0.7, (0, 0, 255), 2),
+        ("text", f"00:00:{second % 60:02d}", (100, 65), 0.8, (255, 255, 255), 2),
+    ])
+    overlay.update("yolo", ctx["index"] // 15, lambda: box_ops(
+        [(100, 100, 400, 500, "person 0.91"), (600, 200, 900, 400, "chair 0.67")], (0, 255, 0), 2))
+    overlay.composite(frame, ("fps", "date", "rec", "yolo"))
+    return frame
+
+
+def stage_encode(ctx, frame):
+    ctx["writer"].write(frame)
+
+
+def stage_display(ctx, frame):
+    h, w = frame.shape[:2]
+    label_w, label_h = BENCH_DISPLAY_SIZE
+    scale = min(label_w / w, label_h / h)
+    tw, th = int(w * scale), int(h * scale)
+    buffer = ctx.get("display_buffer")
+    if buffer is None or buffer.shape[:2] != (th, tw):
+        buffer = ctx["display_buffer"] = np.empty((th, tw, 3), np.uint8)
+    cv2.resize(frame, (tw, th), dst=buffer, interpolation=cv2.INTER_AREA if tw < w else cv2.INTER_LINEAR)
+    if ctx["qimage"] is not None:
+        qimage = ctx["qimage"]
+        return qimage(buffer.data, tw, th, buffer.strides[0], qimage.Format_BGR888)
+    return buffer
+
+
+def stage_pipeline(ctx, frame):
+    return ctx["engine"].process(CapturedFrame(ctx["index"], ctx["index"] / 30.0, frame))
+
+
+STAGES = {
+    "flip_cvtcolor": stage_flip_cvtcolor,
+    "zoom": stage_zoom,
+    "motion": stage_motion,
+    "haar": stage_haar,
+    "faces_tracked": stage_faces_tracked,
+    "yolo": stage_yolo,
+    "overlay": stage_overlay,
+    "encode": stage_encode,
+    "display": stage_display,
+    "pipeline": stage_pipeline,
+}
+
+
+def make_context(stage, size, workdir, use_yolo):
+    """Build the fresh state a stage needs; returns None if the stage cannot run here."""
+    from engine import Engine, load_face_detector, load_yolo_model
+    ctx = {"index": 0}
+    if stage == "motion":
+        ctx["motion"] = MotionDetector()
+    elif stage == "haar":
+        ctx["haar"] = load_face_detector()
+    elif stage == "faces_tracked":
+        ctx["tracker"] = FaceTracker(load_face_detector())
+    elif stage == "yolo":
+        if not use_yolo:
+            return None
+        from yolo_worker import YoloWorker
+        try:
+            ctx["yolo"] = YoloWorker(model=load_yolo_model())
+        except Exception as e:
+            print(f"  yolo saltato: {e}", file=sys.stderr)
+            return None
+    elif stage == "overlay":
+        ctx["overlay"] = Overlay()
+    elif stage == "encode":
+        path = os.path.join(workdir, f"encode_{size[0]}x{size[1]}.mp4")
+        ctx["writer"] = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*RECORD_FOURCC), 30, size)
+        if not ctx["writer"].isOpened():
+            return None
+    elif stage == "display":
+        try:
+            from PySide6.QtGui import QImage
+            ctx["qimage"] = QImage
+        except ImportError:
+            ctx["qimage"] = None
+    elif stage == "pipeline":
+        # pipeline sincrona di update_frame: i worker non partono, gli invii restano in coda
+        engine = Engine(yolo_loader=None)
+        engine.motion_detector.set_masks()
+        engine.motion_threshold = float("inf")   # nessuna registrazione: l'encode ha il suo stadio
+        engine.recognition_enabled = False
+        detector = load_face_detector()
+        engine.detector = detector
+        engine.face_tracker.detector = detector
+        ctx["engine"] = engine
+    return ctx
+
+
+def close_context(ctx):
+    if "writer" in ctx:
+        ctx["writer"].release()
+
+
+def run_stage(stage, source, size, frames, workdir, use_yolo):
+    """Time one stage on `frames` frames, then measure its peak memory on a short pass."""
+    fn = STAGES[stage]
+    ctx = make_context(stage, size, workdir, use_yolo)
+    if ctx is None:
+        return None
+
+    timings = []
+    for i in range(BENCH_WARMUP + frames):
+        frame = source.frame(i)
+        ctx["index"] = i
+        ctx["gray"] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        start = time.perf_counter()
+        fn(ctx, frame)
+        elapsed = time.perf_counter() - start
+        if i >= BENCH_WARMUP:
+            timings.append(elapsed)
+
+    # secondo passaggio breve con tracemalloc (rallenta, quindi non è cronometrato)
+    tracemalloc.start()
+    peak = 0
+    for i in range(BENCH_MEMORY_FRAMES):
+        frame = source.frame(BENCH_WARMUP + frames + i)
+        ctx["index"] = BENCH_WARMUP + frames + i
+        ctx["gray"] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(ctx, frame)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    close_context(ctx)
+
+    ms = np.array(timings) * 1000.0
+    result = {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in BENCH_PERCENTILES}
+    result.update({
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "fps": round(1000.0 / float(ms.mean()), 1) if ms.mean() > 0 else None,
+        "peak_mem_mb": round(peak / 2**20, 2),
+    })
+    return result
+
+
+# =============================================================================================
+# AMBIENTE E FILE DEI RISULTATI
+# =============================================================================================
+def peak_rss_mb():
+    """Peak resident memory of the whole process (OpenCV buffers included), if available."""
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+        except (ImportError, AttributeError):
+            return None
+
+
+def environment():
+    """Versions and machine details stored with every result file."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def run_benchmark(resolutions, stages, frames=BENCH_FRAMES, clip=None, use_yolo=True):
+    """Run every stage at every resolution; returns the result document."""
+    cv2.setRNGSeed(BENCH_SEED)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in resolutions:
+            size = BENCH_RESOLUTIONS[name]
+            source = ClipFrames(clip, size) if clip else SyntheticFrames(size)
+            results[name] = {}
+            for stage in stages:
+                print(f"{name:>6} {stage:<14}", end=" ", flush=True, file=sys.stderr)
+                result = run_stage(stage, source, size, frames, workdir, use_yolo)
+                results[name][stage] = result
+                print(f"p50={result['p50_ms']:.2f}ms fps={result['fps']}" if result else "saltato", file=sys.stderr)
+    return {
+        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": environment(),
+        "settings": {"frames": frames, "warmup": BENCH_WARMUP, "seed": BENCH_SEED,
+                     "clip": os.path.basename(clip) if clip else None, "yolo": use_yolo},
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+def compare(path_a, path_b):
+    """Print the p50 latency change of every stage between two result files."""
+    with open(path_a, "r", encoding="utf-8") as f:
+        a = json.load(f)["results"]
+    with open(path_b, "r", encoding="utf-8") as f:
+        b = json.load(f)["results"]
+    print(f"{'risoluzione':<12}{'stadio':<16}{'p50 A':>10}{'p50 B':>10}{'delta':>9}")
+    for res in a:
+        for stage, ra in a[res].items():
+            rb = b.get(res, {}).get(stage)
+            if not ra or not rb:
+                continue
+            delta = (rb["p50_ms"] - ra["p50_ms"]) / ra["p50_ms"] * 100 if ra["p50_ms"] else 0.0
+            print(f"{res:<12}{stage:<16}{ra['p50_ms']:>10.2f}{rb['p50_ms']:>10.2f}{delta:>+8.1f}%")
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO
+# =============================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark degli stadi di elaborazione dei frame.")
+    parser.add_argument("--clip", default=None, help="clip registrato da usare al posto dei frame sintetici")
+    parser.add_argument("--frames", type=int, default=BENCH_FRAMES, help="frame misurati per stadio")
+    parser.add_argument("--resolutions", nargs="+", default=list(BENCH_RESOLUTIONS), choices=list(BENCH_RESOLUTIONS))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--threads", type=int, default=None, help="thread di OpenCV (default: quelli di sistema)")
+    parser.add_argument("--no-yolo", action="store_true", help="salta lo stadio YOLO")
+    parser.add_argument("--output", default=None, help="file JSON dei risultati")
+    parser.add_argument("--compare", nargs=2, metavar=("A", "B"), help="confronta due file di risultati")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    document = run_benchmark(args.resolutions, args.stages, args.frames, args.clip, not args.no_yolo)
+    output = args.output or datetime.datetime.now().strftime("benchmark_%Y%m%d_%H%M%S.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=4)
+    print(f"Risultati salvati in {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
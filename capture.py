@@ -0,0 +1,152 @@
+# =============================================================================================
+# CAPTURE STAGE - lettura della webcam su thread dedicato con ring buffer dell'ultimo frame
+# =============================================================================================
+import time
+import logging
+import threading
+
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+RING_CAPACITY = 4                 # frame trattenuti nel ring buffer
+READ_FAILURE_BACKOFF = 0.01       # pausa (s) dopo una read() fallita
+MAX_READ_FAILURES = 100           # read() fallite consecutive prima di segnalare la camera persa
+
+
+@dataclass
+class CapturedFrame:
+    """A frame read from the camera, tagged with a sequential id and capture time."""
+    frame_id: int
+    timestamp: float              # time.monotonic() al momento della read()
+    image: np.ndarray
+
+
+# =============================================================================================
+# RING BUFFER DELL'ULTIMO FRAME
+# =============================================================================================
+class FrameRing:
+    """Bounded ring buffer of captured frames that always hands out the newest one."""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = max(1, int(capacity))
+        self._slots = [None] * self.capacity
+        self._cond = threading.Condition()
+        self._next_id = 0          # id del prossimo frame scritto
+        self._last_read_id = -1    # id dell'ultimo frame consegnato al consumatore
+        self.dropped = 0           # frame mai consegnati perché superati da uno più recente
+
+    def put(self, image, timestamp=None):
+        """Store a new frame, overwriting the oldest slot, and return its id."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._cond:
+            frame_id = self._next_id
+            self._slots[frame_id % self.capacity] = CapturedFrame(frame_id, timestamp, image)
+            self._next_id += 1
+            self._cond.notify_all()
+        return frame_id
+
+    def get_latest(self, timeout=0.0):
+        """Return the newest unread frame, or None if nothing new arrives within timeout.
+
+        Frames skipped because a newer one was already available are counted in `dropped`.
+        """
+        with self._cond:
+            if self._next_id - 1 <= self._last_read_id and timeout:
+                self._cond.wait_for(lambda: self._next_id - 1 > self._last_read_id, timeout)
+            newest_id = self._next_id - 1
+            if newest_id <= self._last_read_id:
+                return None
+            self.dropped += newest_id - self._last_read_id - 1
+            self._last_read_id = newest_id
+            return self._slots[newest_id % self.capacity]
+
+    def peek_latest(self):
+        """Return the newest frame without marking it as consumed."""
+        with self._cond:
+            if self._next_id == 0:
+                return None
+            return self._slots[(self._next_id - 1) % self.capacity]
+
+    def reset(self):
+        """Drop every buffered frame (e.g. after switching camera)."""
+        with self._cond:
+            self._slots = [None] * self.capacity
+            self._last_read_id = self._next_id - 1
+
+
+# =============================================================================================
+# THREAD DI ACQUISIZIONE
+# =============================================================================================
+class CaptureThread(threading.Thread):
+    """Continuously read from a cv2.VideoCapture into a FrameRing."""
+
+    def __init__(self, cap, ring, name="capture"):
+        super().__init__(name=name, daemon=True)
+        self.cap = cap
+        self.ring = ring
+        self.frames_read = 0
+        self.read_failures = 0
+        self.camera_lost = False
+        self.tap = None            # tap(frame, timestamp) riceve ogni frame; se restituisce False viene rimosso
+        self._stop_event = threading.Event()
+        self._exit_lock = threading.Lock()
+        self._exited = False
+        self._release_on_exit = False  # camera da rilasciare qui, quando la read() bloccata ritorna
+
+    def run(self):
+        """Read frames until stopped; never blocks the consumer."""
+        try:
+            self._read_loop()
+        finally:
+            with self._exit_lock:
+                self._exited = True
+                release = self._release_on_exit
+            if release:
+                self.cap.release()
+                logger.info(f"Capture '{self.name}': camera rilasciata dopo la read() bloccata")
+
+    def _read_loop(self):
+        consecutive_failures = 0
+        while not self._stop_event.is_set():
+            ret, frame = self.cap.read()
+            now = time.monotonic()
+            if not ret:
+                self.read_failures += 1
+                consecutive_failures += 1
+                if consecutive_failures == MAX_READ_FAILURES:
+                    self.camera_lost = True
+                    logger.warning(f"Capture '{self.name}': {consecutive_failures} letture fallite consecutive")
+                time.sleep(READ_FAILURE_BACKOFF)
+                continue
+            consecutive_failures = 0
+            self.camera_lost = False
+            self.frames_read += 1
+            self.ring.put(frame, now)
+            tap = self.tap
+            if tap is not None and not tap(frame, now):
+                self.tap = None
+
+    def stop(self, timeout=1.0, release=False):
+        """Ask the thread to stop; returns True if it exited within timeout.
+
+        A read() hung in the driver cannot be interrupted: the thread then still owns the
+        camera, which must not be released under it. With release=True the camera is
+        released here if the thread exited, otherwise by the thread once the read returns.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        with self._exit_lock:
+            if not self._exited and self.ident is not None:
+                self._release_on_exit = release
+                return False
+        if release:
+            self.cap.release()
+        return True
@@ -0,0 +1,199 @@
+# =============================================================================================
+# DESCRIPTOR STORE - libreria degli oggetti noti in un'unica matrice memory-mapped
+# =============================================================================================
+#   descriptors.bin : tutti i descrittori ORB uno dopo l'altro (uint8, 32 byte per riga)
+#   objects.bin     : una riga a larghezza fissa per oggetto (offset, count, nome, timestamp, ref)
+#   lsh*            : tabelle dell'indice LSH (recognition.py), ricostruite quando lo store cresce
+#
+# Entrambi i file sono solo in append: un nuovo oggetto scrive prima i descrittori e poi
+# la propria riga in objects.bin, che è l'unica fonte di verità su cosa è valido.
+# I file vengono mappati in memoria in sola lettura: l'apertura non legge i dati e più
+# processi condividono le stesse pagine della cache del sistema operativo.
+# =============================================================================================
+import os
+import sys
+import glob
+import logging
+import datetime
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+STORE_DIR = os.path.join("known_objects", "store")
+DESCRIPTORS_FILE = "descriptors.bin"
+OBJECTS_FILE = "objects.bin"
+DESCRIPTOR_BYTES = 32             # ORB: 256 bit
+
+OBJECT_DTYPE = np.dtype([
+    ("offset", "<i8"),            # prima riga in descriptors.bin
+    ("count", "<i4"),             # numero di descrittori
+    ("name", "<U64"),
+    ("timestamp", "<U15"),        # formato %Y%m%d_%H%M%S, come nei file .npz
+    ("ref_filename", "<U64"),
+])
+
+
+class DescriptorStore:
+    """Append-only, memory-mapped library of ORB descriptors for the known objects."""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.descriptors_path = os.path.join(path, DESCRIPTORS_FILE)
+        self.objects_path = os.path.join(path, OBJECTS_FILE)
+        self.objects = np.empty(0, OBJECT_DTYPE)
+        self.descriptors = np.empty((0, DESCRIPTOR_BYTES), np.uint8)
+        self.open()
+
+    # ============================================================================================
+    # LETTURA
+    # ============================================================================================
+    def open(self):
+        """Map both files read-only; cost does not depend on the library size."""
+        if os.path.exists(self.objects_path) and os.path.getsize(self.objects_path) >= OBJECT_DTYPE.itemsize:
+            # una riga incompleta in coda (scrittura interrotta) viene ignorata
+            rows = os.path.getsize(self.objects_path) // OBJECT_DTYPE.itemsize
+            self.objects = np.memmap(self.objects_path, OBJECT_DTYPE, mode="r", shape=(rows,))
+        else:
+            self.objects = np.empty(0, OBJECT_DTYPE)
+
+        total = self.descriptor_count()
+        if total:
+            self.descriptors = np.memmap(self.descriptors_path, np.uint8, mode="r", shape=(total, DESCRIPTOR_BYTES))
+        else:
+            self.descriptors = np.empty((0, DESCRIPTOR_BYTES), np.uint8)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def descriptor_count(self):
+        """Return the number of valid descriptor rows (as recorded in objects.bin)."""
+        if not len(self.objects):
+            return 0
+        last = self.objects[-1]
+        return int(last["offset"]) + int(last["count"])
+
+    @property
+    def names(self):
+        """Object names, in store order."""
+        return [str(n) for n in self.objects["name"]]
+
+    def owners(self):
+        """Return the object index of every descriptor row."""
+        return np.repeat(np.arange(len(self.objects), dtype=np.int32), self.objects["count"])
+
+    def object_descriptors(self, i):
+        """Return a view (no copy) on the descriptors of object i."""
+        row = self.objects[i]
+        return self.descriptors[row["offset"]:row["offset"] + row["count"]]
+
+    # ============================================================================================
+    # SCRITTURA (un solo processo alla volta)
+    # ============================================================================================
+    def append(self, name, descriptors, timestamp=None, ref_filename=""):
+        """Enrol one object: append its descriptors and its table row, then remap."""
+        descriptors = np.ascontiguousarray(descriptors, dtype=np.uint8)
+        if descriptors.ndim != 2 or descriptors.shape[1] != DESCRIPTOR_BYTES or not len(descriptors):
+            raise ValueError("descriptors must be a non-empty Nx32 uint8 ORB matrix")
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        os.makedirs(self.path, exist_ok=True)
+        offset = self.descriptor_count()
+        rows = len(self.objects)
+        # le mappature di questo processo vanno chiuse prima di poter accorciare i file (Windows)
+        self.objects = np.empty(0, OBJECT_DTYPE)
+        self.descriptors = np.empty((0, DESCRIPTOR_BYTES), np.uint8)
+
+        with open(self.descriptors_path, "ab") as f:
+            # scarta eventuali descrittori orfani lasciati da un append interrotto
+            if f.tell() > offset * DESCRIPTOR_BYTES:
+                f.truncate(offset * DESCRIPTOR_BYTES)
+            f.write(descriptors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        row = np.zeros(1, OBJECT_DTYPE)
+        row[0] = (offset, len(descriptors), name, timestamp, ref_filename)
+        with open(self.objects_path, "ab") as f:
+            if f.tell() > rows * OBJECT_DTYPE.itemsize:
+                f.truncate(rows * OBJECT_DTYPE.itemsize)
+            f.write(row.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.open()
+        return len(self.objects) - 1
+
+    def import_npz_folder(self, folder):
+        """One-shot import of the legacy known_objects/*.npz files not yet in the store."""
+        known = set(zip(self.names, (str(t) for t in self.objects["timestamp"])))
+        # i file si chiamano nome_timestamp.npz: quelli già importati si riconoscono senza aprirli
+        known_stems = {f"{name}_{timestamp}" for name, timestamp in known}
+        imported = 0
+        for path in sorted(glob.glob(os.path.join(folder, "*.npz"))):
+            if os.path.splitext(os.path.basename(path))[0] in known_stems:
+                continue
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    des = data["des"]
+                    name = str(data["name"])
+                    timestamp = str(data["timestamp"]) if "timestamp" in data.files else ""
+                    ref = str(data["ref_filename"]) if "ref_filename" in data.files else ""
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Known object {path} ignored: {e}")
+                continue
+            if (name, timestamp) in known:
+                continue
+            try:
+                self.append(name, des, timestamp, ref)
+            except ValueError as e:
+                logger.warning(f"Known object {path} ignored: {e}")
+                continue
+            known.add((name, timestamp))
+            imported += 1
+        return imported
+
+
+# =============================================================================================
+# ARRUOLAMENTO DA IMMAGINE
+# =============================================================================================
+def enroll_image(store, name, image_path, ref_dir=os.path.dirname(STORE_DIR), n_features=1200):
+    """Compute ORB descriptors from an image, save its reference copy and append it."""
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"cannot read {image_path}")
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, descriptors = cv2.ORB_create(n_features).detectAndCompute(gray, None)
+    if descriptors is None:
+        raise ValueError(f"no ORB features in {image_path}")
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    ref_filename = f"{name}_{timestamp}_ref.png"
+    cv2.imwrite(os.path.join(ref_dir, ref_filename), image)
+    return store.append(name, descriptors, timestamp, ref_filename)
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO: python descriptor_store.py import|enroll|list
+# =============================================================================================
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s | %(message)s')
+    store = DescriptorStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "import":
+        folder = sys.argv[2] if len(sys.argv) > 2 else os.path.dirname(STORE_DIR)
+        print(f"Importati {store.import_npz_folder(folder)} oggetti in {store.path}")
+    elif command == "enroll" and len(sys.argv) == 4:
+        index = enroll_image(store, sys.argv[2], sys.argv[3])
+        print(f"Arruolato '{sys.argv[2]}' come oggetto {index}")
+    elif command == "list":
+        for row in store.objects:
+            print(f"{row['name']:<20} {row['timestamp']:<16} {row['count']:>6} descrittori  {row['ref_filename']}")
+        print(f"{len(store)} oggetti, {store.descriptor_count()} descrittori")
+    else:
+        sys.exit("uso: python descriptor_store.py [list | import [cartella] | enroll NOME IMMAGINE]")
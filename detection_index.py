@@ -0,0 +1,195 @@
+# =============================================================================================
+# INDICE DEI RILEVAMENTI - file binario accanto a ogni registrazione, interrogabile al volo
+# =============================================================================================
+#   Mentre un record_*.mp4 viene scritto, il thread di registrazione aggiunge a
+#   record_*.idx una riga a larghezza fissa per ogni frame (il suo istante nel video) e
+#   una per ogni volto o box YOLO di quel frame, con classe e confidenza. Alla chiusura
+#   un trailer JSON salva i nomi delle classi. L'interrogazione legge solo questi file,
+#   con numpy, senza decodificare alcun video:
+#
+#       python detection_index.py person [--folder cartella] [--min-conf 0.5] [--gap 1.0]
+#       python detection_index.py face
+# =============================================================================================
+import os
+import sys
+import glob
+import json
+import time
+import struct
+import logging
+import argparse
+
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"FIDX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHHd")      # magic, versione, byte per riga, inizio (epoch)
+INDEX_TRAILER = struct.Struct("<I8s")       # lunghezza del JSON, magic di chiusura
+INDEX_TRAILER_MAGIC = b"FIDXEND\0"
+INDEX_GAP = 1.0                   # secondi senza rilevamenti che separano due intervalli
+FACE_CLASS = "face"
+
+KIND_FRAME = 0                    # riga di solo timestamp, una per frame
+KIND_FACE = 1
+KIND_OBJECT = 2
+
+INDEX_DTYPE = np.dtype([
+    ("t", "<f4"),                 # secondi dall'inizio del video
+    ("kind", "u1"),
+    ("cls", "<i2"),               # classe YOLO, -1 per frame e volti
+    ("conf", "<f2"),
+    ("x1", "<i2"), ("y1", "<i2"), ("x2", "<i2"), ("y2", "<i2"),
+])
+
+
+def index_path(video_path):
+    """Return the path of the detection index of a recording."""
+    return os.path.splitext(video_path)[0] + INDEX_SUFFIX
+
+
+# =============================================================================================
+# SCRITTURA (sul thread di registrazione)
+# =============================================================================================
+class DetectionIndexWriter:
+    """Append per-frame detections of one recording to its binary index."""
+
+    def __init__(self, path, video_name=""):
+        self.path = path
+        self.video_name = video_name
+        self.classes = {}             # id classe YOLO -> nome
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, INDEX_DTYPE.itemsize, time.time()))
+
+    def append(self, t, faces=None, detections=None):
+        """Add one frame at video time t, with its face boxes and YOLO detection dicts."""
+        faces = faces if faces is not None else ()
+        detections = detections or ()
+        rows = np.zeros(1 + len(faces) + len(detections), INDEX_DTYPE)
+        rows["t"] = t
+        rows["cls"] = -1
+        n = 1
+        for (x, y, w, h) in faces:
+            rows[n] = (t, KIND_FACE, -1, 1.0, x, y, x + w, y + h)
+            n += 1
+        for d in detections:
+            self.classes.setdefault(int(d['cls']), d['name'])
+            rows[n] = (t, KIND_OBJECT, d['cls'], d['conf'], d['x1'], d['y1'], d['x2'], d['y2'])
+            n += 1
+        self._file.write(rows.tobytes())
+        self.rows += n
+
+    def close(self, fps=None):
+        """Write the class names trailer and close the file."""
+        trailer = json.dumps({
+            "video": self.video_name,
+            "fps": fps,
+            "rows": self.rows,
+            "classes": {str(k): v for k, v in sorted(self.classes.items())},
+        }).encode("utf-8")
+        self._file.write(trailer)
+        self._file.write(INDEX_TRAILER.pack(len(trailer), INDEX_TRAILER_MAGIC))
+        self._file.close()
+
+
+# =============================================================================================
+# LETTURA E INTERROGAZIONE
+# =============================================================================================
+def load_index(path):
+    """Read an index; returns (info, rows). Unclosed indexes (crash) yield info without classes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < INDEX_HEADER.size:
+        raise ValueError(f"{path}: file troppo corto")
+    magic, version, itemsize, started = INDEX_HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION or itemsize != INDEX_DTYPE.itemsize:
+        raise ValueError(f"{path}: formato non supportato")
+
+    info = {"started": started, "classes": {}}
+    end = len(data)
+    if end >= INDEX_HEADER.size + INDEX_TRAILER.size:
+        length, trailer_magic = INDEX_TRAILER.unpack_from(data, end - INDEX_TRAILER.size)
+        if trailer_magic == INDEX_TRAILER_MAGIC:
+            end -= INDEX_TRAILER.size + length
+            info.update(json.loads(data[end:end + length]))
+            info["classes"] = {int(k): v for k, v in info["classes"].items()}
+    # un indice non chiuso viene letto fino all'ultima riga completa
+    count = (end - INDEX_HEADER.size) // INDEX_DTYPE.itemsize
+    rows = np.frombuffer(data, INDEX_DTYPE, count, INDEX_HEADER.size)
+    return info, rows
+
+
+def intervals(times, gap=INDEX_GAP):
+    """Merge sorted timestamps into [(start, end)] intervals split by gaps longer than gap."""
+    if not len(times):
+        return []
+    breaks = np.flatnonzero(np.diff(times) > gap)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(times) - 1]))
+    return [(float(times[s]), float(times[e])) for s, e in zip(starts, ends)]
+
+
+def query(folder, class_name, min_conf=0.0, gap=INDEX_GAP):
+    """Return [(video, start_s, end_s, max_conf)] of every interval showing class_name."""
+    found = []
+    for path in sorted(glob.glob(os.path.join(folder, "record_*" + INDEX_SUFFIX))):
+        try:
+            info, rows = load_index(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Index: {e}")
+            continue
+        if class_name == FACE_CLASS:
+            selected = rows[rows["kind"] == KIND_FACE]
+        else:
+            ids = [k for k, v in info["classes"].items() if v == class_name]
+            if not ids:
+                continue
+            selected = rows[(rows["kind"] == KIND_OBJECT) & np.isin(rows["cls"], ids)]
+            selected = selected[selected["conf"] >= min_conf]
+        if not len(selected):
+            continue
+        times = np.unique(selected["t"])
+        video = info.get("video") or os.path.basename(os.path.splitext(path)[0] + ".mp4")
+        for start, end in intervals(times, gap):
+            in_interval = (selected["t"] >= start) & (selected["t"] <= end)
+            found.append((video, start, end, float(selected["conf"][in_interval].max())))
+    return found
+
+
+def _format_time(seconds):
+    return time.strftime("%H:%M:%S", time.gmtime(int(seconds))) + f".{int(seconds * 10) % 10}"
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO
+# =============================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cerca una classe negli indici delle registrazioni.")
+    parser.add_argument("cls", help=f"nome della classe YOLO (es. person, cell phone) o '{FACE_CLASS}'")
+    parser.add_argument("--folder", default=os.getcwd(), help="cartella con i record_*.idx")
+    parser.add_argument("--min-conf", type=float, default=0.0, help="confidenza minima dei box YOLO")
+    parser.add_argument("--gap", type=float, default=INDEX_GAP, help="secondi che separano due intervalli")
+    parser.add_argument("--json", action="store_true", help="risultati in JSON")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    found = query(args.folder, args.cls, args.min_conf, args.gap)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps([{"video": v, "start": round(s, 2), "end": round(e, 2), "max_conf": round(c, 2)}
+                          for v, s, e, c in found], indent=4))
+        return
+    for video, s, e, conf in found:
+        print(f"{video}  {_format_time(s)} - {_format_time(e)}  conf max={conf:.2f}")
+    print(f"{len(found)} intervalli con '{args.cls}' in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
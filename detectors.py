@@ -0,0 +1,381 @@
+# =============================================================================================
+# DETECTORS - backend intercambiabili per YOLO: PyTorch, ONNX Runtime, OpenVINO, OpenCV DNN
+# =============================================================================================
+#   Ogni backend riceve immagini già in letterbox (lato INPUT_SIZE, proporzioni conservate,
+#   bordi grigi) e restituisce per ognuna un array (N, 6) x1, y1, x2, y2, conf, classe in
+#   coordinate dell'immagine di ingresso; YoloWorker riporta i box sul frame originale.
+#   I modelli esportati (ONNX, OpenVINO, anche int8) girano senza PyTorch:
+#
+#       python detectors.py --export                    # yolov8n.pt -> onnx, onnx int8, openvino (+int8)
+#       python detectors.py --compare [--clip video.mp4] [--frames 50]
+# =============================================================================================
+import os
+import abc
+import ast
+import sys
+import json
+import time
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+YOLO_WEIGHTS = "yolov8n.pt"
+YOLO_ONNX = "yolov8n.onnx"
+YOLO_ONNX_INT8 = "yolov8n_int8.onnx"
+YOLO_OPENVINO = os.path.join("yolov8n_openvino_model", "yolov8n.xml")
+YOLO_OPENVINO_INT8 = os.path.join("yolov8n_int8_openvino_model", "yolov8n.xml")
+YOLO_BACKEND = "auto"             # "auto" sceglie il primo disponibile in BACKEND_PREFERENCE
+YOLO_INPUT_SIZE = 640             # lato dell'ingresso in letterbox (multiplo di 32)
+YOLO_CONFIDENCE = 0.45
+YOLO_IOU = 0.45                   # soglia della non-maximum suppression
+YOLO_WARMUP_RUNS = 2
+LETTERBOX_COLOR = (114, 114, 114)
+
+COCO_NAMES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+)
+
+
+# =============================================================================================
+# PRE E POST-ELABORAZIONE COMUNI
+# =============================================================================================
+def letterbox(frame, size):
+    """Resize keeping the aspect ratio and pad to size x size; returns (image, scale, pad_x, pad_y)."""
+    h, w = frame.shape[:2]
+    scale = min(size / w, size / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    image = np.full((size, size, 3), LETTERBOX_COLOR, np.uint8)
+    image[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        frame, (new_w, new_h), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    )
+    return image, scale, pad_x, pad_y
+
+
+def to_blob(images):
+    """BGR uint8 images -> NCHW float32 RGB blob in [0, 1]."""
+    return cv2.dnn.blobFromImages(images, 1 / 255.0, swapRB=True)
+
+
+def decode_yolov8(output, conf=YOLO_CONFIDENCE, iou=YOLO_IOU):
+    """Decode one raw YOLOv8 output (4 + classes, anchors) into (N, 6) boxes after NMS."""
+    preds = output.T                              # (anchors, 4 + classi)
+    scores = preds[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(scores)), cls]
+    keep = best >= conf
+    if not keep.any():
+        return np.empty((0, 6), np.float32)
+    preds, cls, best = preds[keep], cls[keep], best[keep]
+    cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    # NMS per classe: i box di classi diverse vengono spostati per non sovrapporsi mai
+    offset = cls[:, None] * 4096.0
+    shifted = boxes + offset
+    nms_boxes = np.column_stack([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]])
+    idx = cv2.dnn.NMSBoxes(nms_boxes.tolist(), best.tolist(), conf, iou)
+    idx = np.array(idx, dtype=int).reshape(-1)
+    return np.column_stack([boxes[idx], best[idx], cls[idx]]).astype(np.float32)
+
+
+def _names_from_metadata(value):
+    """Parse the class names stored by the exporter ("{0: 'person', ...}")."""
+    try:
+        names = ast.literal_eval(value)
+        return {int(k): v for k, v in names.items()}
+    except (ValueError, SyntaxError, AttributeError):
+        return dict(enumerate(COCO_NAMES))
+
+
+# =============================================================================================
+# BACKEND
+# =============================================================================================
+class DetectorBackend(abc.ABC):
+    """Common interface: infer(letterboxed images) -> list of (N, 6) arrays.
+
+    `dynamic` backends also accept square images smaller than input_size (multiples of
+    32); the images of one call always share the same side.
+    """
+    name = "base"
+    dynamic = False
+
+    def __init__(self, input_size=YOLO_INPUT_SIZE, conf=YOLO_CONFIDENCE, iou=YOLO_IOU):
+        self.input_size = input_size
+        self.conf = conf
+        self.iou = iou
+        self.names = dict(enumerate(COCO_NAMES))
+
+    @abc.abstractmethod
+    def infer(self, images):
+        """Return one (N, 6) array x1, y1, x2, y2, conf, class per letterboxed image."""
+
+    def warmup(self, runs=YOLO_WARMUP_RUNS):
+        """Run the model on blank input so the first real frame is not slowed by lazy setup."""
+        blank = np.full((self.input_size, self.input_size, 3), LETTERBOX_COLOR, np.uint8)
+        for _ in range(runs):
+            self.infer([blank])
+
+
+class UltralyticsBackend(DetectorBackend):
+    """PyTorch (eager) model through ultralytics; the reference implementation."""
+    name = "ultralytics"
+    dynamic = True
+
+    def __init__(self, path=YOLO_WEIGHTS, **kwargs):
+        super().__init__(**kwargs)
+        from ultralytics import YOLO
+        self.model = YOLO(path)
+
+    def infer(self, images):
+        results = self.model(images, verbose=False, conf=self.conf, iou=self.iou, imgsz=images[0].shape[0])
+        outputs = []
+        for r in results:
+            rows = []
+            for box in r.boxes:
+                x1, y1, x2, y2 = map(float, box.xyxy[0])
+                rows.append((x1, y1, x2, y2, float(box.conf[0]), int(box.cls[0])))
+            outputs.append(np.array(rows, np.float32).reshape(-1, 6))
+            self.names = r.names
+        return outputs
+
+
+class OnnxRuntimeBackend(DetectorBackend):
+    """Exported ONNX model (fp32 or int8-quantised) on ONNX Runtime, CPU only."""
+    name = "onnxruntime"
+
+    def __init__(self, path=YOLO_ONNX, threads=None, **kwargs):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        # un modello esportato con dimensione fissa impone il proprio lato
+        size = model_input.shape[2] if isinstance(model_input.shape[2], int) else kwargs.pop("input_size", YOLO_INPUT_SIZE)
+        kwargs.pop("input_size", None)
+        super().__init__(input_size=size, **kwargs)
+        self.input_name = model_input.name
+        self.dynamic = not isinstance(model_input.shape[2], int)
+        self.batch_fixed = isinstance(model_input.shape[0], int)
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = _names_from_metadata(metadata["names"])
+
+    def infer(self, images):
+        if self.batch_fixed:
+            outputs = [self.session.run(None, {self.input_name: to_blob([image])})[0][0] for image in images]
+        else:
+            outputs = self.session.run(None, {self.input_name: to_blob(images)})[0]
+        return [decode_yolov8(o, self.conf, self.iou) for o in outputs]
+
+
+class OpenVinoBackend(DetectorBackend):
+    """Exported OpenVINO IR model (fp32/fp16 or int8), compiled for the CPU."""
+    name = "openvino"
+
+    def __init__(self, path=YOLO_OPENVINO, **kwargs):
+        import openvino as ov
+        core = ov.Core()
+        model = core.read_model(path)
+        size = model.inputs[0].get_partial_shape()[2]
+        if size.is_static:
+            kwargs["input_size"] = size.get_length()
+        super().__init__(**kwargs)
+        self.dynamic = not size.is_static
+        self.compiled = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        metadata = os.path.join(os.path.dirname(path), "metadata.yaml")
+        if os.path.exists(metadata):
+            # metadata.yaml di ultralytics: blocco "names:" con righe "  0: person"
+            names = {}
+            with open(metadata, "r", encoding="utf-8") as f:
+                in_names = False
+                for line in f:
+                    if line.startswith("names:"):
+                        in_names = True
+                    elif in_names and line.startswith("  ") and ":" in line:
+                        k, v = line.strip().split(":", 1)
+                        names[int(k)] = v.strip().strip("'\"")
+                    elif in_names:
+                        break
+            if names:
+                self.names = names
+
+    def infer(self, images):
+        return [decode_yolov8(self.compiled(to_blob([image]))[0][0], self.conf, self.iou) for image in images]
+
+
+class OpenCvDnnBackend(DetectorBackend):
+    """Exported ONNX model on OpenCV's own DNN module: no extra dependency at all."""
+    name = "opencv"
+
+    def __init__(self, path=YOLO_ONNX, **kwargs):
+        super().__init__(**kwargs)
+        self.net = cv2.dnn.readNetFromONNX(path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def infer(self, images):
+        outputs = []
+        for image in images:
+            self.net.setInput(to_blob([image]))
+            outputs.append(decode_yolov8(self.net.forward()[0], self.conf, self.iou))
+        return outputs
+
+
+BACKENDS = {
+    "ultralytics": (UltralyticsBackend, YOLO_WEIGHTS),
+    "onnxruntime": (OnnxRuntimeBackend, YOLO_ONNX),
+    "onnxruntime-int8": (OnnxRuntimeBackend, YOLO_ONNX_INT8),
+    "openvino": (OpenVinoBackend, YOLO_OPENVINO),
+    "openvino-int8": (OpenVinoBackend, YOLO_OPENVINO_INT8),
+    "opencv": (OpenCvDnnBackend, YOLO_ONNX),
+}
+BACKEND_PREFERENCE = ("openvino-int8", "openvino", "onnxruntime-int8", "onnxruntime", "opencv", "ultralytics")
+
+
+def create_backend(name=YOLO_BACKEND, path=None, input_size=YOLO_INPUT_SIZE, conf=YOLO_CONFIDENCE,
+                   warmup=True):
+    """Load a backend by name (or the fastest available with "auto") and warm it up."""
+    if name == "auto":
+        errors = []
+        for candidate in BACKEND_PREFERENCE:
+            model_path = BACKENDS[candidate][1]
+            if candidate != "ultralytics" and not os.path.exists(model_path):
+                continue
+            try:
+                return create_backend(candidate, None, input_size, conf, warmup)
+            except Exception as e:
+                # non solo il pacchetto mancante: un modello corrotto o un runtime che fallisce
+                # al caricamento o nel warmup non deve impedire l'avvio con il backend successivo
+                logger.warning(f"YOLO backend {candidate} unavailable: {e}")
+                errors.append(f"{candidate}: {e}")
+        raise RuntimeError("Nessun backend YOLO disponibile (" + "; ".join(errors) + ")")
+
+    if name not in BACKENDS:
+        raise ValueError(f"backend YOLO sconosciuto: {name}")
+    cls, default_path = BACKENDS[name]
+    start = time.monotonic()
+    backend = cls(path or default_path, input_size=input_size, conf=conf)
+    backend.name = name
+    if warmup:
+        backend.warmup()
+    logger.info("YOLO | backend=%s | modello=%s | ingresso=%d | pronto in %.2fs",
+                name, path or default_path, backend.input_size, time.monotonic() - start)
+    return backend
+
+
+# =============================================================================================
+# ESPORTAZIONE E CONFRONTO
+# =============================================================================================
+def export_models(weights=YOLO_WEIGHTS, input_size=YOLO_INPUT_SIZE):
+    """Export the PyTorch weights to ONNX, int8 ONNX, OpenVINO and int8 OpenVINO."""
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    # ingresso dinamico: ONNX Runtime può analizzare i ritagli delle zone in movimento a lato ridotto
+    onnx_path = model.export(format="onnx", imgsz=input_size, dynamic=True, simplify=True)
+    print(f"ONNX: {onnx_path}")
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(onnx_path, YOLO_ONNX_INT8, weight_type=QuantType.QUInt8)
+        print(f"ONNX int8: {YOLO_ONNX_INT8}")
+    except ImportError:
+        print("onnxruntime non installato: ONNX int8 saltato", file=sys.stderr)
+    except Exception as e:
+        print(f"Quantizzazione ONNX int8 non riuscita: {e}", file=sys.stderr)
+    try:
+        print(f"OpenVINO: {model.export(format='openvino', imgsz=input_size)}")
+        # la calibrazione int8 (NNCF) usa il dataset di esempio di ultralytics
+        int8_dir = model.export(format="openvino", imgsz=input_size, int8=True)
+        print(f"OpenVINO int8: {int8_dir}")
+    except Exception as e:
+        print(f"Esportazione OpenVINO non riuscita: {e}", file=sys.stderr)
+
+
+def compare_backends(names, frames, input_size=YOLO_INPUT_SIZE):
+    """Time every backend on the same letterboxed frames; returns one result dict each."""
+    images = [letterbox(frame, input_size)[0] for frame in frames]
+    report = []
+    for name in names:
+        try:
+            backend = create_backend(name, input_size=input_size)
+        except Exception as e:
+            report.append({"backend": name, "error": str(e)})
+            continue
+        # i modelli a dimensione fissa ricevono il proprio lato
+        inputs = images if backend.input_size == input_size else [letterbox(f, backend.input_size)[0] for f in frames]
+        timings, boxes = [], 0
+        for image in inputs:
+            start = time.perf_counter()
+            out = backend.infer([image])[0]
+            timings.append(time.perf_counter() - start)
+            boxes += len(out)
+        ms = np.array(timings) * 1000.0
+        report.append({
+            "backend": name,
+            "input_size": backend.input_size,
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p90_ms": round(float(np.percentile(ms, 90)), 2),
+            "mean_ms": round(float(ms.mean()), 2),
+            "fps": round(1000.0 / float(ms.mean()), 1),
+            "boxes_per_frame": round(boxes / len(inputs), 2),
+        })
+    return report
+
+
+def _compare_frames(clip, count):
+    """Frames for the comparison: a recorded clip or a fixed synthetic scene."""
+    if clip:
+        cap = cv2.VideoCapture(clip)
+        frames = []
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+        sys.exit(f"Impossibile leggere il clip {clip}.")
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend del rilevatore YOLO: esportazione e confronto.")
+    parser.add_argument("--export", action="store_true", help="esporta i pesi PyTorch nei formati ottimizzati")
+    parser.add_argument("--compare", action="store_true", help="latenza di ogni backend sugli stessi frame")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--clip", default=None, help="clip da cui prendere i frame del confronto")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--imgsz", type=int, default=YOLO_INPUT_SIZE, help="lato dell'ingresso in letterbox")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+    if args.export:
+        export_models(input_size=args.imgsz)
+    if args.compare:
+        report = compare_backends(args.backends, _compare_frames(args.clip, args.frames), args.imgsz)
+        print(json.dumps(report, indent=4))
+    if not args.export and not args.compare:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
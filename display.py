@@ -0,0 +1,74 @@
+# =============================================================================================
+# DISPLAY - dal frame OpenCV alla QLabel senza conversioni di colore né allocazioni per frame
+# =============================================================================================
+import cv2
+import numpy as np
+
+from PySide6.QtGui import QImage, QPixmap
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+DEFAULT_REFRESH_RATE = 60.0       # Hz, se lo schermo non riporta la sua frequenza
+
+
+class FrameDisplay:
+    """Render the latest processed frame into a QLabel at most once per screen refresh.
+
+    `submit` only stores a reference to the frame; `render`, driven by its own timer,
+    scales it once to the label size into a reused buffer and wraps that buffer in a
+    BGR888 QImage, so there is no BGR->RGB conversion and no full-size copy.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.frames_submitted = 0
+        self.frames_rendered = 0
+        self._frame = None
+        self._dirty = False
+        self._buffer = None
+
+    def submit(self, frame):
+        """Hand over the newest frame; it must not be modified afterwards."""
+        self._frame = frame
+        self._dirty = True
+        self.frames_submitted += 1
+
+    def clear(self):
+        """Drop the pending frame and blank the label."""
+        self._frame = None
+        self._dirty = False
+        self.label.clear()
+
+    def target_size(self, frame_w, frame_h):
+        """Largest size with the frame's aspect ratio that fits in the label."""
+        label_w, label_h = max(self.label.width(), 1), max(self.label.height(), 1)
+        scale = min(label_w / frame_w, label_h / frame_h)
+        return max(int(frame_w * scale), 1), max(int(frame_h * scale), 1)
+
+    def render(self):
+        """Show the pending frame if there is one; return True if the label was updated."""
+        if not self._dirty or self._frame is None:
+            return False
+        frame = self._frame
+        self._dirty = False
+
+        h, w = frame.shape[:2]
+        tw, th = self.target_size(w, h)
+        if self._buffer is None or self._buffer.shape[:2] != (th, tw):
+            self._buffer = np.empty((th, tw, 3), np.uint8)
+        # un solo ridimensionamento, direttamente nel buffer riutilizzato
+        interpolation = cv2.INTER_AREA if tw < w else cv2.INTER_LINEAR
+        cv2.resize(frame, (tw, th), dst=self._buffer, interpolation=interpolation)
+
+        img = QImage(self._buffer.data, tw, th, self._buffer.strides[0], QImage.Format_BGR888)
+        self.label.setPixmap(QPixmap.fromImage(img))
+        self.frames_rendered += 1
+        return True
+
+
+def to_pixmap(frame):
+    """Wrap a BGR frame in a QPixmap without colour conversion (for small previews)."""
+    h, w = frame.shape[:2]
+    frame = np.ascontiguousarray(frame)
+    return QPixmap.fromImage(QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888))
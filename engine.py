@@ -0,0 +1,1114 @@
+# =============================================================================================
+# ENGINE - pipeline senza interfaccia: acquisizione → movimento → volti → YOLO → registrazione
+# =============================================================================================
+#   Tutto lo stato di elaborazione vive qui e non dipende da Qt: la FaceApp ne è un client
+#   che imposta i parametri e mostra i frame restituiti da process(), mentre da riga di
+#   comando lo stesso motore gira su una webcam o su un file video, anche alla massima
+#   velocità possibile per misurarne il throughput:
+#
+#       python engine.py --source video.mp4 --no-motion
+#       python engine.py --source 0 --duration 60
+# =============================================================================================
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import threading
+import functools
+
+import cv2
+
+from capture import FrameRing, CaptureThread, CapturedFrame
+from yolo_worker import YoloWorker, MAIN_SOURCE
+from recorder import RecordingWriter, PreRollBuffer, RECORD_MAX_FPS, PREROLL_SECONDS, RECORD_SEGMENT_SECONDS
+from storage import StorageEvictor
+from journal import EventJournal, queued_logging
+from snapshot import ImageWriter, Burst, timestamped_name, BURST_SECONDS, BURST_QUEUE_SIZE
+from webcams import scan_webcams, load_cached_webcams, save_cached_webcams
+from geolocation import resolve_location, DEFAULT_LOCATION
+from face_tracker import FaceTracker, FACE_DETECT_INTERVAL
+from recognition import RecognitionWorker, RECOGNITION_INTERVAL
+from identity import IdentityWorker, face_crop
+from motion import MotionDetector
+from overlay import Overlay, box_ops, OVERLAY_ELEMENTS, OVERLAY_FPS_REFRESH
+from metrics import Metrics, MetricsExporter, METRICS_FILE
+from scheduler import FrameScheduler
+from detectors import create_backend, BACKENDS, YOLO_BACKEND, YOLO_INPUT_SIZE
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+YOLO_DETECTION_INTERVAL = 15       # run YOLO every N frames for performance
+YOLO_RESULT_MAX_AGE = 2.0          # secondi oltre i quali i box YOLO non vengono più disegnati
+MOTION_THRESHOLD = 5000            # pixel in movimento oltre cui parte la registrazione
+MOTION_GRACE_SECONDS = 3           # secondi senza movimento prima di fermare il video
+CAPTURE_POLL_TIMEOUT = 0.1         # attesa massima di un frame nel loop senza interfaccia
+# impostazioni che una camera extra riprende dal motore principale a ogni frame
+CHANNEL_SETTINGS = (
+    "motion_enabled", "motion_threshold", "motion_grace_seconds", "segment_seconds",
+    "faces_enabled", "face_tracking_enabled", "face_detect_interval", "rect_color", "rect_thickness",
+    "show_coords", "yolo_enabled", "yolo_interval", "yolo_roi", "yolo_rect_color", "yolo_rect_thickness",
+    "display_overlays", "record_overlays", "save_path", "location",
+)
+
+
+class EngineError(RuntimeError):
+    """An action requested to the engine cannot be carried out (message is user-facing)."""
+
+
+# =============================================================================================
+# CARICAMENTI LENTI
+# =============================================================================================
+def load_yolo_model(backend=YOLO_BACKEND, input_size=YOLO_INPUT_SIZE):
+    """Load and warm up the YOLO backend (slow, never on the UI thread)."""
+    return create_backend(backend, input_size=input_size)
+
+
+def load_face_detector():
+    """Load the Haar cascade used for face detection."""
+    return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+
+def open_first_webcam(backend=cv2.CAP_MSMF):
+    """Open the last known webcam, scanning the devices if the cache is missing or stale.
+
+    Returns (cap, indices, names); raises RuntimeError if no webcam can be opened.
+    """
+    # si apre subito l'ultima webcam nota; la lista completa viene aggiornata in background
+    indices, names = load_cached_webcams()
+    cap = cv2.VideoCapture(indices[0], backend) if indices else None
+    if cap is not None and cap.isOpened():
+        return cap, indices, names
+
+    # cache assente o non più valida: scansione parallela sincrona
+    if cap is not None:
+        cap.release()
+    indices, names = scan_webcams(backend=backend)
+    if not indices:
+        raise RuntimeError("Nessuna webcam trovata.")
+    save_cached_webcams(indices, names)
+    cap = cv2.VideoCapture(indices[0], backend)
+    if not cap.isOpened():
+        logger.error("Camera initialization failed")
+        raise RuntimeError("Errore: impossibile aprire la webcam principale.")
+    return cap, indices, names
+
+
+# =============================================================================================
+# MOTORE DI ELABORAZIONE
+# =============================================================================================
+class Engine:
+    """Run the detection, motion and recording pipeline on captured frames, without any UI.
+
+    Frames come from a CaptureThread on `cap` (`step`) or from any other source
+    (`process`, `run_file`). Every setting is a plain attribute; colours are BGR tuples.
+    `on_recording_changed(recording)` is called whenever a recording starts or stops,
+    including the ones started by motion.
+
+    An engine built with `parent` is an extra camera of that engine: it shares its YOLO
+    worker (under its own source key), journal, storage evictor and image writers, follows
+    its CHANNEL_SETTINGS, and runs without known-object and identity recognition.
+    """
+
+    def __init__(self, cap=None, cam_index=0, cam_name="", yolo_loader=load_yolo_model,
+                 recognition_loader=None, identity_loader=None, display=True, parent=None):
+        # ---- sorgente ----
+        self.parent = parent
+        self.channels = []             # camere extra che condividono i worker di questo motore
+        self.source = MAIN_SOURCE if parent is None else f"cam{cam_index}"
+        self.record_prefix = "record" if parent is None else f"record_cam{cam_index}"
+        self.cap = cap
+        self.current_cam_index = cam_index
+        self.current_cam_name = cam_name
+        self.source_fps = None         # frame rate nominale di un file video, se la sorgente è un file
+        self.display = display         # False: nessun overlay di visualizzazione, solo registrazione
+        self.running = False
+
+        # ---- parametri dei volti e del frame ----
+        self.rect_color = (0, 255, 0)  # BGR
+        self.rect_thickness = 2
+        self.show_coords = False
+        self.zoom_factor = 1.0
+        self.gray_filter = False
+        self.last_frame = None
+        self.last_gray = None          # ultimo grigio elaborato, senza overlay: sorgente degli snapshot
+
+        # ---- overlay in cache, scelti separatamente per video e registrazione ----
+        self.overlay = Overlay()
+        self.display_overlays = set(OVERLAY_ELEMENTS)
+        self.record_overlays = set(OVERLAY_ELEMENTS)
+        self.fps_text = ""
+        self.fps_text_time = 0.0
+
+        # ---- metriche di latenza per stadio (spente: nessun costo) ----
+        self.metrics = Metrics()
+        self.metrics_exporter = None
+        self.show_metrics = False      # overlay di debug con i percentili, solo sul video
+
+        # ---------------- MOTION DETECTION ----------------
+        self.motion_enabled = True
+        self.motion_detector = MotionDetector()  # modello di sfondo su frame ridotto + maschere
+        if parent is None:
+            self.motion_detector.load_masks()  # le maschere salvate sono della camera principale
+        self.motion_pixels = 0
+        self.motion_regions = []       # (x, y, w, h) delle zone in movimento nell'ultimo frame
+        self.motion_threshold = MOTION_THRESHOLD
+        self.motion_last_seen = 0.0    # timestamp di cattura dell'ultimo frame con movimento
+        self.motion_grace_seconds = MOTION_GRACE_SECONDS
+        self.motion_recording_active = False
+        self.show_masks = False        # maschere disegnate sul frame (mentre si modificano)
+        self.mask_preview = None       # rettangolo normalizzato in corso di disegno
+        self.preroll_seconds = PREROLL_SECONDS
+        self.preroll = PreRollBuffer(seconds=self.preroll_seconds)
+
+        # ---- stato di registrazione ----
+        self.recording = False
+        self.video_writer = None
+        self.record_start_time = None
+        self.face_detection_counter = 0  # counts frames where faces were detected
+        self.closing_writers = []      # registrazioni fermate ma ancora in codifica
+        self.on_recording_changed = None
+        self.segment_seconds = RECORD_SEGMENT_SECONDS
+        # quota disco e conservazione, applicate in background ai segmenti già chiusi
+        self.storage = parent.storage if parent else StorageEvictor(lambda: self.save_path, self.recording_paths)
+
+        # ---- snapshot e burst, scritti su disco in background ----
+        self.image_writer = parent.image_writer if parent else ImageWriter()
+        self.burst_writer = parent.burst_writer if parent else ImageWriter(BURST_QUEUE_SIZE, name="burst-writer")
+        self.burst = None              # Burst in corso, alimentato dal thread di acquisizione
+        self.last_burst = None         # ultimo burst chiuso, con i propri contatori di scrittura
+
+        # ---- statistiche, ricavate dal journal degli eventi (scritto in background) ----
+        self.journal = parent.journal if parent else EventJournal()
+        self.save_path = parent.save_path if parent else self.journal.stats["save_path"] or os.getcwd()
+        self.location = parent.location if parent else DEFAULT_LOCATION
+
+        # ---- volti (cascade caricato in background, None finché non è pronto) ----
+        self.detector = None
+        self.detector_loaded = threading.Event()  # caricamento del cascade concluso (anche se fallito)
+        self.faces_enabled = True
+        self.face_tracking_enabled = True  # Haar ogni N frame + tracking, invece di Haar a ogni frame
+        self.face_tracker = FaceTracker()
+        self.face_detect_interval = FACE_DETECT_INTERVAL  # frame tra due Haar completi, prima dello scheduler
+        self.last_faces = ()           # ultimi volti di Haar senza tracking, riusati tra due rilevamenti
+
+        # ---- identità dei volti tracciati (una volta per track, in cache finché il track vive) ----
+        self.identity_enabled = parent is None  # i track id di camere diverse non vanno mescolati
+        self.identity_worker = IdentityWorker(identity_loader) if identity_loader else IdentityWorker()
+        self.identity_announced = {}   # track id -> nome già registrato nel journal
+        self.recording_identities = set()  # persone riconosciute durante la registrazione in corso
+        self.haar_wait = 0
+
+        # ---- oggetti noti e YOLO, ognuno sul proprio worker ----
+        self.recognition_enabled = parent is None
+        self.recognized_objects = []
+        self.recognition_color = (255, 0, 255)  # BGR, magenta
+        self.recognition_worker = RecognitionWorker(recognition_loader) if recognition_loader else RecognitionWorker()
+
+        self.yolo_enabled = True
+        self.yolo_interval = YOLO_DETECTION_INTERVAL
+        self.yolo_roi = False          # YOLO solo sui ritagli delle zone in movimento
+        self.yolo_rect_color = (0, 255, 0)  # BGR
+        self.yolo_rect_thickness = 2
+        self.yolo_results_cache = []   # Cache last YOLO results
+        self.yolo_results_frame_id = -1
+        self.yolo_present = set()      # classi nell'ultimo risultato, per gli eventi di comparsa
+        self.faces_present = False
+        self.yolo_worker = parent.yolo_worker if parent else YoloWorker(loader=yolo_loader)
+
+        # ---- acquisizione e contatori ----
+        self.frame_ring = FrameRing()
+        self.capture_thread = None
+        self.capture_latency = 0.0     # secondi tra la read() e l'elaborazione del frame
+        self.frame_counter = 0
+        self.prev_time = time.time()
+        self.fps = 0
+        self.fps_avg = 0.0             # media mobile, usata come frame rate delle registrazioni
+
+        # ---- frequenza di YOLO e Haar adattata al carico e al movimento ----
+        self.scheduler = FrameScheduler()
+        if parent is not None:
+            self.follow_parent()
+            parent.channels.append(self)
+
+    # ============================================================================================
+    # AVVIO E ARRESTO
+    # ============================================================================================
+    def start(self):
+        """Start the workers; the face cascade is loaded on a background thread.
+
+        The workers of features already disabled (headless --no-... options) are not
+        started at all, so their models are never loaded. An extra camera only starts its
+        own pre-roll and cascade: the shared workers belong to its parent.
+        """
+        self.preroll.start()
+        if self.parent is None:
+            if self.recognition_enabled:
+                self.recognition_worker.start()
+            if self.identity_enabled and self.faces_enabled:
+                self.identity_worker.start()
+            self.yolo_worker.start()
+            self.storage.start()
+            self.journal.start()
+            self.image_writer.start()
+            self.burst_writer.start()
+        threading.Thread(target=self.load_detector, name="haar-loader", daemon=True).start()
+
+    def load_detector(self):
+        """Load the Haar cascade; face detection starts when done."""
+        start = time.monotonic()
+        try:
+            detector = load_face_detector()
+            if detector.empty():
+                logger.error("Haar cascade loading failed")
+                return
+            self.face_tracker.detector = detector
+            self.detector = detector
+            logger.info("Avvio | cascade volti pronto in %.2fs", time.monotonic() - start)
+        finally:
+            self.detector_loaded.set()
+
+    def wait_ready(self, timeout=None):
+        """Block until every enabled detector has finished loading (or failed); for headless runs."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        workers = [w for enabled, w in (
+            (self.yolo_enabled, self.yolo_worker),
+            (self.recognition_enabled, self.recognition_worker),
+            (self.identity_enabled and self.faces_enabled, self.identity_worker),
+        ) if enabled and w.is_alive()]
+        events = [self.detector_loaded] if self.faces_enabled else []
+        # un worker che fallisce il caricamento termina senza segnalare ready
+        while any(not e.is_set() for e in events) or any(not w.ready.is_set() and w.is_alive() for w in workers):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def follow_parent(self):
+        """Copy the parent engine's CHANNEL_SETTINGS (extra cameras only)."""
+        parent = self.parent
+        for name in CHANNEL_SETTINGS:
+            setattr(self, name, getattr(parent, name))
+        self.preroll.seconds = parent.preroll.seconds
+
+    def close(self):
+        """Stop every thread, finalise the open recording and release the camera."""
+        self.release_camera()
+        if self.parent is None:
+            self.yolo_worker.stop()
+            self.recognition_worker.stop()
+            self.identity_worker.stop()
+            self.storage.stop()
+        else:
+            self.yolo_worker.clear(self.source)
+        self.preroll.stop()
+        self.set_metrics(False)
+        if self.video_writer:
+            self.video_writer.close()
+            self.closing_writers.append(self.video_writer)
+            self.video_writer = None
+        # attende la codifica dei frame in coda per non troncare i file
+        for writer in self.closing_writers:
+            writer.join()
+        self.closing_writers = []
+        if self.parent is not None:
+            if self in self.parent.channels:
+                self.parent.channels.remove(self)
+            return
+        self.image_writer.stop()       # le immagini in coda vengono comunque salvate
+        self.burst_writer.stop()
+        self.journal.stop()            # ultimi eventi e checkpoint delle statistiche
+
+    def set_metrics(self, enabled, export_path=METRICS_FILE):
+        """Turn the per-stage instrumentation on or off; while on, it is exported to export_path."""
+        if enabled == self.metrics.enabled:
+            return
+        self.metrics.enabled = enabled
+        if enabled:
+            self.metrics.reset()
+            if export_path:
+                self.metrics_exporter = MetricsExporter(self.metrics, export_path)
+                self.metrics_exporter.start()
+            logger.info("Metriche ATTIVATE | file=%s", export_path or "-")
+        elif self.metrics_exporter is not None:
+            self.metrics_exporter.stop()   # ultima scrittura con i campioni raccolti
+            self.metrics_exporter = None
+
+    # ============================================================================================
+    # STATISTICHE DI UTILIZZO, DAL JOURNAL DEGLI EVENTI
+    # ============================================================================================
+    @property
+    def photo_count(self):
+        return self.journal.stats["photos"]
+
+    @property
+    def video_count(self):
+        return self.journal.stats["videos"]
+
+    @property
+    def last_photo(self):
+        return self.journal.stats["last_photo"]
+
+    @property
+    def last_video(self):
+        return self.journal.stats["last_video"]
+
+    def record_event(self, kind, **fields):
+        """Journal an event; the events of an extra camera carry its name."""
+        if self.parent is not None:
+            fields["cam"] = self.current_cam_name
+        self.journal.record(kind, **fields)
+
+    def set_save_path(self, folder):
+        """Change the folder of photos and videos (remembered across restarts)."""
+        self.save_path = folder
+        self.journal.record("save_path", path=folder)
+
+    # ============================================================================================
+    # CAMERA E ACQUISIZIONE
+    # ============================================================================================
+    def open_camera(self, index, name, backend=cv2.CAP_MSMF):
+        """Switch to another webcam; returns False (keeping the old state) if it cannot be opened."""
+        was_running = self.running
+        # il thread di acquisizione va fermato prima di rilasciare la camera
+        self.release_camera()
+
+        self.cap = cv2.VideoCapture(index, backend)
+        if not self.cap.isOpened():
+            return False
+
+        self.current_cam_index = index
+        self.current_cam_name = name
+        self.motion_detector.reset()   # la scena è cambiata, riparte il modello di sfondo
+        self.face_tracker.reset()
+        self.preroll.clear()
+        if was_running:
+            self.start_capture()
+        return True
+
+    def start_capture(self):
+        """Start the background thread that reads frames from the camera."""
+        if self.capture_thread is not None:
+            return
+        self.frame_ring.reset()
+        self.capture_thread = CaptureThread(self.cap, self.frame_ring, name=self.current_cam_name)
+        self.capture_thread.start()
+        self.running = True
+
+    def release_camera(self):
+        """Stop capturing and release the camera, never while a read() is still running on it."""
+        if self.capture_thread is not None:
+            self.stop_capture(release=True)
+        elif self.cap is not None and self.cap.isOpened():
+            self.cap.release()
+
+    def stop_capture(self, release=False):
+        """Stop the capture thread and log how many stale frames were skipped.
+
+        With release=True the camera is released too: by the capture thread itself if its
+        read() is hung in the driver. Returns False in that case.
+        """
+        self.running = False
+        if self.capture_thread is None:
+            return True
+        finished = self.capture_thread.stop(release=release)
+        if not finished:
+            logger.warning(f"Capture '{self.current_cam_name}': read() still blocked, camera left to the capture thread")
+        if self.burst is not None:
+            self.capture_thread.tap = None
+            self._finish_burst()
+        logger.info(
+            "Acquisizione FERMATA | webcam=%s | frame letti=%d | frame scartati=%d",
+            self.current_cam_name,
+            self.capture_thread.frames_read,
+            self.frame_ring.dropped
+        )
+        self.capture_thread = None
+        self.frame_ring.dropped = 0
+        return finished
+
+    # ============================================================================================
+    # REGISTRAZIONE VIDEO, con salvataggio del file + LOGGING
+    # ============================================================================================
+    def start_recording(self, use_preroll=False, frame_size=None):
+        """Start recording, optionally from the pre-roll buffer; returns the file name."""
+        if not self.running:
+            raise EngineError("La camera deve essere attiva per registrare.")
+        if self.recording:
+            return None
+
+        filename = datetime.datetime.now().strftime(f"{self.record_prefix}_%Y%m%d_%H%M%S.mp4")
+        full_path = os.path.join(self.save_path, filename)
+
+        if frame_size is not None:
+            w, h = frame_size
+        elif self.last_frame is not None:
+            h, w = self.last_frame.shape[:2]
+        else:
+            w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # frame rate reale misurato (o quello del file), i timestamp di cattura correggono il resto
+        preroll = self.preroll.drain() if use_preroll else None
+        writer = RecordingWriter(
+            full_path, (w, h), fps=self.source_fps or self.fps_avg or RECORD_MAX_FPS, preroll=preroll,
+            segment_seconds=self.segment_seconds
+        )
+        if not writer.isOpened():
+            raise EngineError("Impossibile creare il file video.")
+        writer.start()
+
+        self.video_writer = writer
+        self.recording = True
+        self.record_start_time = time.time()
+        self.face_detection_counter = 0
+        self.recording_identities = set()
+        self.record_event("recording_start", file=filename, motion=use_preroll)
+
+        # LOG DI INIZIO
+        logger.info(
+            "Registrazione INIZIATA | file=%s | luogo=%s | frame pre-roll=%d",
+            filename,
+            self.location,
+            writer.preroll_frames
+        )
+        if self.on_recording_changed:
+            self.on_recording_changed(True)
+        return filename
+
+    def stop_recording(self):
+        """Stop recording; the file is finalised and logged by the writer thread."""
+        if not self.recording:
+            return
+        self.recording = False
+
+        # Calcolo durata per il log
+        if self.record_start_time:
+            duration_sec = int(time.time() - self.record_start_time)
+            duration_str = time.strftime("%H:%M:%S", time.gmtime(duration_sec))
+        else:
+            duration_str = "??:??:??"
+        face_frames = self.face_detection_counter
+        location = self.location
+        people = ", ".join(sorted(self.recording_identities)) or "-"
+
+        def log_closed(stats):
+            # LOG DI CHIUSURA, scritto dal thread di registrazione a file finalizzato
+            logger.info(
+                "Registrazione TERMINATA | durata=%s | frame con volti=%d | persone=%s | luogo=%s"
+                " | fps=%d | segmenti=%d | frame scritti=%d | duplicati=%d | decimati=%d | scartati=%d"
+                " | coda max=%d | encode medio=%.1fms | encode max=%.1fms",
+                duration_str,
+                face_frames,
+                people,
+                location,
+                stats["fps"],
+                stats["segments"],
+                stats["frames_written"],
+                stats["frames_duplicated"],
+                stats["frames_decimated"],
+                stats["frames_dropped"],
+                stats["max_queue_depth"],
+                stats["encode_ms_avg"],
+                stats["encode_ms_max"]
+            )
+
+        filename = None
+        if self.video_writer:
+            filename = os.path.basename(self.video_writer.path)
+            self.video_writer.close(on_closed=log_closed)
+            self.closing_writers = [w for w in self.closing_writers if w.is_alive()] + [self.video_writer]
+            self.video_writer = None
+
+        self.record_event("recording_stop", file=filename, duration=duration_str, face_frames=face_frames,
+                            people=sorted(self.recording_identities))
+
+        # Reset per prossima registrazione
+        self.face_detection_counter = 0
+        self.record_start_time = None
+        if self.on_recording_changed:
+            self.on_recording_changed(False)
+
+    def recording_paths(self):
+        """Return the segments being written right now, extra cameras included (never evicted)."""
+        writers = [w for w in self.closing_writers if w.is_alive()]
+        if self.video_writer is not None:
+            writers.append(self.video_writer)
+        paths = [w.segment_path for w in writers]
+        for channel in list(self.channels):
+            paths += channel.recording_paths()
+        return paths
+
+    # ============================================================================================
+    # SNAPSHOT
+    # ============================================================================================
+    def save_snapshot(self):
+        """Queue a grayscale snapshot of the last processed frame; returns the file path.
+
+        No camera read and no disk access here: the PNG is written by the image writer,
+        and the snapshot is counted once it is on disk.
+        """
+        gray = self.last_gray
+        if gray is None:
+            raise EngineError("Nessun frame da salvare: avviare la camera.")
+
+        filename = timestamped_name("snapshot", ".png")
+        full_path = os.path.join(self.save_path, filename)
+        # il grigio non viene più modificato dopo l'elaborazione: basta il riferimento
+        queued = self.image_writer.submit(
+            full_path, gray, on_saved=lambda path: self.record_event("snapshot", file=filename)
+        )
+        if not queued:
+            raise EngineError("Troppe foto in attesa di salvataggio, riprovare.")
+        return full_path
+
+    def start_burst(self, seconds=BURST_SECONDS):
+        """Save every captured frame for `seconds`, at the camera's full rate; returns the folder."""
+        if self.capture_thread is None:
+            raise EngineError("La camera deve essere attiva per il burst.")
+        if self.burst is not None:
+            return None
+        folder = os.path.join(self.save_path, timestamped_name("burst", ""))
+        try:
+            self.burst = Burst(self.burst_writer, folder, seconds, time.monotonic())
+        except OSError as e:
+            raise EngineError(f"Impossibile creare la cartella del burst: {e}")
+        self.capture_thread.tap = self._burst_frame
+        logger.info("Burst INIZIATO | cartella=%s | secondi=%s", os.path.basename(folder), seconds)
+        return folder
+
+    def _burst_frame(self, frame, timestamp):
+        """Capture-thread tap: hand the frame to the burst, finish it when time is up."""
+        burst = self.burst
+        if burst is None:
+            return False
+        if burst.push(frame, timestamp):
+            return True
+        self._finish_burst()
+        return False
+
+    def _finish_burst(self):
+        burst, self.burst = self.burst, None
+        if burst is None:
+            return
+        burst.close()
+        self.last_burst = burst
+        logger.info("Burst TERMINATO | cartella=%s | frame=%d | scartati=%d",
+                    os.path.basename(burst.folder), burst.frames, burst.dropped)
+        self.record_event("burst", folder=os.path.basename(burst.folder), frames=burst.frames)
+
+    # ============================================================================================
+    # LOOP PRINCIPALE DI ELABORAZIONE
+    # ============================================================================================
+    def step(self, timeout=0.0):
+        """Process the newest captured frame; returns the frame to display, or None."""
+        captured = self.frame_ring.get_latest(timeout)
+        if captured is None:
+            return None
+        self.capture_latency = time.monotonic() - captured.timestamp
+        self.metrics.observe("capture_latency", self.capture_latency)
+        return self.process(captured)
+
+    def process(self, captured):
+        """Run the whole pipeline on one CapturedFrame and return the frame to display."""
+        start = time.perf_counter()
+        timer = self.metrics.time      # contesto vuoto condiviso se le metriche sono spente
+        self.frame_counter += 1
+        if self.parent is not None:
+            self.follow_parent()
+
+        with timer("flip_cvtcolor"):
+            frame = cv2.flip(captured.image, 1)
+            # Convert to grayscale once - reuse for motion detection and face detection
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+            # ---- filtro bianco e nero ----
+            if self.gray_filter:
+                frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+        # ---- zoom digitale ----
+        if self.zoom_factor > 1.0:
+            with timer("zoom"):
+                h, w = frame.shape[:2]
+                new_w = int(w / self.zoom_factor)
+                new_h = int(h / self.zoom_factor)
+                x1 = (w - new_w) // 2
+                y1 = (h - new_h) // 2
+                frame = frame[y1:y1+new_h, x1:x1+new_w]
+                frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_LINEAR)
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # ---- movimento e registrazione automatica ----
+        if self.motion_enabled:
+            with timer("motion"):
+                self.update_motion(gray, captured.timestamp, frame.shape[1::-1])
+
+        # ---- scena ferma: niente inferenza; al primo movimento si riparte da un rilevamento completo ----
+        self.scheduler.update(self.motion_pixels if self.motion_enabled else None, captured.timestamp)
+        if self.scheduler.woke:
+            self.face_tracker.reset()
+
+        # ---- invio al worker di riconoscimento oggetti noti (lavora sul grigio, mai modificato) ----
+        if self.recognition_enabled and not self.scheduler.idle and self.frame_counter % RECOGNITION_INTERVAL == 0:
+            self.recognition_worker.submit(gray, captured.frame_id, captured.timestamp)
+
+        # ---- invio al worker YOLO, prima di disegnare qualsiasi overlay sul frame ----
+        if self.yolo_enabled and self.scheduler.run_yolo(self.yolo_interval):
+            with timer("yolo_submit"):
+                regions = self.motion_regions if self.yolo_roi and self.motion_enabled else None
+                self.yolo_worker.submit(frame.copy(), captured.frame_id, captured.timestamp, self.source, regions)
+
+        faces = self.draw_faces(frame, gray)
+
+        # ---- FPS di elaborazione ----
+        now = time.time()
+        self.fps = 1.0 / max(now - self.prev_time, 0.0001)
+        self.fps_avg = self.fps if not self.fps_avg else 0.9 * self.fps_avg + 0.1 * self.fps
+        self.prev_time = now
+
+        with timer("overlay"):
+            self.update_detection_overlays(captured.timestamp)
+            self.update_hud_overlays(frame.shape[0], now)
+            self.update_mask_overlay(frame.shape[1], frame.shape[0])
+
+            # ---- composizione: il frame registrato ha i suoi overlay, copiato solo se diversi ----
+            recording = bool(self.recording and self.video_writer)
+            # livelli di solo video (metriche, maschere in modifica): mai nel registrato né nel pre-roll
+            display_only = self.display_only_overlays() if self.display else ()
+            record_frame = frame
+            if not self.display:
+                self.overlay.composite(frame, self.record_overlays)
+            elif (recording or self.motion_enabled) and (self.record_overlays != self.display_overlays or display_only):
+                record_frame = frame.copy()
+                self.overlay.composite(record_frame, self.record_overlays)
+                self.overlay.composite(frame, self.display_overlays)
+            else:
+                self.overlay.composite(frame, self.display_overlays)
+            if display_only:
+                self.overlay.composite(frame, display_only)
+
+        with timer("record"):
+            if recording:
+                # accoda il frame al thread di registrazione (mai codificato qui), con i rilevamenti per l'indice
+                detections = self.yolo_results_cache if self.yolo_enabled else None
+                self.video_writer.write(record_frame, captured.timestamp, faces, detections)
+            elif self.motion_enabled:
+                # fuori registrazione il frame alimenta il pre-roll compresso
+                self.preroll.push(record_frame, captured.timestamp)
+
+        # il frame non viene più modificato da qui in poi: niente copia, basta il riferimento
+        self.last_frame = frame
+        self.last_gray = gray
+        elapsed = time.perf_counter() - start
+        self.scheduler.observe_frame(elapsed)
+        if self.metrics.enabled:
+            self.metrics.observe("total", elapsed)
+            self.metrics.set_gauge("fps", round(self.fps_avg, 1))
+            self.metrics.set_gauge("schedule_factor", round(self.scheduler.factor, 2))
+            self.metrics.set_gauge("inference_idle", int(self.scheduler.idle))
+            self.metrics.set_gauge("yolo_roi_cost", round(self.yolo_worker.roi_cost, 3))
+        return frame
+
+    def update_motion(self, gray, timestamp, frame_size):
+        """Background-model motion detection; starts/stops the motion recording."""
+        # sottrazione dello sfondo su copia ridotta, solo dentro le maschere
+        motion = self.motion_detector.update(gray)
+        self.motion_pixels = motion.motion_pixels
+        self.motion_regions = motion.regions
+
+        try:
+            # Motion detected: start recording ONLY if not already recording
+            if self.motion_pixels > self.motion_threshold:
+                self.motion_last_seen = timestamp
+                if not self.recording:
+                    self.start_recording(use_preroll=True, frame_size=frame_size)
+                    self.motion_recording_active = True
+
+            # No motion detected for X seconds
+            elif (
+                self.motion_recording_active
+                and self.recording
+                and timestamp - self.motion_last_seen > self.motion_grace_seconds
+            ):
+                self.stop_recording()
+                self.motion_recording_active = False
+        except EngineError as e:
+            logger.warning(f"Motion recording failed: {e}")
+
+    def draw_faces(self, frame, gray):
+        """Detect (or track) faces, outline them on the frame and return their boxes."""
+        # ---- rilevazione volti (saltata finché il cascade non è caricato o con la scena ferma) ----
+        if self.detector is None or not self.faces_enabled or self.scheduler.idle:
+            faces = ()
+        elif self.face_tracking_enabled:
+            self.face_tracker.detect_interval = self.scheduler.face_interval(self.face_detect_interval)
+            with self.metrics.time("faces"):
+                faces = self.face_tracker.update(gray)
+        else:
+            # Haar completo a ogni frame, o ogni N frame se il carico lo richiede
+            self.haar_wait += 1
+            if self.scheduler.woke or self.haar_wait >= self.scheduler.face_interval(1):
+                self.haar_wait = 0
+                with self.metrics.time("faces"):
+                    self.last_faces = self.detector.detectMultiScale(
+                        gray, scaleFactor=1.3, minNeighbors=5, minSize=(40, 40))
+            faces = self.last_faces
+
+        # Conta i frame dove sono stati rilevati volti (non il numero totale di volti)
+        if self.recording and len(faces) > 0:
+            self.face_detection_counter += 1
+        # evento solo alla comparsa, non per ogni frame con volti
+        if (len(faces) > 0) != self.faces_present:
+            self.faces_present = len(faces) > 0
+            if self.faces_present:
+                self.record_event("detection", cls="face", count=len(faces))
+
+        # identità solo per i volti tracciati: senza tracking non c'è un id a cui legarla
+        track_ids = self.face_tracker.track_ids if self.face_tracking_enabled and len(faces) else []
+        names = self.update_identities(frame, faces, track_ids)
+
+        for x, y, w, h in faces:
+            cv2.rectangle(frame, (x, y), (x+w, y+h), self.rect_color, self.rect_thickness)
+            if self.show_coords:
+                cv2.putText(
+                    frame, f"{x},{y}", (x, y-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1
+                )
+        # nomi come patch in cache: ridisegnati solo quando un nome compare o un volto si sposta
+        labels = tuple((name, int(x), int(y + h + 20)) for (x, y, w, h), name in zip(faces, names) if name)
+        self.overlay.update("identities", (labels, self.rect_color),
+                            lambda: [("text", name, (x, y), 0.6, self.rect_color, 2) for name, x, y in labels])
+        return faces
+
+    def update_identities(self, frame, faces, track_ids):
+        """Send new face tracks to the identity worker; return the cached name of each face."""
+        if not self.identity_enabled or not track_ids:
+            self.identity_announced = {}
+            return [None] * len(faces)
+        worker = self.identity_worker
+        worker.forget(track_ids)
+        now = time.monotonic()
+        names = []
+        for box, track_id in zip(faces, track_ids):
+            if worker.needs(track_id, now):
+                crop = face_crop(frame, box)
+                if crop is not None:
+                    worker.submit(track_id, crop, now)
+            identity = worker.identity(track_id)
+            if identity is None or not identity.known:
+                names.append(identity.name if identity is not None else None)
+                continue
+            names.append(identity.name)
+            if self.identity_announced.get(track_id) != identity.name:
+                self.identity_announced[track_id] = identity.name
+                self.record_event("identity", name=identity.name, score=round(identity.score, 3))
+            if self.recording and identity.name not in self.recording_identities:
+                self.recording_identities.add(identity.name)
+                logger.info(
+                    "Volto RICONOSCIUTO | nome=%s | somiglianza=%.2f | file=%s",
+                    identity.name,
+                    identity.score,
+                    os.path.basename(self.video_writer.path) if self.video_writer else "-"
+                )
+        live = set(track_ids)
+        self.identity_announced = {t: n for t, n in self.identity_announced.items() if t in live}
+        return names
+
+    def update_detection_overlays(self, timestamp):
+        """Refresh the YOLO and known-object overlays from the workers' latest results."""
+        # ---- YOLO (asincrono, risultati letti senza attendere il worker) ----
+        if self.yolo_enabled:
+            result = self.yolo_worker.latest_result(self.source)
+            if result is not None and result.frame_id != self.yolo_results_frame_id:
+                self.yolo_results_cache = result.detections
+                self.yolo_results_frame_id = result.frame_id
+                # l'inferenza gira sul worker: si registra la durata misurata lì
+                self.metrics.observe("yolo_inference", result.inference_time)
+                self.scheduler.observe_yolo(result.inference_time)
+                # eventi per le classi appena comparse
+                present = {d['name'] for d in result.detections}
+                for name in present - self.yolo_present:
+                    self.record_event("detection", cls=name)
+                self.yolo_present = present
+            if result is not None and timestamp - result.timestamp > YOLO_RESULT_MAX_AGE:
+                self.yolo_results_cache = []  # risultati troppo vecchi per essere ancora validi
+
+            # i box vengono ridisegnati solo quando arriva un nuovo risultato
+            self.overlay.update(
+                "yolo",
+                (self.yolo_results_frame_id, len(self.yolo_results_cache), self.yolo_rect_color, self.yolo_rect_thickness),
+                lambda: box_ops(
+                    [(d['x1'], d['y1'], d['x2'], d['y2'], d['label']) for d in self.yolo_results_cache],
+                    self.yolo_rect_color, self.yolo_rect_thickness
+                )
+            )
+        else:
+            self.overlay.remove("yolo")
+
+        # ---- oggetti noti riconosciuti ----
+        if self.recognition_enabled:
+            result = self.recognition_worker.latest_result()
+            if result is not None:
+                self.recognized_objects = result.objects
+                if timestamp - result.timestamp > YOLO_RESULT_MAX_AGE:
+                    self.recognized_objects = []
+            boxes = [(o['x1'], o['y1'], o['x2'], o['y2'], f"{o['name']} ({o['matches']})")
+                     for o in self.recognized_objects]
+            self.overlay.update("objects", tuple(boxes),
+                                lambda: box_ops(boxes, self.recognition_color, 2, label_scale=0.6))
+        else:
+            self.overlay.remove("objects")
+
+    def update_hud_overlays(self, frame_h, now):
+        """Refresh the FPS, date, REC timer and location overlays (redrawn only on change)."""
+        # il testo FPS cambia al massimo ogni OVERLAY_FPS_REFRESH secondi, non a ogni frame
+        if now - self.fps_text_time >= OVERLAY_FPS_REFRESH:
+            self.fps_text = f"FPS: {int(self.fps)}"
+            self.fps_text_time = now
+        self.overlay.update("fps", self.fps_text,
+                            lambda: [("text", self.fps_text, (10, 30), 1, (0, 255, 255), 2)])
+
+        # ---- informazioni data (ridisegnata una volta al secondo) ----
+        self.overlay.update(
+            "date", (int(now), frame_h),
+            lambda: [("text", datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                      (10, frame_h - 10), 0.6, (200, 200, 200), 2)]
+        )
+
+        # ---- registrazione con tempo e luogo ----
+        recording = bool(self.recording and self.video_writer)
+        timer_str = ""
+        if recording:
+            elapsed = int(time.time() - self.record_start_time)
+            timer_str = time.strftime("%H:%M:%S", time.gmtime(elapsed))
+            self.overlay.update("rec", timer_str, lambda: [
+                ("circle", (20, 60), 10, (0, 0, 255), -1),   # cerchio di registrazione rosso
+                ("text", "REC", (40, 65), 0.7, (0, 0, 255), 2),
+                ("text", timer_str, (100, 65), 0.8, (255, 255, 255), 2),
+            ])
+        else:
+            self.overlay.remove("rec")
+
+        # a destra del timer: la larghezza del timer fa parte della chiave, così il luogo si sposta con lui
+        if recording:
+            (tx_w, _), _ = cv2.getTextSize(timer_str, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+            position = (100 + tx_w + 12, 65)
+        else:
+            # se non stiamo registrando, mostra comunque la posizione
+            position = (10, frame_h - 40)
+        self.overlay.update("location", (self.location, position),
+                            lambda: [("text", self.location, position, 0.6, (200, 200, 200), 2)])
+
+        # ---- percentili di latenza per stadio (debug), aggiornati come il testo FPS ----
+        if self.show_metrics and self.metrics.enabled:
+            self.overlay.update("metrics", self.fps_text_time, self.metrics_ops)
+        else:
+            self.overlay.remove("metrics")
+
+    def display_only_overlays(self):
+        """Names of the overlays shown on the video but never recorded."""
+        names = []
+        if self.show_metrics and self.metrics.enabled:
+            names.append("metrics")
+        if self.show_masks:
+            names.append("masks")
+        return tuple(names)
+
+    def metrics_ops(self):
+        """Drawing operations of the debug overlay: p50/p99 latency of every stage."""
+        ops = [("text", "stadio           p50 / p99 ms", (10, 100), 0.5, (0, 255, 255), 1)]
+        for row, (name, p50, p99, _) in enumerate(self.metrics.summary(), start=1):
+            ops.append(("text", f"{name:<16} {p50:6.1f} / {p99:6.1f}", (10, 100 + 18 * row), 0.5, (0, 255, 255), 1))
+        return ops
+
+    def update_mask_overlay(self, frame_w, frame_h):
+        """Outline the include (green) and exclude (red) motion masks, as a display-only overlay."""
+        if not self.show_masks:
+            self.overlay.remove("masks")
+            return
+        rects = [(r, (0, 200, 0)) for r in self.motion_detector.include]
+        rects += [(r, (0, 0, 220)) for r in self.motion_detector.exclude]
+        if self.mask_preview is not None:
+            rects.append((self.mask_preview, (0, 255, 255)))
+        self.overlay.update(
+            "masks", (tuple(rects), frame_w, frame_h),
+            lambda: [("rect", (int(x1 * frame_w), int(y1 * frame_h)), (int(x2 * frame_w), int(y2 * frame_h)), color, 2)
+                     for (x1, y1, x2, y2), color in rects]
+        )
+
+    # ============================================================================================
+    # SORGENTI SENZA INTERFACCIA
+    # ============================================================================================
+    def run_camera(self, duration=None, max_frames=None):
+        """Process the live camera until duration/max_frames is reached or Ctrl+C."""
+        self.start_capture()
+        start = time.monotonic()
+        frames = 0
+        try:
+            while max_frames is None or frames < max_frames:
+                if duration is not None and time.monotonic() - start >= duration:
+                    break
+                if self.step(CAPTURE_POLL_TIMEOUT) is not None:
+                    frames += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_recording()
+            self.stop_capture()
+        return self._summary(self.current_cam_name, frames, time.monotonic() - start)
+
+    def run_file(self, path, realtime=False, max_frames=None):
+        """Process every frame of a video file, as fast as possible unless realtime is set.
+
+        Capture timestamps follow the file's own clock, so motion grace periods, result
+        ageing and recording frame rate behave as they would live, at any processing speed.
+        """
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise EngineError(f"Impossibile aprire il file video {path}.")
+        self.source_fps = cap.get(cv2.CAP_PROP_FPS) or None
+        self.running = True
+
+        start = time.monotonic()
+        frames = 0
+        try:
+            while max_frames is None or frames < max_frames:
+                ret, image = cap.read()
+                if not ret:
+                    break
+                if self.source_fps:
+                    video_time = frames / self.source_fps
+                else:
+                    video_time = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if realtime:
+                    delay = start + video_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.process(CapturedFrame(frames, start + video_time, image))
+                frames += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_recording()
+            self.running = False
+            cap.release()
+        return self._summary(path, frames, time.monotonic() - start)
+
+    def _summary(self, source, frames, elapsed):
+        """Log and return the throughput of a headless run."""
+        summary = {
+            "source": str(source),
+            "frames": frames,
+            "seconds": round(elapsed, 3),
+            "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "yolo_frames": self.yolo_worker.frames_processed,
+            "yolo_roi_frames": self.yolo_worker.frames_roi,
+            "videos": self.video_count,
+            "schedule_factor": round(self.scheduler.factor, 2),
+        }
+        if self.metrics.enabled:
+            summary["stages"] = {
+                name: {"p50_ms": round(p50, 3), "p99_ms": round(p99, 3), "count": count}
+                for name, p50, p99, count in self.metrics.summary()
+            }
+        logger.info(
+            "Elaborazione TERMINATA | sorgente=%s | frame=%d | durata=%.2fs | fps=%.1f | frame YOLO=%d",
+            summary["source"], frames, elapsed, summary["fps"], summary["yolo_frames"]
+        )
+        return summary
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO SENZA INTERFACCIA
+# =============================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline FaceApp senza interfaccia grafica.")
+    parser.add_argument("--source", default=None,
+                        help="indice della webcam o percorso di un file video (default: prima webcam)")
+    parser.add_argument("--duration", type=float, default=None, help="secondi di elaborazione (webcam)")
+    parser.add_argument("--frames", type=int, default=None, help="numero massimo di frame")
+    parser.add_argument("--realtime", action="store_true", help="su file, rispetta il frame rate originale")
+    parser.add_argument("--no-yolo", action="store_true", help="disattiva YOLO")
+    parser.add_argument("--no-faces", action="store_true", help="disattiva il rilevamento volti")
+    parser.add_argument("--no-identity", action="store_true", help="disattiva il riconoscimento delle persone")
+    parser.add_argument("--no-recognition", action="store_true", help="disattiva gli oggetti noti")
+    parser.add_argument("--no-motion", action="store_true", help="disattiva movimento e registrazione automatica")
+    parser.add_argument("--yolo-backend", default=YOLO_BACKEND, choices=["auto", *BACKENDS],
+                        help="backend di inferenza di YOLO (auto = il più veloce disponibile)")
+    parser.add_argument("--yolo-size", type=int, default=YOLO_INPUT_SIZE, help="lato dell'ingresso di YOLO")
+    parser.add_argument("--yolo-roi", action="store_true", help="YOLO solo sulle zone in movimento")
+    parser.add_argument("--fixed-schedule", action="store_true",
+                        help="intervalli fissi di YOLO e Haar, inferenza anche con la scena ferma")
+    parser.add_argument("--save-path", default=None, help="cartella delle registrazioni")
+    parser.add_argument("--segment", type=float, default=RECORD_SEGMENT_SECONDS,
+                        help="secondi per segmento di registrazione (0 = file unico)")
+    parser.add_argument("--quota-gb", type=float, default=None, help="spazio massimo delle registrazioni (predefinito: nessuna quota)")
+    parser.add_argument("--retention-days", type=float, default=None, help="età massima delle registrazioni (predefinito: nessun limite)")
+    parser.add_argument("--metrics", nargs="?", const=METRICS_FILE, default=None,
+                        help="latenza per stadio, esportata in formato Prometheus (default: %(const)s)")
+    args = parser.parse_args(argv)
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s | %(levelname)s | %(message)s'))
+    queued_logging(console)
+
+    # senza YOLO il modello (e ultralytics) non viene nemmeno caricato
+    yolo_loader = None if args.no_yolo else functools.partial(load_yolo_model, args.yolo_backend, args.yolo_size)
+    is_file = args.source is not None and not args.source.isdigit()
+    if is_file:
+        engine = Engine(yolo_loader=yolo_loader, display=False)
+    elif args.source is not None:
+        index = int(args.source)
+        cap = cv2.VideoCapture(index, cv2.CAP_MSMF)
+        if not cap.isOpened():
+            sys.exit(f"Impossibile aprire la webcam {index}.")
+        engine = Engine(cap, index, f"Webcam {index}", yolo_loader=yolo_loader, display=False)
+    else:
+        cap, indices, names = open_first_webcam()
+        engine = Engine(cap, indices[0], names[0], yolo_loader=yolo_loader, display=False)
+
+    engine.yolo_enabled = not args.no_yolo
+    engine.faces_enabled = not args.no_faces
+    engine.recognition_enabled = not args.no_recognition
+    engine.identity_enabled = not args.no_identity
+    engine.motion_enabled = not args.no_motion
+    engine.scheduler.enabled = not args.fixed_schedule
+    engine.yolo_roi = args.yolo_roi
+    if args.save_path:
+        engine.save_path = args.save_path
+    engine.segment_seconds = args.segment
+    if args.quota_gb is not None:
+        engine.storage.quota_gb = args.quota_gb
+    if args.retention_days is not None:
+        engine.storage.retention_days = args.retention_days
+    if args.metrics:
+        engine.set_metrics(True, args.metrics)
+
+    # il luogo arriva in background (rete solo se la cache è scaduta), come nell'interfaccia
+    def load_location():
+        engine.location = resolve_location()
+    threading.Thread(target=load_location, name="location", daemon=True).start()
+
+    engine.start()
+    # si misura solo la pipeline completa: niente frame elaborati prima che i rilevatori siano pronti
+    start = time.monotonic()
+    engine.wait_ready()
+    logger.info("Avvio | rilevatori pronti in %.2fs", time.monotonic() - start)
+
+    try:
+        if is_file:
+            summary = engine.run_file(args.source, realtime=args.realtime, max_frames=args.frames)
+        else:
+            summary = engine.run_camera(duration=args.duration, max_frames=args.frames)
+    finally:
+        engine.close()
+    print(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# =============================================================================================
+# FACE TRACKER - rilevamento Haar ogni N frame su immagine ridotta, tracking leggero in mezzo
+# =============================================================================================
+import cv2
+import numpy as np
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+FACE_DETECT_INTERVAL = 10         # frame tra due rilevamenti completi
+FACE_DETECT_WIDTH = 640           # larghezza dell'immagine su cui lavorano detection e tracking
+FACE_MIN_SIZE = 40                # lato minimo di un volto sull'immagine originale (px)
+FACE_ROI_MARGIN = 0.5             # margine (in lati del volto) della ricerca attorno a un volto perso
+FACE_MIN_POINTS = 6               # punti sopravvissuti al flusso ottico sotto cui il track è perso
+FACE_MAX_POINTS = 30              # feature seguite per ogni volto
+FACE_MAX_MISSES = 1               # rilevamenti completi consecutivi che un track può mancare
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+class FaceTracker:
+    """Detect faces every few frames and follow them with optical flow in between.
+
+    The full Haar detection runs every `detect_interval` frames on a copy scaled to
+    `detect_width`. Between detections each face is moved by the median Lucas-Kanade
+    displacement of a few corner points inside it; when a face loses too many points,
+    Haar is re-run only on a small region around its last position.
+
+    Every track keeps an id for as long as the face is followed (`track_ids`, parallel to
+    the boxes returned by `update`): a re-detection overlapping a track inherits its id.
+    """
+
+    def __init__(self, detector=None, detect_interval=FACE_DETECT_INTERVAL, detect_width=FACE_DETECT_WIDTH):
+        self.detector = detector
+        self.detect_interval = detect_interval
+        self.detect_width = detect_width
+        self.frames_since_detect = 0
+        self.full_detections = 0
+        self.roi_detections = 0
+        self.track_ids = []           # id dei volti restituiti dall'ultimo update, nello stesso ordine
+        self._next_id = 0
+        self._prev_small = None
+        self._tracks = []             # [box (x, y, w, h) sull'immagine ridotta, punti Nx1x2 float32, mancati, id]
+
+    def reset(self):
+        """Forget every track; the next update runs a full detection."""
+        self._prev_small = None
+        self._tracks = []
+        self.track_ids = []
+        self.frames_since_detect = 0
+
+    def update(self, gray):
+        """Return the face boxes (x, y, w, h) for this grey frame, in its own coordinates."""
+        if self.detector is None:
+            self.track_ids = []
+            return []
+        h, w = gray.shape[:2]
+        scale = min(1.0, self.detect_width / float(w))
+        small = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+        if self._prev_small is None or self._prev_small.shape != small.shape:
+            self._tracks = [self._new_track(small, box) for box in self._detect(small, scale)]
+            self.frames_since_detect = 0
+            self.full_detections += 1
+        elif self.frames_since_detect >= self.detect_interval:
+            self._tracks = self._redetect(small, scale)
+            self.frames_since_detect = 0
+            self.full_detections += 1
+        else:
+            self._tracks = self._follow(small, scale)
+            self.frames_since_detect += 1
+
+        self._prev_small = small
+        self.track_ids = [track[3] for track in self._tracks]
+        return [tuple(int(round(v / scale)) for v in box) for box, _, _, _ in self._tracks]
+
+    # ============================================================================================
+    # RILEVAMENTO
+    # ============================================================================================
+    def _detect(self, small, scale, roi=None):
+        """Run Haar on the whole small image or on a region of it; boxes in small coordinates."""
+        min_side = max(20, int(FACE_MIN_SIZE * scale))
+        x0, y0 = 0, 0
+        image = small
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            image = small[y0:y1, x0:x1]
+            if image.shape[0] < min_side or image.shape[1] < min_side:
+                return []
+        faces = self.detector.detectMultiScale(image, scaleFactor=1.3, minNeighbors=5, minSize=(min_side, min_side))
+        return [(x + x0, y + y0, fw, fh) for (x, y, fw, fh) in faces]
+
+    def _new_track(self, small, box, track_id=None):
+        """Pick the corner points to follow inside a face box; a new id unless one is given."""
+        x, y, w, h = box
+        mask = np.zeros_like(small)
+        mask[y:y + h, x:x + w] = 255
+        points = cv2.goodFeaturesToTrack(small, FACE_MAX_POINTS, 0.01, 3, mask=mask)
+        if points is None:
+            points = np.empty((0, 1, 2), np.float32)
+        if track_id is None:
+            track_id = self._next_id
+            self._next_id += 1
+        return [box, points, 0, track_id]
+
+    def _redetect(self, small, scale):
+        """Full detection that keeps still-tracked faces the cascade missed this time."""
+        followed = self._follow(small, scale, recover=False)
+        detected = []
+        for box in self._detect(small, scale):
+            # lo stesso volto ritrovato conserva il proprio id (e la sua identità)
+            overlaps = [t for t in followed if _iou(t[0], box) > 0.3]
+            same = max(overlaps, key=lambda t: _iou(t[0], box))[3] if overlaps else None
+            detected.append(self._new_track(small, box, same))
+        taken = {d[3] for d in detected}
+        for track in followed:
+            if track[3] in taken or any(_iou(track[0], d[0]) > 0.3 for d in detected):
+                continue
+            track[2] += 1
+            if track[2] <= FACE_MAX_MISSES:
+                detected.append(track)
+        return detected
+
+    # ============================================================================================
+    # TRACKING
+    # ============================================================================================
+    def _follow(self, small, scale, recover=True):
+        """Move every track by optical flow; re-detect in a ROI the ones that are lost."""
+        tracks = []
+        for box, points, misses, track_id in self._tracks:
+            if len(points) >= FACE_MIN_POINTS:
+                new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_small, small, points, None, **LK_PARAMS)
+                good = status.reshape(-1) == 1
+                if good.sum() >= FACE_MIN_POINTS:
+                    old, new = points[good].reshape(-1, 2), new_points[good].reshape(-1, 2)
+                    dx, dy = np.median(new - old, axis=0)
+                    x, y, w, h = box
+                    tracks.append([(int(round(x + dx)), int(round(y + dy)), w, h), new.reshape(-1, 1, 2), misses, track_id])
+                    continue
+            if not recover:
+                continue
+
+            # track perso: nuova ricerca Haar solo nella zona dell'ultima posizione nota
+            x, y, w, h = box
+            mx, my = int(w * FACE_ROI_MARGIN), int(h * FACE_ROI_MARGIN)
+            roi = (max(0, x - mx), max(0, y - my), min(small.shape[1], x + w + mx), min(small.shape[0], y + h + my))
+            self.roi_detections += 1
+            for n, found in enumerate(self._detect(small, scale, roi)):
+                # il primo volto ritrovato nella zona è lo stesso track
+                tracks.append(self._new_track(small, found, track_id if n == 0 else None))
+        return tracks
+
+
+def _iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
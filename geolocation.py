@@ -0,0 +1,60 @@
+# =============================================================================================
+# GEOLOCALIZZAZIONE - località da IP con cache su disco e scadenza (TTL)
+# =============================================================================================
+import json
+import time
+import logging
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+GEO_CACHE_FILE = "location.json"
+GEO_CACHE_TTL = 6 * 3600          # secondi di validità della località in cache
+DEFAULT_LOCATION = "Località sconosciuta"
+
+
+def load_cached_location(path=GEO_CACHE_FILE, ttl=GEO_CACHE_TTL):
+    """Return (location, fresh) from the cache; location is None if there is no cache."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data["location"], time.time() - data["timestamp"] < ttl
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, False
+
+
+def save_cached_location(location, path=GEO_CACHE_FILE):
+    """Store a resolved location with the current time."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"location": location, "timestamp": time.time()}, f, indent=4)
+    except OSError as e:
+        logger.warning(f"Failed to save location cache: {e}")
+
+
+def fetch_location():
+    """Resolve "City, Country" from the public IP; blocking, returns None on any error."""
+    try:
+        import geocoder  # import lento (requests), eseguito solo quando serve
+        g = geocoder.ip("me")
+        if g.city or g.country:
+            city = g.city or ""
+            country = g.country or ""
+            return f"{city}, {country}".strip(", ")
+    except Exception as e:
+        logger.debug(f"Geolocation failed: {e}")
+    return None
+
+
+def resolve_location(path=GEO_CACHE_FILE, ttl=GEO_CACHE_TTL):
+    """Return a fresh cached location or look it up, falling back to a stale cache entry."""
+    cached, fresh = load_cached_location(path, ttl)
+    if cached and fresh:
+        return cached
+    location = fetch_location()
+    if location:
+        save_cached_location(location, path)
+        return location
+    return cached or DEFAULT_LOCATION
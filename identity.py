@@ -0,0 +1,330 @@
+# =============================================================================================
+# IDENTITÀ - riconoscimento dei volti tracciati contro la galleria delle persone arruolate
+# =============================================================================================
+#   Il box Haar viene ritagliato con margine; YuNet vi trova i 5 punti del volto (occhi,
+#   naso, angoli della bocca) e alignCrop lo raddrizza a 112x112, l'ingresso su cui SFace
+#   è stato addestrato e per cui vale la soglia 0.363. SFace (FaceRecognizerSF, su CPU)
+#   lo trasforma in un vettore di 128 valori a norma unitaria. La galleria
+#   è un'unica matrice float32 (una riga per foto arruolata): il confronto con tutti gli
+#   arruolati è un solo prodotto matrice-vettore. Ogni volto viene riconosciuto una sola
+#   volta per track e il risultato resta in cache finché il tracker non lo perde.
+#
+#   I due modelli ONNX non sono nel repository: si scaricano una volta in models/ con
+#
+#       python identity.py download
+#       python identity.py enroll NOME foto1.jpg [foto2.jpg ...]
+#       python identity.py list
+# =============================================================================================
+import os
+import sys
+import time
+import logging
+import threading
+import urllib.request
+
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+MODELS_DIR = os.path.join(getattr(sys, "_MEIPASS", ""), "models")   # nel build, accanto ai dati
+FACE_MODEL_PATH = os.path.join(MODELS_DIR, "face_recognition_sface_2021dec.onnx")
+FACE_DETECTOR_PATH = os.path.join(MODELS_DIR, "face_detection_yunet_2023mar.onnx")
+FACE_MODEL_URLS = {
+    FACE_MODEL_PATH: "https://github.com/opencv/opencv_zoo/raw/main/models/face_recognition_sface/face_recognition_sface_2021dec.onnx",
+    FACE_DETECTOR_PATH: "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+}
+GALLERY_FILE = os.path.join("known_faces", "gallery.npz")
+FACE_CROP_MARGIN = 0.3            # margine attorno al box Haar: YuNet deve vedere il volto intero
+FACE_LANDMARK_SCORE = 0.6         # confidenza minima di YuNet sui punti del volto
+IDENTITY_THRESHOLD = 0.363        # somiglianza coseno minima (riferimento di SFace, volti allineati)
+IDENTITY_RETRY_SECONDS = 2.0      # un volto sconosciuto viene riprovato dopo questo intervallo
+UNKNOWN_NAME = "Sconosciuto"
+
+
+@dataclass
+class Identity:
+    """Outcome of the recognition of one face track."""
+    name: str
+    score: float
+    timestamp: float
+
+    @property
+    def known(self):
+        return self.name != UNKNOWN_NAME
+
+
+def face_crop(frame, box, margin=FACE_CROP_MARGIN):
+    """Cut a face box (x, y, w, h), with a small margin, out of a BGR frame."""
+    x, y, w, h = box
+    mx, my = int(w * margin), int(h * margin)
+    fh, fw = frame.shape[:2]
+    x1, y1 = max(x - mx, 0), max(y - my, 0)
+    x2, y2 = min(x + w + mx, fw), min(y + h + my, fh)
+    if x2 - x1 < 8 or y2 - y1 < 8:
+        return None
+    return frame[y1:y2, x1:x2].copy()
+
+
+# =============================================================================================
+# MODELLO E GALLERIA
+# =============================================================================================
+class FaceEmbedder:
+    """YuNet landmarks + SFace: BGR face crop -> aligned, unit-length float32 embedding."""
+
+    def __init__(self, model_path=FACE_MODEL_PATH, detector_path=FACE_DETECTOR_PATH):
+        for path in (model_path, detector_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"modello dei volti non trovato: {path} (python identity.py download)")
+        self.recognizer = cv2.FaceRecognizerSF.create(model_path, "")
+        self.detector = cv2.FaceDetectorYN.create(detector_path, "", (320, 320), FACE_LANDMARK_SCORE)
+
+    def align(self, crop):
+        """Return the 112x112 aligned face of a crop, or None if YuNet finds no face in it."""
+        h, w = crop.shape[:2]
+        self.detector.setInputSize((w, h))
+        _, faces = self.detector.detect(crop)
+        if faces is None or not len(faces):
+            return None
+        # il volto più grande: il ritaglio è centrato sul box Haar
+        return self.recognizer.alignCrop(crop, max(faces, key=lambda f: f[2] * f[3]))
+
+    def embed(self, crops):
+        """Return (embeddings, used): one normalised row per crop in which a face was aligned."""
+        features, used = [], []
+        for i, crop in enumerate(crops):
+            aligned = self.align(crop)
+            if aligned is not None:
+                features.append(self.recognizer.feature(aligned).ravel())
+                used.append(i)
+        if not features:
+            return np.empty((0, 0), np.float32), used
+        features = np.asarray(features, np.float32)
+        return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12), used
+
+
+class FaceGallery:
+    """Enrolled people as one embedding matrix; several rows may belong to the same name."""
+
+    def __init__(self, path=GALLERY_FILE):
+        self.path = path
+        self.names = []               # nome di ogni persona
+        self.owners = np.empty(0, np.int32)
+        self.embeddings = np.empty((0, 0), np.float32)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                self.names = [str(n) for n in data["names"]]
+                self.owners = data["owners"].astype(np.int32)
+                self.embeddings = np.ascontiguousarray(data["embeddings"], dtype=np.float32)
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Failed to load face gallery: {e}")
+
+    def __len__(self):
+        return len(self.owners)
+
+    def match(self, embeddings, threshold=IDENTITY_THRESHOLD):
+        """Return [(name, score)] for each embedding: nearest enrolled row, or unknown."""
+        if not len(self):
+            return [(UNKNOWN_NAME, 0.0)] * len(embeddings)
+        # vettori a norma unitaria: il prodotto scalare è la somiglianza coseno
+        scores = embeddings @ self.embeddings.T
+        best = scores.argmax(axis=1)
+        found = []
+        for row, score in zip(best, scores[np.arange(len(best)), best]):
+            name = self.names[self.owners[row]] if score >= threshold else UNKNOWN_NAME
+            found.append((name, float(score)))
+        return found
+
+    def enroll(self, name, embeddings):
+        """Add the embeddings of one person and save the gallery atomically."""
+        if name not in self.names:
+            self.names.append(name)
+        owner = self.names.index(name)
+        if len(self):
+            self.embeddings = np.vstack([self.embeddings, embeddings])
+        else:
+            self.embeddings = np.asarray(embeddings, np.float32)
+        self.owners = np.concatenate([self.owners, np.full(len(embeddings), owner, np.int32)])
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, names=np.array(self.names), owners=self.owners, embeddings=self.embeddings)
+        os.replace(tmp, self.path)
+
+
+def load_identity():
+    """Load the face model and the gallery (slow, never on the UI thread)."""
+    return FaceEmbedder(), FaceGallery()
+
+
+# =============================================================================================
+# WORKER DI RICONOSCIMENTO DEI VOLTI
+# =============================================================================================
+class IdentityWorker(threading.Thread):
+    """Recognise face tracks in background, once per track.
+
+    The engine submits a crop only for the tracks that `needs()` reports; results stay
+    cached by track id until `forget()` drops the tracks no longer followed. Unknown faces
+    are retried every IDENTITY_RETRY_SECONDS, as the first crop may be blurred or turned.
+    """
+
+    def __init__(self, loader=load_identity):
+        super().__init__(name="identity", daemon=True)
+        self.loader = loader
+        self.embedder = None
+        self.gallery = None
+        self.ready = threading.Event()
+        self.load_error = None
+        self.load_time = 0.0
+        self.embeddings_computed = 0
+        self._pending = {}            # track id -> (ritaglio, timestamp)
+        self._in_flight = set()       # track id in elaborazione, da non reinviare
+        self._identities = {}         # track id -> Identity
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def needs(self, track_id, timestamp):
+        """Return True if the track has no usable identity and none is being computed."""
+        if not self.ready.is_set() or track_id in self._pending or track_id in self._in_flight:
+            return False
+        identity = self._identities.get(track_id)
+        if identity is None:
+            return True
+        return not identity.known and timestamp - identity.timestamp > IDENTITY_RETRY_SECONDS
+
+    def submit(self, track_id, crop, timestamp):
+        """Queue the face crop of a track."""
+        with self._cond:
+            self._pending[track_id] = (crop, timestamp)
+            self._cond.notify()
+
+    def identity(self, track_id):
+        """Return the cached Identity of a track, or None."""
+        return self._identities.get(track_id)
+
+    def forget(self, live_ids):
+        """Drop the cache entries (and pending crops) of the tracks that were lost."""
+        live = set(live_ids)
+        for track_id in list(self._identities):
+            if track_id not in live:
+                self._identities.pop(track_id, None)
+        with self._cond:
+            for track_id in [t for t in self._pending if t not in live]:
+                del self._pending[track_id]
+
+    def run(self):
+        """Load the model, then embed every pending crop batch and match it."""
+        start = time.monotonic()
+        try:
+            self.embedder, self.gallery = self.loader()
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Face identity model loading failed: {e}")
+            return
+        self.load_time = time.monotonic() - start
+        self.ready.set()
+
+        while not self._stop_event.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    break
+                batch = list(self._pending.items())
+                self._pending.clear()
+                self._in_flight = {track_id for track_id, _ in batch}
+            try:
+                embeddings, used = self.embedder.embed([crop for _, (crop, _) in batch])
+                self.embeddings_computed += len(used)
+                # senza punti del volto (di profilo, mosso) il track resta sconosciuto e verrà riprovato
+                for track_id, (_, timestamp) in batch:
+                    self._identities[track_id] = Identity(UNKNOWN_NAME, 0.0, timestamp)
+                matches = self.gallery.match(embeddings) if used else []
+                for i, (name, score) in zip(used, matches):
+                    track_id, (_, timestamp) = batch[i]
+                    self._identities[track_id] = Identity(name, score, timestamp)
+            except Exception as e:
+                logger.error(f"Face identity failed: {e}")
+            self._in_flight = set()
+
+    def stop(self, timeout=2.0):
+        """Stop the worker; a batch already running is allowed to finish."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout)
+
+
+# =============================================================================================
+# ARRUOLAMENTO DA IMMAGINE
+# =============================================================================================
+def enroll_images(name, image_paths, gallery=None, embedder=None):
+    """Detect the largest face in each image and enrol its embedding; returns the faces used."""
+    gallery = gallery or FaceGallery()
+    embedder = embedder or FaceEmbedder()
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    crops = []
+    for path in image_paths:
+        image = cv2.imread(path)
+        if image is None:
+            logger.warning(f"Cannot read {path}")
+            continue
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(40, 40))
+        if not len(faces):
+            logger.warning(f"No face found in {path}")
+            continue
+        crop = face_crop(image, max(faces, key=lambda f: f[2] * f[3]))
+        if crop is not None:
+            crops.append(crop)
+    embeddings, used = embedder.embed(crops)
+    if not used:
+        raise ValueError("nessun volto utilizzabile nelle immagini")
+    if len(used) < len(crops):
+        logger.warning(f"{len(crops) - len(used)} faces could not be aligned and were skipped")
+    gallery.enroll(name, embeddings)
+    return len(used)
+
+
+def download_models(urls=FACE_MODEL_URLS):
+    """Download the missing face models into models/; returns the paths fetched."""
+    fetched = []
+    for path, url in urls.items():
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".part"
+        logger.info(f"Downloading {url}")
+        urllib.request.urlretrieve(url, tmp)
+        os.replace(tmp, path)
+        fetched.append(path)
+    return fetched
+
+
+# =============================================================================================
+# PUNTO DI INGRESSO: python identity.py enroll|list
+# =============================================================================================
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s | %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "download":
+        fetched = download_models()
+        print(f"Scaricati {len(fetched)} modelli in {MODELS_DIR}" if fetched else f"Modelli già presenti in {MODELS_DIR}")
+    elif command == "enroll" and len(sys.argv) >= 4:
+        used = enroll_images(sys.argv[2], sys.argv[3:])
+        print(f"Arruolato '{sys.argv[2]}' con {used} volti")
+    elif command == "list":
+        gallery = FaceGallery()
+        for owner, name in enumerate(gallery.names):
+            print(f"{name:<20} {int((gallery.owners == owner).sum()):>4} volti")
+        print(f"{len(gallery.names)} persone, {len(gallery)} volti in {gallery.path}")
+    else:
+        sys.exit("uso: python identity.py [list | download | enroll NOME IMMAGINE [IMMAGINE ...]]")
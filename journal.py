@@ -0,0 +1,227 @@
+# =============================================================================================
+# JOURNAL - eventi in append su thread dedicato, statistiche derivate e checkpoint atomici
+# =============================================================================================
+#   Registrazioni, snapshot, rilevamenti e cambi di cartella diventano righe JSON accodate
+#   in memoria: il thread del journal le scrive a blocchi in events.jsonl, mentre i
+#   contatori (foto, video, ultime date...) vengono ricavati dagli eventi stessi. Ogni
+#   JOURNAL_CHECKPOINT_INTERVAL secondi i contatori finiscono in stats.json insieme alla
+#   posizione raggiunta nel journal, scritti su file temporaneo e rinominati: all'avvio si
+#   parte dal checkpoint e si rigiocano solo gli eventi successivi, quindi un crash non
+#   tronca mai le statistiche. Anche il logging passa da una coda (queued_logging).
+# =============================================================================================
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import datetime
+import threading
+
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+JOURNAL_FILE = "events.jsonl"
+STATS_FILE = "stats.json"
+JOURNAL_FLUSH_INTERVAL = 1.0      # secondi massimi di attesa prima di scrivere un blocco di eventi
+JOURNAL_CHECKPOINT_INTERVAL = 30.0
+JOURNAL_MAX_BYTES = 5 * 2**20     # oltre, dopo un checkpoint, il journal riparte (il vecchio in .1)
+
+DEFAULT_STATS = {
+    "photos": 0,
+    "videos": 0,
+    "last_photo": "Nessuna",
+    "last_video": "Nessuno",
+    "save_path": None,
+    "detections": {},             # classe -> quante volte è comparsa
+}
+
+_STOP = object()                  # sentinella di chiusura nella coda
+
+
+def apply_event(stats, event):
+    """Update the derived statistics with one journal event."""
+    kind = event["event"]
+    when = datetime.datetime.fromtimestamp(event["t"]).strftime("%d/%m/%Y %H:%M:%S")
+    if kind == "recording_start":
+        stats["videos"] += 1
+    elif kind == "recording_stop":
+        stats["last_video"] = when
+    elif kind == "snapshot":
+        stats["photos"] += 1
+        stats["last_photo"] = when
+    elif kind == "save_path":
+        stats["save_path"] = event["path"]
+    elif kind == "detection":
+        stats["detections"][event["cls"]] = stats["detections"].get(event["cls"], 0) + 1
+
+
+# =============================================================================================
+# JOURNAL
+# =============================================================================================
+class EventJournal(threading.Thread):
+    """Append events to a JSON-lines journal in batches, off the caller's thread.
+
+    `record()` only updates the in-memory statistics and queues the event, so it is safe
+    on the frame path; `stats` always reflects every recorded event.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, stats_path=STATS_FILE):
+        super().__init__(name="journal", daemon=True)
+        self.path = path
+        self.stats_path = stats_path
+        self.events_written = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.stats = self._load()
+        # statistiche dei soli eventi già scritti: sono quelle che vanno nel checkpoint
+        self._written = json.loads(json.dumps(self.stats))
+
+    # ============================================================================================
+    # CARICAMENTO: CHECKPOINT + EVENTI SUCCESSIVI
+    # ============================================================================================
+    def _load(self):
+        """Rebuild the statistics from the last checkpoint and the journal tail."""
+        stats = json.loads(json.dumps(DEFAULT_STATS))
+        offset = 0
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            offset = data.pop("journal_offset", 0)
+            stats.update({k: v for k, v in data.items() if k in stats})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Failed to load stats checkpoint: {e}")
+
+        # il journal si legge in binario: offset e tell() sono byte, non cookie del testo
+        replayed = 0
+        try:
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                # offset oltre la fine: crash durante la rotazione, il checkpoint copre già tutto
+                position = min(offset, size)
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break     # ultima riga troncata da un crash
+                    position += len(line)
+                    try:
+                        apply_event(stats, json.loads(line.decode("utf-8")))
+                        replayed += 1
+                    except (ValueError, KeyError) as e:
+                        logger.warning(f"Journal: skipping unreadable event: {e}")
+            if position < size:
+                # la riga incompleta va tolta, altrimenti il prossimo evento le verrebbe accodato
+                with open(self.path, "r+b") as f:
+                    f.truncate(position)
+                logger.warning(f"Journal: truncated incomplete last event ({size - position} bytes)")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to replay journal: {e}")
+        if replayed:
+            logger.info("Journal | eventi recuperati dopo l'ultimo checkpoint=%d", replayed)
+        return stats
+
+    # ============================================================================================
+    # REGISTRAZIONE DEGLI EVENTI (qualsiasi thread, mai bloccante)
+    # ============================================================================================
+    def record(self, kind, **fields):
+        """Record one event: statistics are updated now, the file later."""
+        event = {"t": round(time.time(), 3), "event": kind, **fields}
+        with self._lock:
+            apply_event(self.stats, event)
+        self._queue.put(event)
+        return event
+
+    def snapshot(self):
+        """Return a copy of the derived statistics."""
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    # ============================================================================================
+    # THREAD DI SCRITTURA
+    # ============================================================================================
+    def run(self):
+        last_checkpoint = time.monotonic()
+        f = open(self.path, "ab")
+        running = True
+        try:
+            while running:
+                try:
+                    batch = [self._queue.get(timeout=JOURNAL_FLUSH_INTERVAL)]
+                except queue.Empty:
+                    batch = []
+                # tutti gli eventi già in coda finiscono nello stesso blocco
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if any(e is _STOP for e in batch):
+                    running = False
+                    batch = [e for e in batch if e is not _STOP]
+                if batch:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch).encode("utf-8"))
+                    f.flush()
+                    self.events_written += len(batch)
+                    for event in batch:
+                        apply_event(self._written, event)
+
+                if not running or time.monotonic() - last_checkpoint >= JOURNAL_CHECKPOINT_INTERVAL:
+                    last_checkpoint = time.monotonic()
+                    self._checkpoint(f.tell())
+                    if f.tell() > JOURNAL_MAX_BYTES:
+                        f = self._rotate(f)
+        finally:
+            f.close()
+
+    def _checkpoint(self, offset):
+        """Write the statistics of the written events and the journal position atomically."""
+        data = dict(self._written)
+        data["journal_offset"] = offset
+        tmp = self.stats_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(tmp, self.stats_path)
+        except OSError as e:
+            logger.warning(f"Failed to save stats: {e}")
+
+    def _rotate(self, f):
+        """Start a new journal; everything in the old one is already in the checkpoint."""
+        f.close()
+        os.replace(self.path, self.path + ".1")
+        f = open(self.path, "ab")
+        self._checkpoint(0)
+        return f
+
+    def stop(self, timeout=5.0):
+        """Write the pending events, checkpoint and stop."""
+        self._queue.put(_STOP)
+        if self.is_alive():
+            self.join(timeout)
+
+
+# =============================================================================================
+# LOGGING ASINCRONO
+# =============================================================================================
+def queued_logging(*handlers, level=logging.INFO):
+    """Route the root logger through a queue; the handlers run on a listener thread.
+
+    The listener is stopped (and the queue flushed) at interpreter exit.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # il messaggio viene solo interpolato qui, il formato completo lo applicano gli handler
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -7,25 +7,30 @@
 # =============================================================================================
 import os
 import sys
-import json
-import cv2
 import time
-import datetime
-import geocoder
 import logging
+import threading
 import contextlib
-import numpy as np
 
 from pathlib import Path
-from ultralytics import YOLO
+
+from engine import Engine, EngineError, open_first_webcam
+from journal import queued_logging
+from snapshot import BURST_SECONDS
+from multicam import CameraChannel
+from webcams import WebcamWatcher
+from geolocation import resolve_location, load_cached_location
+from display import FrameDisplay, to_pixmap, DEFAULT_REFRESH_RATE
+from overlay import OVERLAY_ELEMENTS, OVERLAY_LABELS
+from metrics import METRICS_FILE
 
 from PySide6.QtWidgets import (
     QApplication, QLabel, QPushButton, QVBoxLayout, QWidget,
     QHBoxLayout, QGroupBox, QColorDialog, QCheckBox, QSlider,
-    QComboBox, QFileDialog, QMessageBox, QSizePolicy, QScrollArea
+    QComboBox, QFileDialog, QMessageBox, QSizePolicy, QScrollArea, QGridLayout
 )
-from PySide6.QtCore import QTimer, Qt
-from PySide6.QtGui import QImage, QPixmap, QColor
+from PySide6.QtCore import QTimer, Qt, QEvent
+from PySide6.QtGui import QColor
 
 # =============================================================================================
 # CONFIGURAZIONE LOGGING
@@ -34,22 +39,19 @@ LOG_FILE = os.path.join("logs", "faceapp_logging.log")
 
 Path("logs").mkdir(parents=True, exist_ok=True)
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    encoding='utf-8',
-    filemode='a'
-)
+# il file di log viene scritto dal thread del listener, mai dal loop UI
+_log_handler = logging.FileHandler(LOG_FILE, mode='a', encoding='utf-8')
+_log_handler.setFormatter(logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+queued_logging(_log_handler)
 
 logger = logging.getLogger("FaceApp")
 
 # ========================================================================================================================================================================================================================
 # PRIMARY SECTION: CONSTANTS========================================================================================================================================================================================
 # ========================================================================================================================================================================================================================
-STATS_FILE = "stats.json"
-YOLO_DETECTION_INTERVAL = 15       # run YOLO every N frames for performance
+APP_START_TIME = time.monotonic()  # riferimento per il time-to-first-frame
+EXTRA_CAMS_COLUMNS = 4             # anteprime per riga nella griglia delle camere extra
+FRAME_POLL_INTERVAL_MS = 10        # ogni quanto il loop UI controlla se c'è un frame nuovo
 
 
 # ========================================================================================================================================================================================================================
@@ -68,119 +70,85 @@ class FaceApp(QWidget):
         self.resize(1100, 600)
         self.setMinimumSize(900, 500)
 
-        # ---- parametri base ----
-        self.rect_color = QColor(0, 255, 0)
-        self.rect_thickness = 2
-        self.show_coords = False
+        # ---- motore di elaborazione: tutta la pipeline, senza dipendenze da Qt ----
+        # si apre subito l'ultima webcam nota; la lista completa viene aggiornata in background
+        cap, self.available_indices, self.available_names = open_first_webcam()
+        self.engine = Engine(cap, self.available_indices[0], self.available_names[0])
+        self.engine.on_recording_changed = self.recording_changed
+
+        # ---- geolocalizzazione (cache con TTL, la rete solo in background) ----
+        cached_location, _ = load_cached_location()
+        if cached_location:
+            self.engine.location = cached_location
+
+        # ---- stato della sola interfaccia ----
         self.show_fps = True
-        self.zoom_factor = 1.0
-        self.last_frame = None
-        
-        # ---- YOLO object detector parameters ----
-        self.yolo_rect_color = QColor(0, 255, 0)  # green
-        self.yolo_rect_thickness = 2
-        
-        # ---------------- MOTION DETECTION ----------------
-        self.motion_enabled = True
-        self.prev_gray = None
-        self.motion_threshold = 5000   # sensibilità (più basso = più sensibile)
-        self.motion_last_seen = time.time()
-        self.motion_grace_seconds = 3  # secondi senza movimento prima di fermare il video
-        self.motion_recording_active = False
-
-        # ---- filtri video ----
-        self.gray_filter = False
-
-        # ---- stato di registrazione ----
-        self.recording = False
-        self.video_writer = None
-        self.record_start_time = None
-
-        # ---- variabili per logging volti durante registrazione ----
-        self.recording_start_time = None
-        self.face_detection_counter = 0  # counts frames where faces were detected
-
-        # ---- statisctiche ----
-        self.photo_count = 0
-        self.video_count = 0
-        self.last_photo = "Nessuna"
-        self.last_video = "Nessuno"
-        self.save_path = os.getcwd()
-        self.load_stats()
-
-        # ---- geolocalizzazione ----
-        self.location = "Località sconosciuta"
-        try:
-            g = geocoder.ip("me")
-            if g.city or g.country:
-                city = g.city or ""
-                country = g.country or ""
-                self.location = f"{city}, {country}".strip(", ")
-        except Exception:
-            pass  # Keep default location on any error
-
-        # ---- inizzializzazione webcam ----
-        self.available_indices, self.available_names = self.scan_webcams()
-        if not self.available_indices:
-            raise RuntimeError("Nessuna webcam trovata.")
-        
-        self.current_cam_index = self.available_indices[0]
-        self.current_cam_name = self.available_names[0]
-        try:
-            self.cap = cv2.VideoCapture(self.current_cam_index, cv2.CAP_MSMF)
-            if not self.cap.isOpened():
-                raise RuntimeError("Errore: impossibile aprire la webcam principale.")
-        except Exception as e:
-            logger.error(f"Camera initialization failed: {e}")
-            raise RuntimeError("Errore: impossibile aprire la webcam principale.")
-
-        # ---- riconoscimento volto ----
-        self.detector = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
+        self.mask_mode = None          # None, "include" o "exclude" mentre si disegnano le maschere
+        self.mask_drag_start = None    # punto iniziale (normalizzato) del rettangolo in disegno
 
-        # ---- YOLO model ----
-        self.yolo_model = YOLO("yolov8n.pt")
+        # ---- worker e caricamento del cascade volti in background ----
+        self.engine.start()
 
         # ---- Label del video principale ----
         self.video_label = QLabel(alignment=Qt.AlignCenter)
         self.video_label.setObjectName("video_label")
         self.video_label.setMinimumSize(0, 0)
         self.video_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.video_label.installEventFilter(self)  # disegno delle maschere del movimento
+        self.display = FrameDisplay(self.video_label)
         
         self.cam_name_label = QLabel(
-            f"Webcam attiva: {self.current_cam_name}",
+            f"Webcam attiva: {self.engine.current_cam_name}",
             alignment=Qt.AlignCenter
         )
 
         # ---- timer per aggiornamento frame ----
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
+        # ---- timer di rendering: al massimo un disegno per refresh dello schermo ----
+        screen = QApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen and screen.refreshRate() > 0 else DEFAULT_REFRESH_RATE
+        self.render_timer = QTimer()
+        self.render_timer.setTimerType(Qt.PreciseTimer)
+        self.render_timer.setInterval(max(1, int(1000 / refresh_rate)))
+        self.render_timer.timeout.connect(self.render_frame)
         self.running = False
-        self.prev_time = time.time()
-        self.fps = 0
-
-        # ---- frame counter and YOLO detection ----
-        self.frame_counter = 0
-        self.yolo_enabled = True
-        self.yolo_results_cache = []  # Cache last YOLO results
+        self.first_frame_shown = False
+        self.camera_start_time = None
 
-        # ---- webcam extra ----
-        self.extra_caps = []
-        self.extra_cam_widgets = []
+        # ---- webcam extra (una pipeline per camera, YOLO condiviso) ----
+        self.extra_channels = {}     # indice webcam -> CameraChannel
+        self.extra_cam_widgets = {}  # indice webcam -> QLabel di anteprima
+        self.extra_cam_checks = {}   # indice webcam -> QCheckBox nella sidebar
         self.extra_timer = QTimer()
         self.extra_timer.timeout.connect(self.update_extra_cams)
         self.extra_timer.start(200)
 
+        # ---- hot-plug webcam: scansione in background, lista aggiornata dal timer UI ----
+        self.webcam_list_version = 0
+        self.webcam_watcher = WebcamWatcher(in_use=self.webcams_in_use)
+        self.webcam_watcher.start()
+        self.webcam_timer = QTimer()
+        self.webcam_timer.timeout.connect(self.refresh_webcam_list)
+        self.webcam_timer.start(1000)
+
+        # ---- esito di snapshot e burst, scritti in background (attivo solo mentre servono) ----
+        self.snapshot_timer = QTimer()
+        self.snapshot_timer.setInterval(250)
+        self.snapshot_timer.timeout.connect(self.refresh_snapshot_status)
+
         # ============================================================================================
         # BARRA LATERALE DI CONTROLLO, CON TUTTE LE IMPOSTAZIONI E STATISTICHE
         # ============================================================================================
         # barra laterale scrollabile con tutte le impostazioni e statistiche
         settings_layout = QVBoxLayout()
         settings_layout.addWidget(self.create_webcam_group())
+        settings_layout.addWidget(self.create_extra_cams_group())
         settings_layout.addWidget(self.create_face_group())
         settings_layout.addWidget(self.create_yolo_group())
+        settings_layout.addWidget(self.create_recognition_group())
         settings_layout.addWidget(self.create_feedback_group())
+        settings_layout.addWidget(self.create_overlay_group())
         settings_layout.addWidget(self.create_savepath_group())
         settings_layout.addStretch()
 
@@ -211,67 +179,102 @@ class FaceApp(QWidget):
         video_layout.addWidget(self.cam_name_label)
         video_layout.addWidget(self.video_label)
 
+        # griglia delle anteprime delle webcam extra, sotto al video principale
+        self.extra_cams_grid = QGridLayout()
+        video_layout.addLayout(self.extra_cams_grid)
+
         main_layout = QHBoxLayout(self)
         main_layout.addWidget(self.sidebar_widget, 0)  # Fixed width sidebar with button always visible
         main_layout.addLayout(video_layout, 1)         # Video area takes remaining space
 
+        # ---- caricamenti in background, le funzioni si attivano quando pronte ----
+        threading.Thread(target=self.load_location, name="geolocation", daemon=True).start()
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.refresh_startup_status)
+        self.startup_timer.start(250)
+        logger.info("Avvio | interfaccia pronta in %.2fs", time.monotonic() - APP_START_TIME)
+
 
     # ============================================================================================
-    # GESTIONE DELLE STATISTICHE DI UTILIZZO, CON CARICAMENTO E SALVATAGGIO SU FILE JSON
+    # CARICAMENTI IN BACKGROUND
     # ============================================================================================
-    def load_stats(self):
-        """Load statistics from JSON file."""
-        if not os.path.exists(STATS_FILE):
+    def load_location(self):
+        """Resolve the location on a background thread (network only if the cache is stale)."""
+        location = resolve_location()
+        self.engine.location = location  # le camere extra lo riprendono dal motore principale
+
+    def refresh_startup_status(self):
+        """Update the UI as the background loaders complete; stops once everything is ready."""
+        recognition_worker = self.engine.recognition_worker
+        index = recognition_worker.index
+        if index is not None and self.recognition_status_label.text().endswith("..."):
+            self.recognition_status_label.setText(
+                f"Libreria: {len(index.names)} oggetti, {index.size} descrittori"
+            )
+            logger.info("Avvio | indice oggetti noti pronto in %.2fs", recognition_worker.load_time)
+
+        identity_worker = self.engine.identity_worker
+        if self.identity_status_label.text().endswith("..."):
+            if identity_worker.load_error:
+                self.identity_status_label.setText("Galleria volti: modello non disponibile")
+            elif identity_worker.ready.is_set():
+                gallery = identity_worker.gallery
+                self.identity_status_label.setText(
+                    f"Galleria volti: {len(gallery.names)} persone, {len(gallery)} volti"
+                )
+                logger.info("Avvio | modello identità pronto in %.2fs", identity_worker.load_time)
+
+        yolo_worker = self.engine.yolo_worker
+        if not self.yolo_status_label.text().endswith("..."):
+            pass                       # già aggiornato a un passaggio precedente
+        elif yolo_worker.load_error:
+            self.yolo_status_label.setText("Rilevatore: Neural Network (YOLOv8n) - non disponibile")
+        elif yolo_worker.ready.is_set():
+            model = yolo_worker.model
+            self.yolo_status_label.setText(
+                f"Rilevatore: Neural Network (YOLOv8n, {model.name}, {model.input_size}px)"
+            )
+            logger.info("Avvio | modello YOLO pronto in %.2fs", yolo_worker.load_time)
+        else:
             return
-        try:
-            with open(STATS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self.photo_count = data.get("photos", 0)
-            self.video_count = data.get("videos", 0)
-            self.last_photo = data.get("last_photo", "Nessuna")
-            self.last_video = data.get("last_video", "Nessuno")
-            self.save_path = data.get("save_path", os.getcwd())
-        except (json.JSONDecodeError, IOError) as e:
-            logger.warning(f"Failed to load stats: {e}")
-
-    def save_stats(self):
-        """Save statistics to JSON file."""
-        data = {
-            "photos": self.photo_count,
-            "videos": self.video_count,
-            "last_photo": self.last_photo,
-            "last_video": self.last_video,
-            "save_path": self.save_path,
-        }
-        try:
-            with open(STATS_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4)
-        except IOError as e:
-            logger.warning(f"Failed to save stats: {e}")
+        if self.identity_status_label.text().endswith("..."):
+            return
+        self.startup_timer.stop()
 
     # ============================================================================================
-    # RILEVAMENTO DELLE WEBCAM DISPONIBILI SUL SISTEMA
+    # RILEVAMENTO DELLE WEBCAM DISPONIBILI SUL SISTEMA (hot-plug)
     # ============================================================================================
-    def scan_webcams(self):
-        """Scan for available webcams with timeout."""
-        indices = []
-        names = []
-        for i in range(10):
-            try:
-                cap = cv2.VideoCapture(i, cv2.CAP_MSMF)
-                if cap.isOpened():
-                    # Verify it's actually a working camera
-                    ret, _ = cap.read()
-                    if ret:
-                        indices.append(i)
-                        names.append(f"Webcam {i}")
-                    cap.release()
-                else:
-                    cap.release()
-            except Exception as e:
-                logger.debug(f"Error scanning camera {i}: {e}")
-                continue
-        return indices, names
+    def webcams_in_use(self):
+        """Return the webcam indices currently opened by the app (not probed by the watcher)."""
+        in_use = set(list(self.extra_channels))
+        engine = self.engine
+        main_lost = engine.capture_thread is not None and engine.capture_thread.camera_lost
+        if engine.cap is not None and engine.cap.isOpened() and not main_lost:
+            in_use.add(engine.current_cam_index)
+        return in_use
+
+    def refresh_webcam_list(self):
+        """Apply the latest device list published by the watcher to the selectors."""
+        version, indices, names = self.webcam_watcher.latest()
+        if indices is None or version == self.webcam_list_version:
+            return
+        self.webcam_list_version = version
+        if indices == self.available_indices:
+            return
+
+        self.available_indices, self.available_names = indices, names
+        self.cam_selector.blockSignals(True)
+        self.cam_selector.clear()
+        for name in names:
+            self.cam_selector.addItem(name)
+        if self.engine.current_cam_index in indices:
+            self.cam_selector.setCurrentIndex(indices.index(self.engine.current_cam_index))
+            self.cam_name_label.setText(f"Webcam attiva: {self.engine.current_cam_name}")
+        else:
+            self.cam_selector.setCurrentIndex(-1)
+            self.cam_name_label.setText(f"Webcam attiva: {self.engine.current_cam_name} (disconnessa)")
+        self.cam_selector.blockSignals(False)
+        self.populate_extra_cam_checks()
 
     # ============================================================================================
     # CREAZIONE DEI GRUPPI PER LA WEBCAM, RILEVAMENTO VOLTI, FEEDBACK E PERCORSO DI SALVATAGGIO
@@ -296,13 +299,39 @@ class FaceApp(QWidget):
 
         # bottone di avvio/stop registrazione
         self.record_button = QPushButton("Start Recording")
-        self.record_button.clicked.connect(self.toggle_recording)
+        self.record_button.clicked.connect(lambda: self.toggle_recording())
         self.record_button.setStyleSheet("background-color: #173c68; color: white;")
         layout.addWidget(self.record_button)
 
         group.setLayout(layout)
         return group
 
+    def create_extra_cams_group(self):
+        """Create the group to monitor additional webcams alongside the main one."""
+        group = QGroupBox("Webcam extra")
+        self.extra_cams_checks_layout = QVBoxLayout()
+        self.populate_extra_cam_checks()
+        group.setLayout(self.extra_cams_checks_layout)
+        return group
+
+    def populate_extra_cam_checks(self):
+        """Create one checkbox per available webcam, keeping the ones already checked."""
+        for index, check in list(self.extra_cam_checks.items()):
+            if index not in self.available_indices:
+                if index in self.extra_channels:
+                    self.remove_extra_camera(index)
+                self.extra_cams_checks_layout.removeWidget(check)
+                check.deleteLater()
+                del self.extra_cam_checks[index]
+
+        for index, name in zip(self.available_indices, self.available_names):
+            if index in self.extra_cam_checks:
+                continue
+            check = QCheckBox(f"Monitora {name}")
+            check.toggled.connect(lambda checked, i=index: self.toggle_extra_camera(i, checked))
+            self.extra_cams_checks_layout.addWidget(check)
+            self.extra_cam_checks[index] = check
+
     def create_face_group(self):
         """Create face detection control group."""
         group = QGroupBox("Rilevamento Volti")
@@ -313,6 +342,21 @@ class FaceApp(QWidget):
         self.color_button.clicked.connect(self.choose_color)
         layout.addWidget(self.color_button)
 
+        # ---- tracking dei volti tra un rilevamento e l'altro ----
+        self.tracking_check = QCheckBox("Tracking volti (rilevamento ogni N frame)")
+        self.tracking_check.setChecked(self.engine.face_tracking_enabled)
+        self.tracking_check.toggled.connect(self.toggle_face_tracking)
+        layout.addWidget(self.tracking_check)
+
+        # ---- identità dei volti tracciati, contro la galleria delle persone arruolate ----
+        self.identity_check = QCheckBox("Riconoscimento persone (richiede il tracking)")
+        self.identity_check.setChecked(self.engine.identity_enabled)
+        self.identity_check.toggled.connect(self.toggle_identity)
+        layout.addWidget(self.identity_check)
+
+        self.identity_status_label = QLabel("Galleria volti: caricamento...")
+        layout.addWidget(self.identity_status_label)
+
         # ---- motion detection toggle ----
         self.motion_button = QPushButton("Motion Recording")
         self.motion_button.setCheckable(True)
@@ -320,12 +364,30 @@ class FaceApp(QWidget):
         self.motion_button.toggled.connect(self.toggle_motion_button)
         layout.addWidget(self.motion_button)
 
+        # ---- maschere del movimento, disegnate col mouse sul video ----
+        layout.addWidget(QLabel("Maschere movimento"))
+        self.mask_selector = QComboBox()
+        self.mask_selector.addItems(["Nessuna modifica", "Disegna zona inclusa", "Disegna zona esclusa"])
+        self.mask_selector.currentIndexChanged.connect(self.change_mask_mode)
+        layout.addWidget(self.mask_selector)
+        self.clear_masks_button = QPushButton("Cancella maschere")
+        self.clear_masks_button.clicked.connect(self.clear_motion_masks)
+        layout.addWidget(self.clear_masks_button)
+
+        # ---- secondi di pre-roll per le registrazioni da movimento ----
+        self.preroll_label = QLabel(f"Pre-roll: {self.engine.preroll_seconds} s")
+        layout.addWidget(self.preroll_label)
+        self.preroll_slider = QSlider(Qt.Horizontal)
+        self.preroll_slider.setRange(0, 10)
+        self.preroll_slider.setValue(self.engine.preroll_seconds)
+        self.preroll_slider.valueChanged.connect(self.update_preroll)
+        layout.addWidget(self.preroll_slider)
 
         # TERTIARY: larghezza del rettangolo di rilevamento
         layout.addWidget(QLabel("Spessore rettangolo"))
         self.thickness_slider = QSlider(Qt.Horizontal)
         self.thickness_slider.setRange(1, 10)
-        self.thickness_slider.setValue(self.rect_thickness)
+        self.thickness_slider.setValue(self.engine.rect_thickness)
         self.thickness_slider.valueChanged.connect(self.update_thickness)
         layout.addWidget(self.thickness_slider)
 
@@ -353,8 +415,9 @@ class FaceApp(QWidget):
         self.yolo_button.toggled.connect(self.toggle_yolo_button)
         layout.addWidget(self.yolo_button)
 
-        # Label for YOLO detector
-        layout.addWidget(QLabel("Rilevatore: Neural Network (YOLOv8n)"))
+        # Label for YOLO detector (aggiornata quando il modello finisce di caricarsi)
+        self.yolo_status_label = QLabel("Rilevatore: Neural Network (YOLOv8n) - caricamento...")
+        layout.addWidget(self.yolo_status_label)
 
         # Color button for YOLO boxes
         self.yolo_color_button = QPushButton("Colore box rilevamento")
@@ -365,10 +428,47 @@ class FaceApp(QWidget):
         layout.addWidget(QLabel("Spessore linea"))
         self.yolo_thickness_slider = QSlider(Qt.Horizontal)
         self.yolo_thickness_slider.setRange(1, 10)
-        self.yolo_thickness_slider.setValue(self.yolo_rect_thickness)
+        self.yolo_thickness_slider.setValue(self.engine.yolo_rect_thickness)
         self.yolo_thickness_slider.valueChanged.connect(self.update_yolo_thickness)
         layout.addWidget(self.yolo_thickness_slider)
 
+        # Detection interval slider (frames between two YOLO submissions)
+        self.yolo_interval_label = QLabel(f"Intervallo rilevamento: {self.engine.yolo_interval} frame")
+        layout.addWidget(self.yolo_interval_label)
+        self.yolo_interval_slider = QSlider(Qt.Horizontal)
+        self.yolo_interval_slider.setRange(1, 60)
+        self.yolo_interval_slider.setValue(self.engine.yolo_interval)
+        self.yolo_interval_slider.valueChanged.connect(self.update_yolo_interval)
+        layout.addWidget(self.yolo_interval_slider)
+
+        # intervalli allungati sotto carico, inferenza sospesa con la scena ferma
+        self.scheduler_check = QCheckBox("Frequenza adattiva (carico e movimento)")
+        self.scheduler_check.setChecked(self.engine.scheduler.enabled)
+        self.scheduler_check.toggled.connect(self.toggle_scheduler)
+        layout.addWidget(self.scheduler_check)
+
+        # inferenza sui soli ritagli delle zone in movimento (richiede il rilevamento movimento)
+        self.yolo_roi_check = QCheckBox("Solo zone in movimento")
+        self.yolo_roi_check.setChecked(self.engine.yolo_roi)
+        self.yolo_roi_check.toggled.connect(self.toggle_yolo_roi)
+        layout.addWidget(self.yolo_roi_check)
+
+        group.setLayout(layout)
+        return group
+
+    def create_recognition_group(self):
+        """Create the known objects recognition group."""
+        group = QGroupBox("Oggetti noti")
+        layout = QVBoxLayout()
+
+        self.recognition_check = QCheckBox("Riconosci oggetti noti")
+        self.recognition_check.setChecked(self.engine.recognition_enabled)
+        self.recognition_check.toggled.connect(self.toggle_recognition)
+        layout.addWidget(self.recognition_check)
+
+        self.recognition_status_label = QLabel("Libreria: caricamento...")
+        layout.addWidget(self.recognition_status_label)
+
         group.setLayout(layout)
         return group
 
@@ -382,11 +482,12 @@ class FaceApp(QWidget):
         self.coords_check.toggled.connect(self.toggle_coords)
         layout.addWidget(self.coords_check)
 
-        # checkbox mostra FPS
-        self.fps_check = QCheckBox("Mostra FPS")
-        self.fps_check.setChecked(self.show_fps)
-        self.fps_check.toggled.connect(self.toggle_fps)
-        layout.addWidget(self.fps_check)
+        # ---- latenza per stadio: overlay di debug + file Prometheus ----
+        self.metrics_check = QCheckBox("Metriche di latenza (debug)")
+        self.metrics_check.setToolTip(f"Percentili per stadio sul video, esportati in {METRICS_FILE}")
+        self.metrics_check.toggled.connect(self.toggle_metrics)
+        layout.addWidget(self.metrics_check)
+
 
         # ---- filtro bianco e nero ----
         self.gray_button = QPushButton("Filtro bianco e nero: OFF")
@@ -398,34 +499,96 @@ class FaceApp(QWidget):
         self.snapshot_button.clicked.connect(self.save_snapshot)
         layout.addWidget(self.snapshot_button)
 
+        # burst: ogni frame della camera per qualche secondo, dal thread di acquisizione
+        self.burst_button = QPushButton(f"Burst {BURST_SECONDS} s")
+        self.burst_button.clicked.connect(self.start_burst)
+        layout.addWidget(self.burst_button)
+
+        # esito degli ultimi salvataggi (niente popup: il salvataggio è in background)
+        self.snapshot_status_label = QLabel("")
+        layout.addWidget(self.snapshot_status_label)
+
         # label per statistiche foto e video
-        self.photo_label = QLabel(f"Foto scattate: {self.photo_count}")
+        self.photo_label = QLabel(f"Foto scattate: {self.engine.photo_count}")
         layout.addWidget(self.photo_label)
 
-        self.video_label_widget = QLabel(f"Video registrati: {self.video_count}")
+        self.video_label_widget = QLabel(f"Video registrati: {self.engine.video_count}")
         layout.addWidget(self.video_label_widget)
 
-        self.last_photo_label = QLabel(f"Ultima foto: {self.last_photo}")
+        self.last_photo_label = QLabel(f"Ultima foto: {self.engine.last_photo}")
         layout.addWidget(self.last_photo_label)
 
-        self.last_video_label = QLabel(f"Ultimo video: {self.last_video}")
+        self.last_video_label = QLabel(f"Ultimo video: {self.engine.last_video}")
         layout.addWidget(self.last_video_label)
 
         group.setLayout(layout)
         return group
 
+    def create_overlay_group(self):
+        """Create the overlay group: what is drawn on the video and on the recordings."""
+        group = QGroupBox("Overlay")
+        layout = QGridLayout()
+        layout.addWidget(QLabel("Video"), 0, 1)
+        layout.addWidget(QLabel("Registrazione"), 0, 2)
+
+        for row, name in enumerate(OVERLAY_ELEMENTS, start=1):
+            layout.addWidget(QLabel(OVERLAY_LABELS[name]), row, 0)
+            display_check = QCheckBox()
+            display_check.setChecked(name in self.engine.display_overlays)
+            record_check = QCheckBox()
+            record_check.setChecked(name in self.engine.record_overlays)
+            if name == "fps":
+                self.fps_check = display_check
+                display_check.toggled.connect(self.toggle_fps)
+            else:
+                display_check.toggled.connect(
+                    lambda checked, n=name: self.toggle_overlay(self.engine.display_overlays, n, checked))
+            record_check.toggled.connect(
+                lambda checked, n=name: self.toggle_overlay(self.engine.record_overlays, n, checked))
+            layout.addWidget(display_check, row, 1)
+            layout.addWidget(record_check, row, 2)
+
+        group.setLayout(layout)
+        return group
+
     def create_savepath_group(self):
         """Create save path selection group."""
         group = QGroupBox("Percorso salvataggio")
         layout = QVBoxLayout()
 
-        self.path_label = QLabel(self.save_path)
+        self.path_label = QLabel(self.engine.save_path)
         layout.addWidget(self.path_label)
 
         self.change_path_button = QPushButton("Cambia")
         self.change_path_button.clicked.connect(self.change_save_path)
         layout.addWidget(self.change_path_button)
 
+        # ---- segmenti, quota disco e conservazione delle registrazioni ----
+        self.segment_label = QLabel(f"Durata segmenti: {int(self.engine.segment_seconds // 60)} min")
+        layout.addWidget(self.segment_label)
+        self.segment_slider = QSlider(Qt.Horizontal)
+        self.segment_slider.setRange(1, 30)
+        self.segment_slider.setValue(int(self.engine.segment_seconds // 60))
+        self.segment_slider.valueChanged.connect(self.update_segment_minutes)
+        layout.addWidget(self.segment_slider)
+
+        # 0 = limite spento: nessuna registrazione viene eliminata
+        self.quota_label = QLabel(self.quota_text(int(self.engine.storage.quota_gb)))
+        layout.addWidget(self.quota_label)
+        self.quota_slider = QSlider(Qt.Horizontal)
+        self.quota_slider.setRange(0, 500)
+        self.quota_slider.setValue(int(self.engine.storage.quota_gb))
+        self.quota_slider.valueChanged.connect(self.update_quota)
+        layout.addWidget(self.quota_slider)
+
+        self.retention_label = QLabel(self.retention_text(int(self.engine.storage.retention_days)))
+        layout.addWidget(self.retention_label)
+        self.retention_slider = QSlider(Qt.Horizontal)
+        self.retention_slider.setRange(0, 365)
+        self.retention_slider.setValue(int(self.engine.storage.retention_days))
+        self.retention_slider.valueChanged.connect(self.update_retention)
+        layout.addWidget(self.retention_slider)
+
         group.setLayout(layout)
         return group
 
@@ -435,9 +598,31 @@ class FaceApp(QWidget):
     def change_save_path(self):
         """Change the save path for photos and videos."""
         if folder := QFileDialog.getExistingDirectory(self, "Scegli cartella"):
-            self.save_path = folder
+            self.engine.set_save_path(folder)
             self.path_label.setText(folder)
-            self.save_stats()
+
+    def update_segment_minutes(self, value):
+        """Set the duration of the recording segments (applies to the next recording)."""
+        self.engine.segment_seconds = value * 60
+        self.segment_label.setText(f"Durata segmenti: {value} min")
+
+    def update_quota(self, value):
+        """Set the disk quota of the recordings; the evictor applies it at its next check."""
+        self.engine.storage.quota_gb = value
+        self.quota_label.setText(self.quota_text(value))
+
+    def update_retention(self, value):
+        """Set how many days recordings are kept."""
+        self.engine.storage.retention_days = value
+        self.retention_label.setText(self.retention_text(value))
+
+    @staticmethod
+    def quota_text(value):
+        return f"Quota disco: {value} GB" if value else "Quota disco: disattivata"
+
+    @staticmethod
+    def retention_text(value):
+        return f"Conservazione: {value} giorni" if value else "Conservazione: illimitata"
 
     def toggle_sidebar(self):
         """Toggle sidebar visibility and adjust layout."""
@@ -459,58 +644,142 @@ class FaceApp(QWidget):
         new_index = self.available_indices[index]
         new_name = self.available_names[index]
 
-        if self.cap.isOpened():
-            self.cap.release()
+        # una webcam non può essere contemporaneamente principale ed extra
+        if new_index in self.extra_channels:
+            self.extra_cam_checks[new_index].setChecked(False)
 
-        self.cap = cv2.VideoCapture(new_index, cv2.CAP_MSMF)
-        if not self.cap.isOpened():
+        if not self.engine.open_camera(new_index, new_name):
             QMessageBox.warning(self, "Errore", "Impossibile aprire la webcam selezionata.")
             return
-
-        self.current_cam_index = new_index
-        self.current_cam_name = new_name
-        self.cam_name_label.setText(f"Webcam attiva: {self.current_cam_name}")
+        self.cam_name_label.setText(f"Webcam attiva: {new_name}")
 
     def choose_color(self):
         """Open color picker dialog for rectangle color."""
-        color = QColorDialog.getColor(self.rect_color, self, "Scegli colore")
+        b, g, r = self.engine.rect_color
+        color = QColorDialog.getColor(QColor(r, g, b), self, "Scegli colore")
         if color.isValid():
-            self.rect_color = color
+            self.engine.rect_color = (color.blue(), color.green(), color.red())
+
+    def change_mask_mode(self, index):
+        """Select which kind of motion mask the mouse draws on the video."""
+        self.mask_mode = (None, "include", "exclude")[index]
+        self.mask_drag_start = None
+        self.engine.mask_preview = None
+        self.engine.show_masks = self.mask_mode is not None
+
+    def clear_motion_masks(self):
+        """Remove every include/exclude motion mask."""
+        self.engine.motion_detector.set_masks()
+        self.engine.motion_detector.save_masks()
+
+    def label_to_frame(self, pos):
+        """Map a point on video_label to normalised (0..1) frame coordinates, or None."""
+        pixmap = self.video_label.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return None
+        # il pixmap è centrato nella label con KeepAspectRatio
+        ox = (self.video_label.width() - pixmap.width()) / 2
+        oy = (self.video_label.height() - pixmap.height()) / 2
+        nx = (pos.x() - ox) / pixmap.width()
+        ny = (pos.y() - oy) / pixmap.height()
+        return min(max(nx, 0.0), 1.0), min(max(ny, 0.0), 1.0)
+
+    def eventFilter(self, obj, event):
+        """Draw motion mask rectangles with the mouse on the video label."""
+        if obj is self.video_label and self.mask_mode is not None:
+            if event.type() == QEvent.MouseButtonPress:
+                self.mask_drag_start = self.label_to_frame(event.position())
+                return True
+            if event.type() == QEvent.MouseMove and self.mask_drag_start is not None:
+                end = self.label_to_frame(event.position())
+                if end is not None:
+                    (x1, y1), (x2, y2) = self.mask_drag_start, end
+                    self.engine.mask_preview = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+                return True
+            if event.type() == QEvent.MouseButtonRelease and self.mask_drag_start is not None:
+                rect = self.engine.mask_preview
+                self.mask_drag_start = None
+                self.engine.mask_preview = None
+                if rect is not None and rect[2] - rect[0] > 0.01 and rect[3] - rect[1] > 0.01:
+                    detector = self.engine.motion_detector
+                    include = list(detector.include)
+                    exclude = list(detector.exclude)
+                    (include if self.mask_mode == "include" else exclude).append(rect)
+                    detector.set_masks(include, exclude)
+                    detector.save_masks()
+                return True
+        return super().eventFilter(obj, event)
+
+    def toggle_identity(self, checked):
+        """Enable or disable the recognition of the enrolled people."""
+        self.engine.identity_enabled = checked
+
+    def toggle_face_tracking(self, checked):
+        """Switch between detect-then-track and full Haar detection on every frame."""
+        self.engine.face_tracking_enabled = checked
+        self.engine.face_tracker.reset()
 
     def update_thickness(self, value):
         """Update rectangle thickness from slider."""
-        self.rect_thickness = value
+        self.engine.rect_thickness = value
+
+    def update_preroll(self, value):
+        """Update the pre-roll length (0 disables it)."""
+        self.engine.preroll_seconds = value
+        self.engine.preroll.seconds = value
+        self.preroll_label.setText(f"Pre-roll: {value} s")
+        if value == 0:
+            self.engine.preroll.clear()
 
     def update_zoom(self, value):
         """Update zoom factor from slider."""
-        self.zoom_factor = value / 100.0
+        self.engine.zoom_factor = value / 100.0
 
     def toggle_coords(self, checked):
         """Toggle coordinate display."""
-        self.show_coords = checked
+        self.engine.show_coords = checked
+
+    def toggle_metrics(self, checked):
+        """Turn the per-stage latency instrumentation and its debug overlay on or off."""
+        self.engine.show_metrics = checked
+        self.engine.set_metrics(checked)
 
     def toggle_fps(self, checked):
         """Toggle FPS display."""
         self.show_fps = checked
+        self.toggle_overlay(self.engine.display_overlays, "fps", checked)
+
+    def toggle_overlay(self, overlays, name, checked):
+        """Add or remove one element from the display or recording overlay set."""
+        if checked:
+            overlays.add(name)
+        else:
+            overlays.discard(name)
 
     def toggle_camera(self):
         """Start or stop camera stream."""
         if self.running:
             self.timer.stop()
-            self.video_label.clear()
+            self.render_timer.stop()
+            self.engine.stop_capture()
+            self.display.clear()
             self.start_button.setText("Start Camera")
             self.start_button.setStyleSheet("background-color: green; color: white;")
         else:
-            self.timer.start(30)
+            self.camera_start_time = time.monotonic()
+            self.first_frame_shown = False
+            self.engine.start_capture()
+            self.timer.start(FRAME_POLL_INTERVAL_MS)
+            self.render_timer.start()
             self.start_button.setText("Stop Camera")
             self.start_button.setStyleSheet("background-color: red; color: white;")
         self.running = not self.running
 
     def toggle_gray_filter(self):
         """Toggle grayscale filter on/off."""
-        self.gray_filter = not self.gray_filter
+        self.engine.gray_filter = not self.engine.gray_filter
 
-        if self.gray_filter:
+        if self.engine.gray_filter:
             self.gray_button.setText("Filtro bianco e nero: ON")
             self.gray_button.setStyleSheet("background-color: #444444; color: white;")
         else:
@@ -519,331 +788,223 @@ class FaceApp(QWidget):
 
     def toggle_motion_button(self, checked):
         """Toggle motion detection on/off."""
-        self.motion_enabled = checked
+        self.engine.motion_enabled = checked
         if checked:
             self.motion_button.setText("Motion Recording: ON")
             self.motion_button.setStyleSheet("background-color: #28a745; color: white;")
         else:
             self.motion_button.setText("Motion Recording: OFF")
             self.motion_button.setStyleSheet("background-color: #6c757d; color: white;")
-            self.prev_gray = None  # reset motion detection
+            self.engine.motion_detector.reset()  # reset motion detection
+            self.engine.preroll.clear()
 
     def toggle_yolo_button(self, checked):
         """Toggle YOLO object detection on/off."""
-        self.yolo_enabled = checked
+        self.engine.yolo_enabled = checked
         if checked:
             self.yolo_button.setText("Rilevamento YOLO: ON")
             self.yolo_button.setStyleSheet("background-color: #28a745; color: white;")
         else:
             self.yolo_button.setText("Rilevamento YOLO: OFF")
             self.yolo_button.setStyleSheet("background-color: #6c757d; color: white;")
-            self.yolo_results_cache = []  # Clear cache when disabled
+            self.engine.yolo_results_cache = []  # Clear cache when disabled
+            self.engine.yolo_results_frame_id = -1
+            self.engine.yolo_worker.clear()
 
     def choose_yolo_color(self):
         """Open color dialog for YOLO box color."""
-        color = QColorDialog.getColor(self.yolo_rect_color, self, "Scegli colore box YOLO")
+        b, g, r = self.engine.yolo_rect_color
+        color = QColorDialog.getColor(QColor(r, g, b), self, "Scegli colore box YOLO")
         if color.isValid():
-            self.yolo_rect_color = color
+            self.engine.yolo_rect_color = (color.blue(), color.green(), color.red())
 
     def update_yolo_thickness(self, value):
         """Update YOLO box thickness from slider."""
-        self.yolo_rect_thickness = value
+        self.engine.yolo_rect_thickness = value
+
+    def toggle_recognition(self, checked):
+        """Toggle known objects recognition on/off."""
+        self.engine.recognition_enabled = checked
+        if not checked:
+            self.engine.recognized_objects = []
+            self.engine.recognition_worker.clear()
+
+    def toggle_yolo_roi(self, checked):
+        """Restrict YOLO to the motion regions, or analyse the whole frame."""
+        self.engine.yolo_roi = checked
+
+    def toggle_scheduler(self, checked):
+        """Let the scheduler adapt the YOLO and Haar frequency, or keep the fixed intervals."""
+        self.engine.scheduler.enabled = checked
+        self.engine.scheduler.update(None, 0.0)  # esce subito da un'eventuale sospensione
+
+    def update_yolo_interval(self, value):
+        """Update the number of frames between two YOLO submissions."""
+        self.engine.yolo_interval = value
+        self.yolo_interval_label.setText(f"Intervallo rilevamento: {value} frame")
 
 
     # ============================================================================================
-    # REGISTRAZIONE VIDEO, con salvataggio del file + LOGGING
+    # REGISTRAZIONE VIDEO (gestita dal motore, qui solo pulsanti ed errori)
     # ============================================================================================
     def toggle_recording(self):
         """Start or stop video recording."""
-        if not self.running:
-            QMessageBox.warning(self, "Errore", "La camera deve essere attiva per registrare.")
-            return
-
-        if self.recording:
-            # ---- stoppa la registrazione ----
-            self.recording = False
-            self.record_button.setText("Start Recording")
-            self.record_button.setStyleSheet("background-color: #173c68; color: white;")
-
-            if self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
-
-            # Calcolo durata per il log
-            if self.recording_start_time:
-                duration_sec = int(time.time() - self.recording_start_time)
-                duration_str = time.strftime("%H:%M:%S", time.gmtime(duration_sec))
+        try:
+            if self.engine.recording:
+                self.engine.stop_recording()
             else:
-                duration_str = "??:??:??"
-
-            # LOG DI CHIUSURA
-            logger.info(
-                "Registrazione TERMINATA | durata=%s | frame con volti=%d | luogo=%s",
-                duration_str,
-                self.face_detection_counter,
-                self.location
-            )
-
-            self.last_video = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            self.last_video_label.setText(f"Ultimo video: {self.last_video}")
-            self.save_stats()
-            QMessageBox.information(self, "Registrazione", "Video salvato con successo!")
-
-            # Reset per prossima registrazione
-            self.face_detection_counter = 0
-            self.recording_start_time = None
-
-        else:
-            # ---- inizia la registrazione ----
-            filename = datetime.datetime.now().strftime("record_%Y%m%d_%H%M%S.mp4")
-            full_path = os.path.join(self.save_path, filename)
-
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-            self.video_writer = cv2.VideoWriter(full_path, fourcc, 30, (w, h))
-
-            if not self.video_writer.isOpened():
-                QMessageBox.warning(self, "Errore", "Impossibile creare il file video.")
-                self.video_writer = None
-                return
-
-            self.recording = True
-            self.recording_start_time = time.time()
-            self.record_start_time = time.time()
-            self.face_detection_counter = 0
-
-            self.video_count += 1
-            self.video_label_widget.setText(f"Video registrati: {self.video_count}")
+                self.engine.start_recording()
+        except EngineError as e:
+            QMessageBox.warning(self, "Errore", str(e))
+
+    def recording_changed(self, recording):
+        """Update the UI when a recording starts or stops (also when started by motion)."""
+        if recording:
+            self.video_label_widget.setText(f"Video registrati: {self.engine.video_count}")
             self.record_button.setText("Stop Recording")
             self.record_button.setStyleSheet("background-color: red; color: white;")
-            self.save_stats()
-
-            # LOG DI INIZIO
-            logger.info(
-                "Registrazione INIZIATA | file=%s | luogo=%s",
-                filename,
-                self.location
-            )
+        else:
+            self.record_button.setText("Start Recording")
+            self.record_button.setStyleSheet("background-color: #173c68; color: white;")
+            # nessun messaggio modale: questo gira dentro process() (anche per gli stop da movimento)
+            # e il suo event loop annidato fermerebbe l'elaborazione fino al clic
+            self.last_video_label.setText(f"Ultimo video: {self.engine.last_video} (salvato)")
 
 
     # ============================================================================================
     # SNAPSHOT, con salvataggio dell'immagine e aggiornamento delle statistiche
     # ============================================================================================
     def save_snapshot(self):
-        """Capture and save a grayscale snapshot from the camera."""
+        """Queue a grayscale snapshot of the last processed frame (written in background)."""
         try:
-            ret, frame = self.cap.read()
-            if not ret:
-                QMessageBox.warning(self, "Errore", "Impossibile catturare l'immagine.")
-                return
-
-            frame = cv2.flip(frame, 1)
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-            filename = datetime.datetime.now().strftime("snapshot_%Y%m%d_%H%M%S.png")
-            full_path = os.path.join(self.save_path, filename)
-
-            success = cv2.imwrite(full_path, gray)
-            if not success:
-                QMessageBox.warning(self, "Errore", "Impossibile salvare la foto.")
-                return
+            path = self.engine.save_snapshot()
+        except EngineError as e:
+            QMessageBox.warning(self, "Errore", str(e))
+            return
+        self.snapshot_status_label.setText(f"Salvataggio: {os.path.basename(path)}")
+        self.snapshot_timer.start()
 
-            self.photo_count += 1
-            self.last_photo = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-            self.photo_label.setText(f"Foto scattate: {self.photo_count}")
-            self.last_photo_label.setText(f"Ultima foto: {self.last_photo}")
-            self.save_stats()
-            QMessageBox.information(self, "Snapshot", "Foto in bianco e nero salvata con successo!")
-        except Exception as e:
-            logger.error(f"Error saving snapshot: {e}")
-            QMessageBox.warning(self, "Errore", f"Errore nel salvataggio: {e}")
+    def start_burst(self):
+        """Save every camera frame for BURST_SECONDS seconds."""
+        try:
+            folder = self.engine.start_burst()
+        except EngineError as e:
+            QMessageBox.warning(self, "Errore", str(e))
+            return
+        if folder:
+            self.burst_button.setEnabled(False)
+            self.burst_button.setText("Burst in corso...")
+            self.snapshot_status_label.setText(f"Burst: {os.path.basename(folder)}")
+            self.snapshot_timer.start()
+
+    def refresh_snapshot_status(self):
+        """Show the outcome of the background saves; stops once nothing is pending."""
+        engine = self.engine
+        self.photo_label.setText(f"Foto scattate: {engine.photo_count}")
+        self.last_photo_label.setText(f"Ultima foto: {engine.last_photo}")
+        writer = engine.image_writer
+        if writer.last_error:
+            self.snapshot_status_label.setText(writer.last_error)
+            writer.last_error = None
+        elif writer.queue.empty() and writer.last_path:
+            self.snapshot_status_label.setText(f"Salvata: {os.path.basename(writer.last_path)}")
+
+        # esito del burst solo a scritture terminate, con i contatori di quel burst
+        burst = engine.last_burst
+        burst_done = engine.burst is None and (burst is None or burst.finished)
+        if burst_done and not self.burst_button.isEnabled():
+            self.burst_button.setEnabled(True)
+            self.burst_button.setText(f"Burst {BURST_SECONDS} s")
+            if burst is not None:
+                lost = burst.dropped + burst.failed
+                self.snapshot_status_label.setText(
+                    f"Burst: {burst.saved} di {burst.frames} frame salvati"
+                    + (f", {lost} persi" if lost else "")
+                )
+        if burst_done and writer.queue.empty():
+            self.snapshot_timer.stop()
 
 
     # ============================================================================================
-    # LOOP PRINCIPALE DI ACQUISIZIONE
+    # LOOP PRINCIPALE: il motore elabora, l'interfaccia mostra
     # ============================================================================================
     def update_frame(self):
-        """Capture frame, process, and display on label."""
-        ret, frame = self.cap.read()
-        if not ret:
+        """Process the newest captured frame with the engine and hand it to the display."""
+        frame = self.engine.step()
+        if frame is not None:
+            self.display.submit(frame)
+
+    def render_frame(self):
+        """Draw the latest processed frame, at most once per screen refresh."""
+        if not self.display.render():
             return
-
-        frame = cv2.flip(frame, 1)
-        
-        # Convert to grayscale once - reuse for motion detection and face detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # ---- filtro bianco e nero ----
-        if self.gray_filter:
-            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
-
-        # ---- zoom digitale ----
-        if self.zoom_factor > 1.0:
-            h, w = frame.shape[:2]
-            new_w = int(w / self.zoom_factor)
-            new_h = int(h / self.zoom_factor)
-            x1 = (w - new_w) // 2
-            y1 = (h - new_h) // 2
-            frame = frame[y1:y1+new_h, x1:x1+new_w]
-            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_LINEAR)
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # ============================================================================================
-        # MOTION DETECTION LOGIC (AUTO RECORDING)
-        # ============================================================================================
-        if self.motion_enabled:
-            if self.prev_gray is None:
-                self.prev_gray = gray.copy()
-            else:
-                # Calculate difference between frames
-                delta = cv2.absdiff(self.prev_gray, gray)
-                thresh = cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)[1]
-                motion_pixels = cv2.countNonZero(thresh)
-
-                # Motion detected
-                if motion_pixels > self.motion_threshold:
-                    self.motion_last_seen = time.time()
-
-                    # Start recording ONLY if not already recording
-                    if not self.recording:
-                        self.toggle_recording()
-                        self.motion_recording_active = True
-
-                # No motion detected for X seconds
-                else:
-                    if (
-                        self.motion_recording_active
-                        and self.recording
-                        and time.time() - self.motion_last_seen > self.motion_grace_seconds
-                    ):
-                        self.toggle_recording()
-                        self.motion_recording_active = False
-
-                self.prev_gray = gray.copy()
-        
-        # ---- rilevazione volti ----
-        faces = self.detector.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(40, 40))
-
-        # Conta i frame dove sono stati rilevati volti (non il numero totale di volti)
-        if self.recording and len(faces) > 0:
-            self.face_detection_counter += 1
-
-        # Disegna rettangoli attorno ai volti
-        for (x, y, w, h) in faces:
-            cv2.rectangle(
-                frame, (x, y), (x+w, y+h),
-                (self.rect_color.blue(), self.rect_color.green(), self.rect_color.red()),
-                self.rect_thickness
-            )
-            if self.show_coords:
-                cv2.putText(
-                    frame, f"{x},{y}", (x, y-10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1
-                )
-
-        # ---- YOLO Object Detection (every 3 frames for performance) ----
-        self.frame_counter += 1
-        if self.yolo_enabled:
-            if self.frame_counter % 3 == 0:
-                # Run YOLO on optimized resolution (960x720) for balance between accuracy and speed
-                h_orig, w_orig = frame.shape[:2]
-                small_frame = cv2.resize(frame, (960, 720))
-                results = self.yolo_model(small_frame, verbose=False, conf=0.45)
-                
-                # Scale factors to map detections back to original frame
-                scale_x = w_orig / 960.0
-                scale_y = h_orig / 720.0
-                
-                # Cache the results
-                self.yolo_results_cache = []
-                for r in results:
-                    for box in r.boxes:
-                        cls = int(box.cls[0])
-                        conf = box.conf[0]
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        # Scale coordinates back to original frame
-                        x1 = int(x1 * scale_x)
-                        y1 = int(y1 * scale_y)
-                        x2 = int(x2 * scale_x)
-                        y2 = int(y2 * scale_y)
-                        self.yolo_results_cache.append({
-                            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-                            'label': f"{r.names[cls]} {conf:.2f}"
-                        })
-            
-            # Draw cached results on all frames
-            for detection in self.yolo_results_cache:
-                cv2.rectangle(frame, (detection['x1'], detection['y1']), (detection['x2'], detection['y2']), 
-                            (self.yolo_rect_color.blue(), self.yolo_rect_color.green(), self.yolo_rect_color.red()),
-                            self.yolo_rect_thickness)
-                cv2.putText(frame, detection['label'], (detection['x1'], detection['y1'] - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, 
-                           (self.yolo_rect_color.blue(), self.yolo_rect_color.green(), self.yolo_rect_color.red()), 2)
-
-        # ---- mostra FPS ----
-        now = time.time()
-        self.fps = 1.0 / max(now - self.prev_time, 0.0001)
-        self.prev_time = now
-        
-        if self.show_fps:
-            cv2.putText(
-                frame, f"FPS: {int(self.fps)}", (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2
-            )
-
-        # ---- informazioni data ----
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        date_str = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        cv2.putText(
-            frame, date_str, (10, frame.shape[0]-10),
-            font, 0.6, (200, 200, 200), 2
-        )
-
-        # ---- mostra registrazione con tempo e luogo ----
-        if self.recording and self.video_writer:
-            elapsed = int(time.time() - self.record_start_time)
-            timer_str = time.strftime("%H:%M:%S", time.gmtime(elapsed))
-            
-            # cerchio di registrazione rosso
-            cv2.circle(frame, (20, 60), 10, (0, 0, 255), -1)
-            cv2.putText(frame, "REC", (40, 65), font, 0.7, (0, 0, 255), 2)
-            cv2.putText(frame, timer_str, (100, 65), font, 0.8, (255, 255, 255), 2)
-            
-            # posizione del luogo a destra del timer
-            (tx_w, tx_h), _ = cv2.getTextSize(timer_str, font, 0.8, 2)
-            loc_x = 100 + tx_w + 12
-            cv2.putText(frame, self.location, (loc_x, 65), font, 0.6, (200, 200, 200), 2)
-            
-            # salva il frame nel video
-            self.video_writer.write(frame)
-        else:
-            # se non stiamo registrando, mostra comunque la posizione
-            cv2.putText(
-                frame, self.location, (10, frame.shape[0]-40),
-                font, 0.6, (200, 200, 200), 2
+        if not self.first_frame_shown:
+            self.first_frame_shown = True
+            now = time.monotonic()
+            logger.info(
+                "Primo frame mostrato | dall'avvio camera=%.2fs | dall'avvio processo=%.2fs",
+                now - self.camera_start_time,
+                now - APP_START_TIME
             )
 
-        # ---- Convert and Display Frame ----
-        self.last_frame = frame.copy()
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        img = QImage(rgb.data, w, h, ch*w, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(img).scaled(
-            self.video_label.size(),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        self.video_label.setPixmap(pixmap)
-
     # ============================================================================================
-    # CAMERA EXTRA (placeholder per future implementazioni di feed multipli)
+    # CAMERA EXTRA, ognuna con la propria pipeline e il worker YOLO condiviso
     # ============================================================================================
+    def toggle_extra_camera(self, index, checked):
+        """Start or stop monitoring an additional webcam."""
+        if not checked:
+            self.remove_extra_camera(index)
+            return
+        if index == self.engine.current_cam_index:
+            QMessageBox.warning(self, "Errore", "La webcam è già quella principale.")
+            self.extra_cam_checks[index].setChecked(False)
+            return
+        if index in self.extra_channels:
+            return
+
+        name = self.available_names[self.available_indices.index(index)]
+        # le impostazioni vengono riprese dal motore principale a ogni frame
+        channel = CameraChannel(index, name, self.engine)
+        channel.start()
+        self.extra_channels[index] = channel
+
+        label = QLabel(f"{name}: avvio...", alignment=Qt.AlignCenter)
+        label.setObjectName("extra_cam_label")
+        self.extra_cam_widgets[index] = label
+        self.relayout_extra_cams()
+
+    def remove_extra_camera(self, index):
+        """Stop an extra webcam pipeline and remove its preview."""
+        channel = self.extra_channels.pop(index, None)
+        if channel is not None:
+            channel.stop(wait=False)  # la chiusura del file avviene sul thread del canale
+        self.engine.yolo_worker.clear(f"cam{index}")
+        label = self.extra_cam_widgets.pop(index, None)
+        if label is not None:
+            self.extra_cams_grid.removeWidget(label)
+            label.deleteLater()
+        self.relayout_extra_cams()
+
+    def relayout_extra_cams(self):
+        """Place the extra camera previews in a grid, EXTRA_CAMS_COLUMNS per row."""
+        for pos, index in enumerate(sorted(self.extra_cam_widgets)):
+            label = self.extra_cam_widgets[index]
+            self.extra_cams_grid.removeWidget(label)
+            self.extra_cams_grid.addWidget(label, pos // EXTRA_CAMS_COLUMNS, pos % EXTRA_CAMS_COLUMNS)
+
     def update_extra_cams(self):
-        """Update extra camera feeds (placeholder)."""
-        pass
+        """Show the latest thumbnail produced by each extra camera pipeline."""
+        for index, channel in self.extra_channels.items():
+            label = self.extra_cam_widgets[index]
+            if channel.error:
+                label.setText(f"{channel.cam_name}: {channel.error}")
+                continue
+            thumb = channel.thumbnail
+            if thumb is None:
+                continue
+            label.setPixmap(to_pixmap(thumb))
+            label.setToolTip(f"{channel.cam_name} | FPS: {int(channel.engine.fps_avg)}"
+                             + (" | REC" if channel.engine.recording else ""))
 
     # ============================================================================================
     # CLEANUP DELLE RISORSE ALLA CHIUSURA DELL'APPLICAZIONE, PER EVITARE LOCK DI WEBCAM E FILE
@@ -852,16 +1013,17 @@ class FaceApp(QWidget):
         """Clean up resources on application close."""
         if self.timer.isActive():
             self.timer.stop()
+        self.render_timer.stop()
         if self.extra_timer.isActive():
             self.extra_timer.stop()
-
-        if self.cap.isOpened():
-            self.cap.release()
-        for cap in self.extra_caps:
-            if cap.isOpened():
-                cap.release()
-        if self.video_writer:
-            self.video_writer.release()
+        self.webcam_timer.stop()
+        self.startup_timer.stop()
+        self.snapshot_timer.stop()
+        self.webcam_watcher.stop()
+
+        for channel in self.extra_channels.values():
+            channel.stop()
+        self.engine.close()
 
         event.accept()
 
@@ -1,11 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# modelli ONNX dei volti (python identity.py download), inclusi solo se già scaricati
+datas = [('models', 'models')] if os.path.isdir('models') else []
 
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=datas,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -16,19 +20,18 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# build "onedir": niente estrazione in una cartella temporanea a ogni avvio e niente
+# decompressione UPX delle DLL di OpenCV/Qt/torch, che rallentavano il primo frame
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='main',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +40,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['icona.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='main',
+)
@@ -0,0 +1,196 @@
+# =============================================================================================
+# METRICHE - latenza di ogni stadio della pipeline, istogrammi ed esportazione Prometheus
+# =============================================================================================
+#   Ogni stadio di Engine.process viene cronometrato con perf_counter dentro un
+#   `with metrics.time("stadio")`. Con le metriche spente time() restituisce un contesto
+#   vuoto condiviso: nessuna lettura dell'orologio, nessuna allocazione. Con le metriche
+#   accese ogni campione finisce in una finestra mobile (percentili dell'overlay di debug)
+#   e in un istogramma cumulativo, scritto periodicamente in formato testo Prometheus.
+# =============================================================================================
+import os
+import time
+import logging
+import threading
+
+from collections import deque
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+METRICS_FILE = "faceapp_metrics.prom"
+METRICS_PREFIX = "faceapp"
+METRICS_WINDOW = 300              # campioni per stadio usati per i percentili (~10 s a 30 fps)
+METRICS_EXPORT_INTERVAL = 10.0    # secondi tra due scritture del file Prometheus
+METRICS_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)  # secondi
+
+
+class StageStats:
+    """Latency samples of one stage: a rolling window plus cumulative histogram buckets."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = deque(maxlen=window)
+        self.buckets = [0] * (len(METRICS_BUCKETS) + 1)   # l'ultimo è +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.window.append(seconds)
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(METRICS_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, p):
+        """p-th percentile (0-100) of the rolling window, in seconds."""
+        if not self.window:
+            return 0.0
+        ordered = sorted(self.window)
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+class _StageTimer:
+    """Context manager timing one stage into a Metrics instance."""
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Context manager that does nothing, returned while metrics are disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# =============================================================================================
+# REGISTRO DELLE METRICHE
+# =============================================================================================
+class Metrics:
+    """Per-stage latency histograms and gauges; everything is a no-op while disabled.
+
+    `time(name)` is meant for a single processing thread (one timer object per stage);
+    other threads report durations they measured themselves through `observe()`.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stages = {}             # nome stadio -> StageStats, in ordine di prima misura
+        self._timers = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def time(self, name):
+        """Return a context manager that records the duration of its block under `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _StageTimer(self, name)
+        return timer
+
+    def observe(self, name, seconds):
+        """Record one duration, in seconds, for stage `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.observe(seconds)
+
+    def set_gauge(self, name, value):
+        """Set an instantaneous value exported next to the histograms (e.g. fps)."""
+        if self.enabled:
+            self._gauges[name] = value
+
+    def reset(self):
+        """Drop every sample and gauge."""
+        with self._lock:
+            self._stages.clear()
+            self._gauges.clear()
+
+    def summary(self):
+        """Return [(stage, p50_ms, p99_ms, count)] over each stage's rolling window."""
+        with self._lock:
+            return [(name, s.percentile(50) * 1000.0, s.percentile(99) * 1000.0, s.count)
+                    for name, s in self._stages.items()]
+
+    def prometheus_text(self):
+        """Render every histogram and gauge in the Prometheus text exposition format."""
+        metric = f"{METRICS_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {metric} Latency of each frame-processing stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for name, s in self._stages.items():
+                cumulative = 0
+                for bound, count in zip(METRICS_BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {s.total:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {s.count}')
+            gauges = dict(self._gauges)
+        for name, value in gauges.items():
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            lines.append(f"{METRICS_PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the Prometheus text file atomically (node_exporter textfile style)."""
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics: {e}")
+
+
+# =============================================================================================
+# ESPORTAZIONE PERIODICA
+# =============================================================================================
+class MetricsExporter(threading.Thread):
+    """Rewrite the metrics file every `interval` seconds, and once more when stopped."""
+
+    def __init__(self, metrics, path=METRICS_FILE, interval=METRICS_EXPORT_INTERVAL):
+        super().__init__(name="metrics", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.metrics.write(self.path)
+        self.metrics.write(self.path)
+
+    def stop(self, timeout=2.0):
+        """Stop the exporter after a final write."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
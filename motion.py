@@ -0,0 +1,153 @@
+# =============================================================================================
+# MOTION ENGINE - modello di sfondo su frame ridotto, maschere di inclusione/esclusione, regioni
+# =============================================================================================
+import json
+import logging
+
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+MOTION_WIDTH = 320                # larghezza del frame su cui lavora il modello di sfondo
+MOTION_METHOD = "mog2"            # "mog2" oppure "average" (media mobile)
+MOTION_WARMUP_FRAMES = 15         # frame per imparare lo sfondo prima di segnalare movimento
+MOTION_MIN_REGION_AREA = 0.002    # area minima di una regione, in frazione del frame
+MOTION_GLOBAL_CHANGE = 0.6        # oltre questa frazione di pixel cambiati è un cambio di luce
+MOTION_AVERAGE_ALPHA = 0.05       # velocità di aggiornamento della media mobile
+MOTION_MASKS_FILE = "motion_masks.json"
+
+
+@dataclass
+class MotionResult:
+    """Outcome of one motion update, in the coordinates of the full frame."""
+    motion_pixels: int = 0        # pixel in movimento, riportati alla risoluzione piena
+    regions: list = field(default_factory=list)   # (x, y, w, h) delle zone in movimento
+    lighting_change: bool = False
+
+
+class MotionDetector:
+    """Background-subtraction motion detector working on a small grey copy of the frame.
+
+    Include/exclude masks are rectangles in normalised coordinates (0..1), so they stay
+    valid when the resolution or the zoom changes: motion is counted only inside the
+    include rectangles (the whole frame if there are none) and never inside excluded ones.
+    """
+
+    def __init__(self, width=MOTION_WIDTH, method=MOTION_METHOD):
+        self.width = width
+        self.method = method
+        self.include = []             # (x1, y1, x2, y2) normalizzati
+        self.exclude = []
+        self.reset()
+
+    def reset(self):
+        """Forget the background model (e.g. after switching camera)."""
+        self.frames_seen = 0
+        self._model = None
+        self._average = None
+        self._mask = None
+        self._mask_shape = None
+
+    # ============================================================================================
+    # MASCHERE
+    # ============================================================================================
+    def set_masks(self, include=(), exclude=()):
+        """Replace the include/exclude rectangles (normalised x1, y1, x2, y2)."""
+        self.include = [tuple(r) for r in include]
+        self.exclude = [tuple(r) for r in exclude]
+        self._mask = None
+
+    def load_masks(self, path=MOTION_MASKS_FILE):
+        """Load the rectangles saved by save_masks, if any."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.set_masks(data.get("include", []), data.get("exclude", []))
+        except (OSError, ValueError, TypeError) as e:
+            logger.debug(f"No motion masks loaded: {e}")
+
+    def save_masks(self, path=MOTION_MASKS_FILE):
+        """Persist the current rectangles."""
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"include": self.include, "exclude": self.exclude}, f, indent=4)
+        except OSError as e:
+            logger.warning(f"Failed to save motion masks: {e}")
+
+    def _build_mask(self, shape):
+        """Rasterise the rectangles at the working resolution."""
+        h, w = shape
+        mask = np.zeros((h, w), np.uint8) if self.include else np.full((h, w), 255, np.uint8)
+        for rects, value in ((self.include, 255), (self.exclude, 0)):
+            for x1, y1, x2, y2 in rects:
+                cv2.rectangle(mask, (int(x1 * w), int(y1 * h)), (int(x2 * w), int(y2 * h)), value, -1)
+        self._mask = mask
+        self._mask_shape = shape
+
+    # ============================================================================================
+    # AGGIORNAMENTO
+    # ============================================================================================
+    def update(self, gray):
+        """Feed one full-resolution grey frame and return a MotionResult."""
+        h, w = gray.shape[:2]
+        scale = min(1.0, self.width / float(w))
+        small = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        if self._mask is None or self._mask_shape != small.shape:
+            self._build_mask(small.shape)
+
+        foreground = self._foreground(small)
+        self.frames_seen += 1
+        if self.frames_seen <= MOTION_WARMUP_FRAMES:
+            return MotionResult()
+
+        foreground = cv2.bitwise_and(foreground, self._mask)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+        changed = cv2.countNonZero(foreground)
+
+        active_area = max(cv2.countNonZero(self._mask), 1)
+        if changed > MOTION_GLOBAL_CHANGE * active_area:
+            # luce accesa/spenta o esposizione automatica: lo sfondo si riadatta, nessun evento
+            self._relearn(small)
+            return MotionResult(lighting_change=True)
+
+        regions = []
+        min_area = MOTION_MIN_REGION_AREA * small.size
+        contours, _ = cv2.findContours(cv2.dilate(foreground, None, iterations=2),
+                                       cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            if cv2.contourArea(contour) < min_area:
+                continue
+            x, y, rw, rh = cv2.boundingRect(contour)
+            regions.append((int(x / scale), int(y / scale), int(rw / scale), int(rh / scale)))
+
+        return MotionResult(int(changed / (scale * scale)), regions)
+
+    def _foreground(self, small):
+        """Return the binary foreground mask of the background model."""
+        if self.method == "average":
+            if self._average is None:
+                self._average = small.astype(np.float32)
+            delta = cv2.absdiff(small, cv2.convertScaleAbs(self._average))
+            cv2.accumulateWeighted(small, self._average, MOTION_AVERAGE_ALPHA)
+            return cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)[1]
+
+        if self._model is None:
+            self._model = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
+        foreground = self._model.apply(small)
+        # le ombre (valore 127) non contano come movimento
+        return cv2.threshold(foreground, 200, 255, cv2.THRESH_BINARY)[1]
+
+    def _relearn(self, small):
+        """Restart the background model from the current frame."""
+        self._model = None
+        self._average = None
+        self.frames_seen = 0
+        self._foreground(small)
@@ -0,0 +1,77 @@
+# =============================================================================================
+# MULTI-CAMERA - una Engine per camera extra, sul proprio thread, con i worker condivisi
+# =============================================================================================
+#   Ogni camera extra è una Engine figlia del motore principale: stessa pipeline (movimento
+#   sui timestamp di cattura, volti, YOLO, pre-roll, segmenti, journal) e stesse
+#   impostazioni, riprese a ogni frame. Il worker YOLO, il journal, l'evictor e gli image
+#   writer sono quelli del motore principale: un solo modello per tutte le camere, che ne
+#   raggruppa i frame in un'unica chiamata.
+# =============================================================================================
+import logging
+import threading
+
+import cv2
+
+from engine import Engine, CAPTURE_POLL_TIMEOUT
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+EXTRA_CAM_THUMB_WIDTH = 320       # larghezza delle anteprime nella griglia delle camere extra
+
+
+# =============================================================================================
+# CANALE DI UNA CAMERA
+# =============================================================================================
+class CameraChannel(threading.Thread):
+    """Run a child Engine on one extra camera and publish a thumbnail of each frame.
+
+    Each channel processes its frames on its own thread, so the per-camera work (flip,
+    motion, faces, encoding) spreads over all cores while inference stays on the parent's
+    shared YoloWorker.
+    """
+
+    def __init__(self, index, name, parent, backend=cv2.CAP_MSMF):
+        super().__init__(name=f"channel-{index}", daemon=True)
+        self.index = index
+        self.cam_name = name
+        self.backend = backend
+        self.engine = Engine(None, index, name, parent=parent)
+        self.thumbnail = None         # ultima anteprima BGR, letta dal timer della UI
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """Open the camera, start the child engine and process frames until stopped."""
+        engine = self.engine
+        if not engine.open_camera(self.index, self.cam_name, self.backend):
+            self.error = "Impossibile aprire la webcam"
+            logger.error(f"Camera extra {self.cam_name}: apertura fallita")
+            engine.close()
+            return
+        engine.start()
+        engine.start_capture()
+
+        while not self._stop_event.is_set():
+            try:
+                frame = engine.step(CAPTURE_POLL_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Camera extra {self.cam_name}: errore di elaborazione: {e}")
+                continue
+            if frame is None:
+                continue
+            h, w = frame.shape[:2]
+            thumb_h = int(h * EXTRA_CAM_THUMB_WIDTH / w)
+            self.thumbnail = cv2.resize(frame, (EXTRA_CAM_THUMB_WIDTH, thumb_h), interpolation=cv2.INTER_AREA)
+
+        # la registrazione aperta viene finalizzata prima che il canale termini
+        engine.stop_recording()
+        engine.close()
+
+    def stop(self, wait=True, timeout=5.0):
+        """Stop processing, finalise any open recording and release the camera."""
+        self._stop_event.set()
+        if wait and self.is_alive():
+            self.join(timeout)
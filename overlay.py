@@ -0,0 +1,145 @@
+# =============================================================================================
+# OVERLAY - testi e box disegnati una volta in patch BGRA e riapplicati su ogni frame
+# =============================================================================================
+#   Ogni elemento (FPS, data, luogo, REC, box YOLO, oggetti noti, nomi) è una patch BGRA con la
+#   sua chiave di contenuto: viene ridisegnata con putText/rectangle solo quando la chiave
+#   cambia (al massimo una volta al secondo per data e timer), altrimenti sul frame si fa
+#   soltanto una copia mascherata della patch, vettoriale, limitata alla sua area.
+# =============================================================================================
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_FPS_REFRESH = 0.5         # secondi tra due aggiornamenti del testo FPS
+OVERLAY_ELEMENTS = ("fps", "date", "location", "rec", "yolo", "objects", "identities")
+OVERLAY_LABELS = {
+    "fps": "FPS",
+    "date": "Data e ora",
+    "location": "Luogo",
+    "rec": "Indicatore REC",
+    "yolo": "Box YOLO",
+    "objects": "Oggetti noti",
+    "identities": "Nomi delle persone",
+}
+
+
+@dataclass
+class OverlayItem:
+    """One cached overlay element: a BGRA patch and where it goes on the frame."""
+    key: object
+    x: int
+    y: int
+    patch: np.ndarray             # BGRA, alfa 0 o 255
+    mask: np.ndarray              # alfa > 0, forma (h, w, 1)
+
+
+# =============================================================================================
+# DISEGNO DELLE PATCH
+# =============================================================================================
+def _op_bounds(op):
+    """Bounding box (x0, y0, x1, y1) in frame coordinates of one drawing operation."""
+    kind = op[0]
+    if kind == "text":
+        _, text, (x, y), scale, _, thickness = op
+        (tw, th), baseline = cv2.getTextSize(text, OVERLAY_FONT, scale, thickness)
+        return x - thickness, y - th - thickness, x + tw + thickness, y + baseline + thickness
+    if kind == "rect":
+        _, (x1, y1), (x2, y2), _, thickness = op
+        t = max(thickness, 1)
+        return min(x1, x2) - t, min(y1, y2) - t, max(x1, x2) + t + 1, max(y1, y2) + t + 1
+    if kind == "circle":
+        _, (cx, cy), radius, _, thickness = op
+        r = radius + max(thickness, 1)
+        return cx - r, cy - r, cx + r + 1, cy + r + 1
+    raise ValueError(f"unknown overlay operation {kind!r}")
+
+
+def render_ops(ops):
+    """Rasterise ("text" | "rect" | "circle", ...) operations into one BGRA patch.
+
+    Returns (x, y, patch) with (x, y) the patch's top-left corner on the frame, or None
+    if there is nothing to draw.
+    """
+    if not ops:
+        return None
+    bounds = np.array([_op_bounds(op) for op in ops])
+    x0, y0 = bounds[:, :2].min(axis=0)
+    x1, y1 = bounds[:, 2:].max(axis=0)
+    patch = np.zeros((int(y1 - y0), int(x1 - x0), 4), np.uint8)
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, text, (x, y), scale, color, thickness = op
+            cv2.putText(patch, text, (x - x0, y - y0), OVERLAY_FONT, scale, (*color, 255), thickness)
+        elif kind == "rect":
+            _, (ax, ay), (bx, by), color, thickness = op
+            cv2.rectangle(patch, (ax - x0, ay - y0), (bx - x0, by - y0), (*color, 255), thickness)
+        else:
+            _, (cx, cy), radius, color, thickness = op
+            cv2.circle(patch, (cx - x0, cy - y0), radius, (*color, 255), thickness)
+    return int(x0), int(y0), patch
+
+
+def box_ops(boxes, color, thickness, label_scale=0.5, label_thickness=2):
+    """Drawing operations for labelled boxes given as (x1, y1, x2, y2, label)."""
+    ops = []
+    for x1, y1, x2, y2, label in boxes:
+        ops.append(("rect", (x1, y1), (x2, y2), color, thickness))
+        ops.append(("text", label, (x1, y1 - 10), label_scale, color, label_thickness))
+    return ops
+
+
+# =============================================================================================
+# OVERLAY
+# =============================================================================================
+class Overlay:
+    """Named overlay elements, re-rendered only when their content key changes."""
+
+    def __init__(self):
+        self._items = {}
+        self.renders = 0              # quante volte una patch è stata ridisegnata
+
+    def update(self, name, key, make_ops):
+        """Make sure element `name` shows content `key`; make_ops() is called only on change."""
+        item = self._items.get(name)
+        if item is not None and item.key == key:
+            return
+        rendered = render_ops(make_ops())
+        self.renders += 1
+        if rendered is None:
+            # contenuto vuoto: si ricorda la chiave per non ridisegnare a ogni frame
+            self._items[name] = OverlayItem(key, 0, 0, np.zeros((0, 0, 4), np.uint8), np.zeros((0, 0, 1), bool))
+            return
+        x, y, patch = rendered
+        self._items[name] = OverlayItem(key, x, y, patch, patch[..., 3:] > 0)
+
+    def remove(self, name):
+        """Drop an element."""
+        self._items.pop(name, None)
+
+    def clear(self):
+        """Drop every element."""
+        self._items.clear()
+
+    def composite(self, frame, names):
+        """Copy the selected elements onto a BGR frame in place."""
+        fh, fw = frame.shape[:2]
+        for name, item in self._items.items():
+            if name not in names or not item.patch.size:
+                continue
+            ph, pw = item.patch.shape[:2]
+            x0, y0 = max(item.x, 0), max(item.y, 0)
+            x1, y1 = min(item.x + pw, fw), min(item.y + ph, fh)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            px, py = x0 - item.x, y0 - item.y
+            np.copyto(
+                frame[y0:y1, x0:x1],
+                item.patch[py:py + y1 - y0, px:px + x1 - x0, :3],
+                where=item.mask[py:py + y1 - y0, px:px + x1 - x0],
+            )
@@ -0,0 +1,318 @@
+# =============================================================================================
+# RICONOSCIMENTO OGGETTI NOTI - indice unico dei descrittori ORB della libreria known_objects
+# =============================================================================================
+import os
+import glob
+import json
+import time
+import logging
+import threading
+
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from descriptor_store import DescriptorStore
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+KNOWN_OBJECTS_DIR = "known_objects"
+ORB_FEATURES = 500                # feature ORB estratte da ogni frame live
+MATCH_RATIO = 0.75                # ratio test di Lowe tra primo e secondo vicino
+MATCH_MAX_DISTANCE = 64           # distanza di Hamming massima (su 256 bit) di un match valido
+MIN_OBJECT_MATCHES = 25           # match minimi perché un oggetto sia considerato riconosciuto
+RECOGNITION_INTERVAL = 10         # frame tra due invii al worker di riconoscimento
+
+# indice LSH sui descrittori binari: tabelle salvate accanto allo store e mappate in sola lettura
+LSH_TABLES = 8
+LSH_MIN_KEY_BITS = 12             # la chiave cresce con log2(righe) così i bucket restano piccoli
+LSH_MAX_KEY_BITS = 20
+LSH_MAX_BUCKET = 64               # righe lette al massimo da un bucket (descrittori degeneri)
+LSH_SEED = 20240601               # bit campionati riproducibili tra un avvio e l'altro
+LSH_BUILD_CHUNK_ROWS = 65536      # righe per blocco durante la costruzione (2 MB di descrittori)
+LSH_META_FILE = "lsh.json"
+LSH_ORDER_FILE = "lsh_order.npy"
+LSH_STARTS_FILE = "lsh_starts.npy"
+
+# bit a 1 di ogni valore di un byte, per la distanza di Hamming vettoriale
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+
+
+@dataclass
+class RecognitionResult:
+    """Known objects found in one frame, tagged like YoloResult."""
+    frame_id: int
+    timestamp: float
+    objects: list = field(default_factory=list)   # dict con name, matches, x1, y1, x2, y2
+    match_time: float = 0.0
+
+
+# =============================================================================================
+# CARICAMENTO DELLA LIBRERIA
+# =============================================================================================
+def load_library(store_path=None, folder=KNOWN_OBJECTS_DIR):
+    """Open the memory-mapped descriptor store, importing the legacy .npz files once.
+
+    Returns (descriptors, owners, names, store_dir): all descriptors in one uint8 matrix
+    (a read-only view on the mapped file, not a heap copy), the object index of each row,
+    the names, and the folder where the index tables are kept.
+    """
+    store = DescriptorStore(store_path) if store_path else DescriptorStore()
+    # anche con lo store già popolato: i .npz aggiunti dopo vanno importati, gli altri sono saltati
+    if glob.glob(os.path.join(folder, "*.npz")):
+        imported = store.import_npz_folder(folder)
+        if imported:
+            logger.info(f"Descriptor store: importati {imported} oggetti da {folder}")
+    return store.descriptors, store.owners(), store.names, store.path
+
+
+# =============================================================================================
+# INDICE COMBINATO
+# =============================================================================================
+class DescriptorIndex:
+    """LSH index over the memory-mapped descriptor matrix, saved next to the store.
+
+    Each of LSH_TABLES tables hashes a descriptor on a fixed random subset of its 256
+    bits; a query probes its own bucket and the ones one bit away (multi-probe), then
+    checks only those candidates with an exact Hamming distance. With the key length
+    growing as log2(rows) the buckets stay small, so the cost per query does not depend
+    on how many objects the library holds. The tables (row order and bucket starts) are
+    written next to the store and mapped read-only like it: startup reads nothing, and
+    they are rebuilt only when the store has grown.
+    """
+
+    def __init__(self, descriptors, owners, names, cache_dir=None):
+        self.descriptors = descriptors
+        self.owners = owners
+        self.names = names
+        self.size = len(descriptors)
+        self.key_bits = int(np.clip(round(np.log2(max(self.size, 1))), LSH_MIN_KEY_BITS, LSH_MAX_KEY_BITS))
+        self.positions = None         # (tabelle, bit della chiave) posizioni dei bit campionati
+        self.order = None             # (tabelle, righe) righe ordinate per chiave
+        self.starts = None            # (tabelle, 2**bit + 1) inizio di ogni bucket in order
+        self.candidates = 0           # coppie (query, riga) confrontate nell'ultima ricerca
+        if self.size:
+            if cache_dir is None or not self._load(cache_dir):
+                self._build()
+                if cache_dir is not None:
+                    self._save(cache_dir)
+        # chiave esatta più le chiavi che differiscono di un solo bit
+        self.probe_masks = np.concatenate([[0], 1 << np.arange(self.key_bits)]).astype(np.int64)
+
+    # ============================================================================================
+    # COSTRUZIONE E SALVATAGGIO DELLE TABELLE
+    # ============================================================================================
+    def keys(self, descriptors):
+        """Return the (tables, rows) bucket keys of a block of descriptors."""
+        bits = np.unpackbits(np.asarray(descriptors, np.uint8), axis=1)
+        weights = 1 << np.arange(self.key_bits, dtype=np.int64)
+        return np.stack([bits[:, pos].astype(np.int64) @ weights for pos in self.positions])
+
+    def _build(self):
+        start = time.monotonic()
+        rng = np.random.default_rng(LSH_SEED)
+        self.positions = np.stack([rng.choice(256, self.key_bits, replace=False) for _ in range(LSH_TABLES)])
+        # chiavi calcolate a blocchi: il file mappato non viene mai espanso tutto in memoria
+        keys = np.concatenate([self.keys(self.descriptors[i:i + LSH_BUILD_CHUNK_ROWS])
+                               for i in range(0, self.size, LSH_BUILD_CHUNK_ROWS)], axis=1)
+        self.order = np.argsort(keys, axis=1, kind="stable").astype(np.int32)
+        sorted_keys = np.take_along_axis(keys, self.order, axis=1)
+        buckets = np.arange((1 << self.key_bits) + 1)
+        self.starts = np.stack([np.searchsorted(k, buckets) for k in sorted_keys]).astype(np.int32)
+        logger.info("Indice LSH COSTRUITO | righe=%d | bit=%d | durata=%.2fs",
+                    self.size, self.key_bits, time.monotonic() - start)
+
+    def _signature(self):
+        """What the saved tables must match: store length, parameters and end rows."""
+        return {
+            "rows": self.size,
+            "tables": LSH_TABLES,
+            "key_bits": self.key_bits,
+            "head": bytes(self.descriptors[0]).hex(),
+            "tail": bytes(self.descriptors[-1]).hex(),
+        }
+
+    def _load(self, cache_dir):
+        """Map the saved tables read-only; returns False if missing or built for another store."""
+        try:
+            with open(os.path.join(cache_dir, LSH_META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("signature") != self._signature():
+                return False
+            self.positions = np.asarray(meta["positions"], np.int64)
+            self.order = np.load(os.path.join(cache_dir, LSH_ORDER_FILE), mmap_mode="r")
+            self.starts = np.load(os.path.join(cache_dir, LSH_STARTS_FILE), mmap_mode="r")
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        return self.order.shape == (LSH_TABLES, self.size) and self.starts.shape[1] == (1 << self.key_bits) + 1
+
+    def _save(self, cache_dir):
+        """Write the tables atomically next to the store (metadata last: it validates the rest)."""
+        try:
+            for name, array in ((LSH_ORDER_FILE, self.order), (LSH_STARTS_FILE, self.starts)):
+                tmp = os.path.join(cache_dir, name + ".tmp")
+                with open(tmp, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp, os.path.join(cache_dir, name))
+            tmp = os.path.join(cache_dir, LSH_META_FILE + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"signature": self._signature(), "positions": self.positions.tolist()}, f)
+            os.replace(tmp, os.path.join(cache_dir, LSH_META_FILE))
+        except OSError as e:
+            logger.warning(f"Failed to save the LSH index: {e}")
+
+    # ============================================================================================
+    # RICERCA
+    # ============================================================================================
+    def nearest(self, descriptors):
+        """Return (distance, row) arrays of the first and second nearest rows among the candidates."""
+        q = len(descriptors)
+        best_d = np.full((q, 2), np.inf, np.float32)
+        best_i = np.full((q, 2), -1, np.int64)
+
+        # bucket sondati: (tabella, query, sonda)
+        probes = self.keys(descriptors)[:, :, None] ^ self.probe_masks
+        tables = np.broadcast_to(np.arange(LSH_TABLES)[:, None, None], probes.shape).ravel()
+        queries = np.broadcast_to(np.arange(q)[None, :, None], probes.shape).ravel()
+        probes = probes.ravel()
+        first = self.starts[tables, probes].astype(np.int64)
+        lengths = np.minimum(self.starts[tables, probes + 1] - first, LSH_MAX_BUCKET)
+        total = int(lengths.sum())
+        if not total:
+            return best_d, best_i
+
+        # tutte le righe dei bucket sondati, senza cicli Python
+        group = np.repeat(np.arange(len(lengths)), lengths)
+        within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = self.order[tables[group], first[group] + within].astype(np.int64)
+        pairs = np.unique(queries[group] * self.size + rows)   # una sola volta ogni coppia
+        queries, rows = np.divmod(pairs, self.size)
+        self.candidates = len(pairs)
+
+        # distanza di Hamming esatta dei soli candidati
+        dist = POPCOUNT[np.bitwise_xor(descriptors[queries], self.descriptors[rows])].sum(axis=1)
+        order = np.lexsort((dist, queries))
+        queries, rows, dist = queries[order], rows[order], dist[order]
+        head = np.flatnonzero(np.r_[True, queries[1:] != queries[:-1]])
+        best_d[queries[head], 0] = dist[head]
+        best_i[queries[head], 0] = rows[head]
+        second = head[head + 1 < len(queries)] + 1
+        second = second[queries[second] == queries[second - 1]]
+        best_d[queries[second], 1] = dist[second]
+        best_i[queries[second], 1] = rows[second]
+        return best_d, best_i
+
+    def match(self, descriptors):
+        """Return, for each live descriptor, the owning object index (-1 if no good match)."""
+        if descriptors is None:
+            return np.empty(0, np.int32)
+        result = np.full(len(descriptors), -1, np.int32)
+        if not self.size or len(descriptors) == 0:
+            return result
+        dist, rows = self.nearest(descriptors)
+        good = dist[:, 0] <= MATCH_MAX_DISTANCE
+        first = self.owners[np.maximum(rows[:, 0], 0)]
+        second = self.owners[np.maximum(rows[:, 1], 0)]
+        # secondo vicino quasi uguale: ambiguo, a meno che sia dello stesso oggetto
+        ambiguous = (rows[:, 1] >= 0) & (dist[:, 0] > MATCH_RATIO * dist[:, 1]) & (first != second)
+        keep = good & ~ambiguous
+        result[keep] = first[keep]
+        return result
+
+
+# =============================================================================================
+# WORKER DI RICONOSCIMENTO
+# =============================================================================================
+class RecognitionWorker(threading.Thread):
+    """Extract ORB features from the latest submitted frame and match them in background.
+
+    The index is built by `loader` on this thread; frames submitted before it is ready
+    wait (only the newest is kept), exactly like YoloWorker.
+    """
+
+    def __init__(self, loader=lambda: DescriptorIndex(*load_library())):
+        super().__init__(name="recognition", daemon=True)
+        self.loader = loader
+        self.index = None
+        self.ready = threading.Event()
+        self.load_time = 0.0
+        self.orb = cv2.ORB_create(ORB_FEATURES)
+        self._pending = None
+        self._result = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def submit(self, gray, frame_id, timestamp):
+        """Offer a grey frame for recognition; replaces any frame still waiting."""
+        with self._cond:
+            self._pending = (gray, frame_id, timestamp)
+            self._cond.notify()
+
+    def latest_result(self):
+        """Return the last published RecognitionResult without waiting."""
+        return self._result
+
+    def clear(self):
+        """Forget the pending frame and the last result."""
+        with self._cond:
+            self._pending = None
+        self._result = None
+
+    def run(self):
+        """Build the index, then match every frame taken from the pending slot."""
+        start = time.monotonic()
+        try:
+            self.index = self.loader()
+        except Exception as e:
+            logger.error(f"Known objects index loading failed: {e}")
+            return
+        self.load_time = time.monotonic() - start
+        self.ready.set()
+
+        while not self._stop_event.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    break
+                gray, frame_id, timestamp = self._pending
+                self._pending = None
+            try:
+                self._result = self.recognize(gray, frame_id, timestamp)
+            except Exception as e:
+                logger.error(f"Known objects recognition failed: {e}")
+
+    def recognize(self, gray, frame_id, timestamp):
+        """Match one frame against the library and locate every recognised object."""
+        start = time.monotonic()
+        keypoints, descriptors = self.orb.detectAndCompute(gray, None)
+        owners = self.index.match(descriptors)
+
+        objects = []
+        if len(owners):
+            votes = np.bincount(owners[owners >= 0], minlength=len(self.index.names))
+            points = np.float32([kp.pt for kp in keypoints])
+            for obj in np.flatnonzero(votes >= MIN_OBJECT_MATCHES):
+                matched = points[owners == obj]
+                # box attorno ai punti associati, senza i punti isolati lontani dalla mediana
+                center = np.median(matched, axis=0)
+                spread = np.median(np.abs(matched - center), axis=0) * 3 + 1
+                inliers = matched[np.all(np.abs(matched - center) <= spread, axis=1)]
+                x1, y1 = inliers.min(axis=0)
+                x2, y2 = inliers.max(axis=0)
+                objects.append({
+                    'name': self.index.names[obj], 'matches': int(votes[obj]),
+                    'x1': int(x1), 'y1': int(y1), 'x2': int(x2), 'y2': int(y2),
+                })
+        return RecognitionResult(frame_id, timestamp, objects, time.monotonic() - start)
+
+    def stop(self, timeout=2.0):
+        """Stop the worker."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,279 @@
+# =============================================================================================
+# RECORDER - scrittura video su thread dedicato con coda limitata e timestamp reali
+# =============================================================================================
+import os
+import time
+import queue
+import logging
+import threading
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+from detection_index import DetectionIndexWriter, index_path
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+RECORD_QUEUE_SIZE = 60            # frame in attesa di codifica prima di applicare backpressure
+RECORD_PUT_TIMEOUT = 0.005        # attesa massima (s) del loop UI quando la coda è piena
+RECORD_MIN_FPS = 5
+RECORD_MAX_FPS = 30
+RECORD_FOURCC = "mp4v"
+RECORD_SEGMENT_SECONDS = 300      # durata di un segmento: oltre si chiude il file e se ne apre un altro
+
+PREROLL_SECONDS = 5               # secondi trattenuti prima dell'inizio di una registrazione
+PREROLL_FPS = 10                  # frame al secondo conservati nel pre-roll
+PREROLL_JPEG_QUALITY = 80
+PREROLL_QUEUE_SIZE = 4            # frame in attesa di compressione
+
+_CLOSE = object()                 # sentinella di chiusura nella coda
+
+
+# =============================================================================================
+# THREAD DI SCRITTURA
+# =============================================================================================
+class RecordingWriter(threading.Thread):
+    """Encode frames to a constant-frame-rate video on a background thread.
+
+    Each frame carries its capture timestamp: the writer duplicates or skips frames so
+    that the position of every frame in the file matches the time it was captured.
+    With `index` set, the faces and YOLO detections passed with each frame are appended
+    to the recording's detection index on this same thread.
+
+    Every `segment_seconds` of output the file (and its index) is closed and the
+    recording continues in <name>_001.mp4, <name>_002.mp4, ...; each finished segment is
+    released immediately and can be copied or deleted while the recording goes on.
+    """
+
+    def __init__(self, path, frame_size, fps=RECORD_MAX_FPS, queue_size=RECORD_QUEUE_SIZE, preroll=None,
+                 index=True, segment_seconds=RECORD_SEGMENT_SECONDS):
+        super().__init__(name="recorder", daemon=True)
+        self.path = path
+        self.frame_size = frame_size
+        self.fps = int(min(max(round(fps), RECORD_MIN_FPS), RECORD_MAX_FPS))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.preroll = preroll or []  # (jpeg, timestamp) scritti in testa al file
+        self.on_closed = None
+        self.use_index = index
+        self.segment_frames = int(segment_seconds * self.fps) if segment_seconds else 0
+        self.segment = 0
+        self.segment_path = path       # file in scrittura in questo momento
+        self.segments = [path]         # tutti i file di questa registrazione, in ordine
+        self._segment_start = 0        # indice di uscita del primo frame del segmento corrente
+        self.writer = None
+        self.index = None
+        self._open_segment(path)
+
+        # ---- statistiche ----
+        self.frames_in = 0
+        self.frames_written = 0
+        self.frames_duplicated = 0
+        self.frames_decimated = 0
+        self.frames_dropped = 0      # scartati perché la coda era piena
+        self.max_queue_depth = 0
+        self.encode_time_total = 0.0
+        self.encode_time_max = 0.0
+
+        self.preroll_frames = len(self.preroll)
+
+        self._t0 = None
+        self._last_frame = None
+
+    def isOpened(self):
+        """Return True if the underlying cv2.VideoWriter could be created."""
+        return self.writer.isOpened()
+
+    def _open_segment(self, path):
+        """Open the video writer and the detection index of one segment."""
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*RECORD_FOURCC), self.fps, self.frame_size)
+        self.index = None
+        if self.use_index and self.writer.isOpened():
+            try:
+                self.index = DetectionIndexWriter(index_path(path), os.path.basename(path))
+            except OSError as e:
+                logger.warning(f"Detection index not created: {e}")
+
+    def _close_segment(self):
+        """Finalise the current segment's video and index."""
+        self.writer.release()
+        if self.index is not None:
+            self.index.close(self.fps)
+            self.index = None
+
+    def _rotate(self):
+        """Close the finished segment and continue the recording in the next file."""
+        self._close_segment()
+        logger.info(
+            "Segmento CHIUSO | file=%s | frame=%d",
+            os.path.basename(self.segment_path),
+            self.frames_written - self._segment_start
+        )
+        self.segment += 1
+        stem, ext = os.path.splitext(self.path)
+        self.segment_path = f"{stem}_{self.segment:03d}{ext}"
+        self.segments.append(self.segment_path)
+        self._segment_start = self.frames_written
+        self._open_segment(self.segment_path)
+        if not self.writer.isOpened():
+            # i frame successivi vanno persi, ma quelli già scritti restano validi
+            logger.error(f"Impossibile creare il segmento {self.segment_path}")
+
+    def write(self, frame, timestamp, faces=None, detections=None):
+        """Queue a frame (and its detections) for encoding; waits at most RECORD_PUT_TIMEOUT, then drops it."""
+        self.frames_in += 1
+        try:
+            self.queue.put((frame, timestamp, faces, detections), timeout=RECORD_PUT_TIMEOUT)
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+    def close(self, on_closed=None):
+        """Finish encoding the queued frames in background, then call on_closed(stats)."""
+        self.on_closed = on_closed
+        self.queue.put(_CLOSE)
+
+    def run(self):
+        """Drain the queue, keeping the output aligned with the capture timestamps."""
+        for jpeg, timestamp in self.preroll:
+            frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            if frame is not None and frame.shape[1::-1] == tuple(self.frame_size):
+                self._append(frame, timestamp)
+        self.preroll = []
+
+        while True:
+            item = self.queue.get()
+            if item is _CLOSE:
+                break
+            self._append(*item)
+
+        self._close_segment()
+        if self.on_closed is not None:
+            self.on_closed(self.stats())
+
+    def _append(self, frame, timestamp, faces=None, detections=None):
+        """Place a frame at the output position matching its capture timestamp."""
+        if self._t0 is None:
+            self._t0 = timestamp
+        target_index = int(round((timestamp - self._t0) * self.fps))
+
+        if target_index < self.frames_written:
+            # arrivano più frame di quanti ne servano al frame rate di uscita
+            self.frames_decimated += 1
+            return
+        while self._last_frame is not None and self.frames_written < target_index:
+            # buco nella cattura: ripete l'ultimo frame per mantenere la durata reale
+            self._encode(self._last_frame)
+            self.frames_duplicated += 1
+        self._encode(frame)
+        if self.index is not None:
+            # istante esatto del frame nel suo segmento, non quello di cattura
+            self.index.append((self.frames_written - 1 - self._segment_start) / self.fps, faces, detections)
+        self._last_frame = frame
+
+    def _encode(self, frame):
+        """Write one frame and account for the encode latency."""
+        if self.segment_frames and self.frames_written - self._segment_start >= self.segment_frames:
+            self._rotate()
+        start = time.monotonic()
+        self.writer.write(frame)
+        elapsed = time.monotonic() - start
+        self.encode_time_total += elapsed
+        self.encode_time_max = max(self.encode_time_max, elapsed)
+        self.frames_written += 1
+
+    def stats(self):
+        """Return a snapshot of the writer statistics."""
+        encoded = max(self.frames_written, 1)
+        return {
+            "fps": self.fps,
+            "segments": len(self.segments),
+            "preroll_frames": self.preroll_frames,
+            "frames_in": self.frames_in,
+            "frames_written": self.frames_written,
+            "frames_duplicated": self.frames_duplicated,
+            "frames_decimated": self.frames_decimated,
+            "frames_dropped": self.frames_dropped,
+            "max_queue_depth": self.max_queue_depth,
+            "encode_ms_avg": 1000.0 * self.encode_time_total / encoded,
+            "encode_ms_max": 1000.0 * self.encode_time_max,
+        }
+
+
+# =============================================================================================
+# PRE-ROLL COMPRESSO
+# =============================================================================================
+class PreRollBuffer(threading.Thread):
+    """Keep the last few seconds of video as JPEG so a new recording can start in the past.
+
+    Frames are sampled at PREROLL_FPS and compressed on this thread; only the encoded
+    bytes are retained, so several seconds of 1080p take a few MB instead of hundreds.
+    """
+
+    def __init__(self, seconds=PREROLL_SECONDS, fps=PREROLL_FPS, quality=PREROLL_JPEG_QUALITY):
+        super().__init__(name="preroll", daemon=True)
+        self.seconds = seconds
+        self.interval = 1.0 / fps
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.queue = queue.Queue(maxsize=PREROLL_QUEUE_SIZE)
+        self._frames = deque()         # (jpeg, timestamp), dal più vecchio al più recente
+        self._lock = threading.Lock()
+        self._last_sample = None
+        self._stop_event = threading.Event()
+
+    def push(self, frame, timestamp):
+        """Offer a frame; it is kept only if due for sampling and the encoder keeps up."""
+        if self.seconds <= 0:
+            return
+        if self._last_sample is not None and timestamp - self._last_sample < self.interval:
+            return
+        try:
+            self.queue.put_nowait((frame, timestamp))
+            self._last_sample = timestamp
+        except queue.Full:
+            pass
+
+    def drain(self):
+        """Return the buffered (jpeg, timestamp) pairs, oldest first, and empty the buffer."""
+        with self._lock:
+            frames = list(self._frames)
+            self._frames.clear()
+        return frames
+
+    def clear(self):
+        """Discard every buffered frame."""
+        with self._lock:
+            self._frames.clear()
+        self._last_sample = None
+
+    def memory_bytes(self):
+        """Return the bytes currently held by the compressed frames."""
+        with self._lock:
+            return sum(jpeg.nbytes for jpeg, _ in self._frames)
+
+    def run(self):
+        """Compress sampled frames and evict the ones older than the pre-roll window."""
+        while not self._stop_event.is_set():
+            try:
+                frame, timestamp = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            ok, jpeg = cv2.imencode(".jpg", frame, self.encode_params)
+            if not ok:
+                continue
+            with self._lock:
+                self._frames.append((np.asarray(jpeg), timestamp))
+                while self._frames and timestamp - self._frames[0][1] > self.seconds:
+                    self._frames.popleft()
+
+    def stop(self, timeout=1.0):
+        """Stop the compression thread."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,113 @@
+# =============================================================================================
+# SCHEDULER - frequenza di YOLO e Haar adattata al costo reale dei frame e al movimento
+# =============================================================================================
+#   Gli intervalli impostati (YOLO ogni N frame, Haar completo ogni M) sono il punto di
+#   partenza: se il costo medio di un frame supera il budget (1 / fps obiettivo) vengono
+#   allungati, se resta ben sotto tornano verso i valori impostati. YOLO inoltre non viene
+#   mai alimentato più in fretta di quanto riesca a rispondere. Con la scena ferma per
+#   qualche secondo l'inferenza si sospende del tutto; il primo frame con movimento la fa
+#   ripartire subito, con un rilevamento completo.
+# =============================================================================================
+import math
+import logging
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+SCHED_TARGET_FPS = 30.0
+SCHED_HIGH_LOAD = 0.85            # frazione del budget oltre cui i rilevamenti si diradano
+SCHED_LOW_LOAD = 0.5              # frazione del budget sotto cui tornano più frequenti
+SCHED_STEP = 1.25                 # moltiplicatore applicato a ogni correzione
+SCHED_MAX_FACTOR = 4.0            # allungamento massimo degli intervalli impostati
+SCHED_ADJUST_FRAMES = 15          # frame tra due correzioni, per non oscillare
+SCHED_COST_ALPHA = 0.1            # peso dell'ultimo campione nelle medie mobili dei costi
+SCHED_STATIC_PIXELS = 500         # pixel in movimento sotto cui la scena è considerata ferma
+SCHED_STATIC_SECONDS = 2.0        # secondi di scena ferma prima di sospendere l'inferenza
+
+
+class FrameScheduler:
+    """Decide, frame by frame, whether YOLO and full face detection run.
+
+    Feed it the cost of every processed frame (`observe_frame`), the inference time of
+    every YOLO result (`observe_yolo`) and, once per frame, the motion level (`update`).
+    With `enabled` False it reproduces the fixed intervals and never idles.
+    """
+
+    def __init__(self, target_fps=SCHED_TARGET_FPS):
+        self.enabled = True
+        self.budget = 1.0 / target_fps
+        self.factor = 1.0              # allungamento corrente degli intervalli impostati
+        self.frame_cost = 0.0          # media mobile del tempo di elaborazione di un frame (s)
+        self.yolo_cost = 0.0           # media mobile dell'inferenza YOLO (s)
+        self.idle = False              # scena ferma: nessuna inferenza
+        self.woke = False              # True solo sul frame in cui la scena torna a muoversi
+        self.frames_idle = 0
+        self._static_since = None
+        self._frames_to_adjust = SCHED_ADJUST_FRAMES
+        self._yolo_wait = 0            # frame dall'ultimo invio a YOLO
+
+    def update(self, motion_pixels, timestamp):
+        """Update the idle state from this frame's motion (None = unknown, never idle)."""
+        self.woke = False
+        if not self.enabled or motion_pixels is None or motion_pixels > SCHED_STATIC_PIXELS:
+            self._static_since = None
+            if self.idle:
+                self.idle = False
+                self.woke = True
+                self._yolo_wait = math.inf   # YOLO riparte già su questo frame
+                logger.info("Scheduler | movimento: inferenza RIPRESA dopo %d frame", self.frames_idle)
+                self.frames_idle = 0
+            return
+        if self._static_since is None:
+            self._static_since = timestamp
+        elif not self.idle and timestamp - self._static_since >= SCHED_STATIC_SECONDS:
+            self.idle = True
+            logger.info("Scheduler | scena ferma: inferenza SOSPESA")
+        if self.idle:
+            self.frames_idle += 1
+
+    def yolo_interval(self, base):
+        """Frames between two YOLO submissions, given the configured interval."""
+        if not self.enabled:
+            return base
+        interval = max(1, round(base * self.factor))
+        # non più di un frame per inferenza: quelli in eccesso verrebbero solo sostituiti
+        if self.yolo_cost > 0:
+            interval = max(interval, math.ceil(self.yolo_cost / self.budget))
+        return interval
+
+    def face_interval(self, base):
+        """Frames between two full face detections, given the configured interval."""
+        if not self.enabled:
+            return base
+        return max(1, round(base * self.factor))
+
+    def run_yolo(self, base):
+        """True if a frame should be sent to YOLO now."""
+        if self.idle:
+            return False
+        self._yolo_wait += 1
+        if self._yolo_wait >= self.yolo_interval(base):
+            self._yolo_wait = 0
+            return True
+        return False
+
+    def observe_frame(self, seconds):
+        """Record the processing cost of one frame and adjust the intervals if needed."""
+        self.frame_cost = seconds if not self.frame_cost else (
+            (1 - SCHED_COST_ALPHA) * self.frame_cost + SCHED_COST_ALPHA * seconds)
+        self._frames_to_adjust -= 1
+        if not self.enabled or self._frames_to_adjust > 0:
+            return
+        self._frames_to_adjust = SCHED_ADJUST_FRAMES
+        if self.frame_cost > self.budget * SCHED_HIGH_LOAD:
+            self.factor = min(self.factor * SCHED_STEP, SCHED_MAX_FACTOR)
+        elif self.frame_cost < self.budget * SCHED_LOW_LOAD:
+            self.factor = max(self.factor / SCHED_STEP, 1.0)
+
+    def observe_yolo(self, seconds):
+        """Record the inference time of one YOLO result."""
+        self.yolo_cost = seconds if not self.yolo_cost else (
+            (1 - SCHED_COST_ALPHA) * self.yolo_cost + SCHED_COST_ALPHA * seconds)
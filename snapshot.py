@@ -0,0 +1,157 @@
+# =============================================================================================
+# SNAPSHOT - codifica e scrittura delle immagini su thread dedicato, snapshot e burst
+# =============================================================================================
+#   Lo snapshot usa l'ultimo frame già elaborato (nessuna read() in più sulla camera) e
+#   viene solo accodato: PNG e scrittura su disco avvengono qui. Il burst riceve ogni
+#   frame direttamente dal thread di acquisizione, alla frequenza piena della camera,
+#   indipendentemente da quanti frame riesce a elaborare il loop principale.
+# =============================================================================================
+import os
+import queue
+import logging
+import datetime
+import threading
+
+import cv2
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+SNAPSHOT_QUEUE_SIZE = 8           # snapshot in attesa di scrittura
+BURST_SECONDS = 3                 # durata predefinita di un burst
+BURST_QUEUE_SIZE = 300            # frame del burst in attesa (10 s a 30 fps)
+BURST_JPEG_QUALITY = 95
+
+_STOP = object()                  # sentinella di chiusura nella coda
+
+
+def timestamped_name(prefix, ext):
+    """File name with date, time and milliseconds, so quick successive shots never collide."""
+    now = datetime.datetime.now()
+    return f"{prefix}_{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000:03d}{ext}"
+
+
+# =============================================================================================
+# THREAD DI SCRITTURA
+# =============================================================================================
+class ImageWriter(threading.Thread):
+    """Encode and write images queued by other threads; the caller never waits on disk."""
+
+    def __init__(self, queue_size=SNAPSHOT_QUEUE_SIZE, name="image-writer"):
+        super().__init__(name=name, daemon=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0              # immagini scartate perché la coda era piena
+        self.last_path = None
+        self.last_error = None
+
+    def submit(self, path, image, params=(), transform=None, on_saved=None, on_failed=None):
+        """Queue an image; returns False (and drops it) if the queue is full.
+
+        `transform(image)` (e.g. a flip) runs on the writer thread before encoding;
+        `on_saved(path)` or `on_failed(path)` is called there once the write is done.
+        """
+        try:
+            self.queue.put_nowait((path, image, params, transform, on_saved, on_failed))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            path, image, params, transform, on_saved, on_failed = item
+            # un'eccezione su un'immagine non deve mai fermare il thread: le successive resterebbero in coda
+            try:
+                if transform is not None:
+                    image = transform(image)
+                ok = cv2.imwrite(path, image, list(params))
+                reason = "" if ok else "scrittura non riuscita"
+            except Exception as e:
+                ok, reason = False, str(e)
+            if ok:
+                self.written += 1
+                self.last_path = path
+                self._notify(on_saved, path)
+            else:
+                self.failed += 1
+                self.last_error = f"Impossibile salvare {os.path.basename(path)}: {reason}"
+                logger.error(self.last_error)
+                self._notify(on_failed, path)
+
+    def _notify(self, callback, path):
+        """Call an on_saved/on_failed callback; its errors are logged, the image is already done."""
+        if callback is None:
+            return
+        try:
+            callback(path)
+        except Exception as e:
+            self.last_error = f"Errore dopo il salvataggio di {os.path.basename(path)}: {e}"
+            logger.error(self.last_error)
+
+    def stop(self, timeout=10.0):
+        """Write every queued image, then stop."""
+        self.queue.put(_STOP)
+        if self.is_alive():
+            self.join(timeout)
+
+
+# =============================================================================================
+# BURST
+# =============================================================================================
+class Burst:
+    """Save every captured frame for a fixed time into its own folder, as JPEG.
+
+    `push(frame, timestamp)` is called from the capture thread; it returns False once the
+    burst is over. The counters are this burst's own: `finished` tells when every frame
+    it queued has been written (or has failed).
+    """
+
+    def __init__(self, writer, folder, seconds, start_time, flip=True):
+        self.writer = writer
+        self.folder = folder
+        self.end_time = start_time + seconds
+        self.flip = flip
+        self.frames = 0               # frame ricevuti dalla capture
+        self.saved = 0
+        self.failed = 0
+        self.dropped = 0              # frame scartati perché la coda di scrittura era piena
+        self.closed = False
+        os.makedirs(folder, exist_ok=True)
+
+    def push(self, frame, timestamp):
+        if self.closed or timestamp > self.end_time:
+            self.closed = True
+            return False
+        self.frames += 1
+        path = os.path.join(self.folder, f"frame_{self.frames:05d}.jpg")
+        # la capture crea un array nuovo a ogni read(): basta il riferimento
+        queued = self.writer.submit(
+            path, frame, (cv2.IMWRITE_JPEG_QUALITY, BURST_JPEG_QUALITY),
+            transform=(lambda image: cv2.flip(image, 1)) if self.flip else None,
+            on_saved=self._saved, on_failed=self._failed
+        )
+        if not queued:
+            self.dropped += 1
+        return True
+
+    def close(self):
+        """Accept no more frames (the queued ones are still written)."""
+        self.closed = True
+
+    def _saved(self, path):
+        self.saved += 1
+
+    def _failed(self, path):
+        self.failed += 1
+
+    @property
+    def finished(self):
+        """True once the burst is closed and all its queued frames are on disk (or failed)."""
+        return self.closed and self.saved + self.failed + self.dropped >= self.frames
@@ -0,0 +1,133 @@
+# =============================================================================================
+# STORAGE - quota disco e conservazione delle registrazioni, applicate in background
+# =============================================================================================
+#   Ogni STORAGE_CHECK_INTERVAL secondi la cartella di salvataggio viene scandita: i
+#   segmenti più vecchi della conservazione massima vengono eliminati, poi, finché lo
+#   spazio occupato supera la quota, si eliminano i segmenti dal più vecchio. Con ogni
+#   segmento spariscono anche i suoi file accessori (indice dei rilevamenti, analisi).
+#   I file ancora in scrittura, o modificati da poco, non vengono mai toccati.
+#   Quota e conservazione sono spente (0) finché l'utente non le imposta: nessun file
+#   esistente viene eliminato senza una scelta esplicita.
+# =============================================================================================
+import os
+import glob
+import time
+import logging
+import threading
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+STORAGE_PATTERN = "record_*.mp4"
+STORAGE_SIDECARS = (".idx", ".analysis.json")    # file accessori di un segmento
+STORAGE_QUOTA_GB = 0.0            # spazio massimo delle registrazioni (0 = nessuna quota)
+STORAGE_RETENTION_DAYS = 0.0      # età massima di un segmento (0 = nessun limite)
+STORAGE_CHECK_INTERVAL = 60.0     # secondi tra due controlli
+STORAGE_MIN_AGE = 60.0            # secondi dall'ultima modifica: più recenti = ancora in scrittura
+
+
+def segment_files(video_path):
+    """Return the video and the existing sidecar files of one segment."""
+    stem = os.path.splitext(video_path)[0]
+    return [video_path] + [stem + s for s in STORAGE_SIDECARS if os.path.exists(stem + s)]
+
+
+def evict(folder, quota_bytes=0, retention_seconds=0, in_use=(), now=None):
+    """Delete expired segments, then the oldest ones until folder fits in quota_bytes.
+
+    Returns (deleted_segments, freed_bytes, used_bytes).
+    """
+    now = time.time() if now is None else now
+    in_use = {os.path.abspath(p) for p in in_use}
+    segments = []                 # (mtime, byte, video, file del segmento)
+    used = 0
+    for video in glob.glob(os.path.join(folder, STORAGE_PATTERN)):
+        try:
+            files = segment_files(video)
+            size = sum(os.path.getsize(f) for f in files)
+            mtime = os.path.getmtime(video)
+        except OSError:
+            continue              # eliminato nel frattempo
+        used += size
+        if os.path.abspath(video) in in_use or now - mtime < STORAGE_MIN_AGE:
+            continue
+        segments.append((mtime, size, video, files))
+    segments.sort()
+
+    deleted, freed = 0, 0
+    for mtime, size, video, files in segments:
+        expired = retention_seconds and now - mtime > retention_seconds
+        over_quota = quota_bytes and used > quota_bytes
+        if not expired and not over_quota:
+            # in ordine di età: se questo non va eliminato, nemmeno i successivi
+            break
+        try:
+            for f in files:
+                os.remove(f)
+        except OSError as e:
+            logger.warning(f"Storage: cannot delete {video}: {e}")
+            continue
+        deleted += 1
+        freed += size
+        used -= size
+        logger.info("Segmento ELIMINATO | file=%s | motivo=%s | MB=%.1f",
+                    os.path.basename(video), "conservazione" if expired else "quota", size / 2**20)
+    return deleted, freed, used
+
+
+class StorageEvictor(threading.Thread):
+    """Periodically apply the disk quota and the retention age to the recordings folder.
+
+    `folder` and `in_use` are callables, read at every check: the save path can change
+    at runtime and the segments being written must never be deleted.
+    """
+
+    def __init__(self, folder, in_use=lambda: (), quota_gb=STORAGE_QUOTA_GB,
+                 retention_days=STORAGE_RETENTION_DAYS, interval=STORAGE_CHECK_INTERVAL):
+        super().__init__(name="storage", daemon=True)
+        self.folder = folder
+        self.in_use = in_use
+        self.quota_gb = quota_gb
+        self.retention_days = retention_days
+        self.interval = interval
+        self.used_bytes = 0
+        self.deleted = 0
+        self._warned = False          # avviso già dato prima della prima eliminazione
+        self._stop_event = threading.Event()
+
+    @property
+    def enabled(self):
+        return bool(self.quota_gb or self.retention_days)
+
+    def check(self):
+        """Run one eviction pass now; nothing is scanned while both limits are off."""
+        if not self.enabled:
+            return
+        if not self._warned:
+            self._warned = True
+            logger.warning(
+                f"Storage: recordings in {self.folder()} older than {self.retention_days or '-'} days"
+                f" or beyond {self.quota_gb or '-'} GB will be deleted, with their index and analysis files"
+            )
+        deleted, _, used = evict(
+            self.folder(),
+            quota_bytes=int(self.quota_gb * 2**30),
+            retention_seconds=self.retention_days * 86400,
+            in_use=self.in_use(),
+        )
+        self.used_bytes = used
+        self.deleted += deleted
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"Storage check failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        """Stop checking (a pass in progress completes on its own)."""
+        self._stop_event.set()
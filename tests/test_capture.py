@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+
+from capture import FrameRing, CaptureThread
+
+
+def test_ring_hands_out_newest_frame_and_counts_skipped():
+    ring = FrameRing(capacity=4)
+    for i in range(3):
+        ring.put(np.full(1, i), timestamp=float(i))
+    frame = ring.get_latest()
+    assert frame.frame_id == 2 and frame.timestamp == 2.0
+    assert ring.dropped == 2
+    assert ring.get_latest() is None      # niente di nuovo
+    ring.put(np.full(1, 3))
+    assert ring.get_latest().frame_id == 3 and ring.dropped == 2
+
+
+def test_ring_reset_forgets_buffered_frames():
+    ring = FrameRing(capacity=2)
+    ring.put(np.zeros(1))
+    ring.reset()
+    assert ring.get_latest() is None
+    assert ring.peek_latest() is None
+
+
+class HungCap:
+    """A capture whose read() blocks until `unblock` is set."""
+
+    def __init__(self):
+        self.unblock = threading.Event()
+        self.reading = threading.Event()
+        self.released = False
+
+    def read(self):
+        self.reading.set()
+        self.unblock.wait()
+        assert not self.released, "read() on a released camera"
+        return True, np.zeros((2, 2, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def test_stop_never_releases_a_camera_under_a_hung_read():
+    cap = HungCap()
+    thread = CaptureThread(cap, FrameRing())
+    thread.start()
+    cap.reading.wait(1)
+    assert thread.stop(timeout=0.05, release=True) is False
+    assert not cap.released
+    cap.unblock.set()
+    thread.join(1)
+    assert not thread.is_alive() and cap.released
+
+
+def test_stop_releases_when_the_thread_exits():
+    cap = HungCap()
+    cap.unblock.set()
+    thread = CaptureThread(cap, FrameRing())
+    thread.start()
+    assert thread.stop(release=True) is True
+    assert cap.released
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from descriptor_store import DescriptorStore, OBJECT_DTYPE
+
+
+def random_descriptors(n, seed):
+    return np.random.default_rng(seed).integers(0, 256, (n, 32), dtype=np.uint8)
+
+
+def test_append_and_views(tmp_path):
+    store = DescriptorStore(str(tmp_path))
+    a, b = random_descriptors(5, 1), random_descriptors(3, 2)
+    assert store.append("chiave", a, "20240101_120000") == 0
+    assert store.append("tazza", b, "20240101_120100", "tazza_ref.png") == 1
+    assert len(store) == 2 and store.descriptor_count() == 8
+    assert store.names == ["chiave", "tazza"]
+    assert store.owners().tolist() == [0] * 5 + [1] * 3
+    assert (store.object_descriptors(0) == a).all()
+    assert (store.object_descriptors(1) == b).all()
+    assert isinstance(store.descriptors, np.memmap)
+
+
+def test_reopen_maps_the_same_library(tmp_path):
+    store = DescriptorStore(str(tmp_path))
+    a = random_descriptors(4, 3)
+    store.append("chiave", a, "20240101_120000", "chiave_ref.png")
+    reopened = DescriptorStore(str(tmp_path))
+    assert reopened.names == ["chiave"]
+    assert str(reopened.objects[0]["ref_filename"]) == "chiave_ref.png"
+    assert (reopened.object_descriptors(0) == a).all()
+
+
+def test_rejects_malformed_descriptors(tmp_path):
+    store = DescriptorStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.append("vuoto", np.empty((0, 32), np.uint8))
+    with pytest.raises(ValueError):
+        store.append("sift", np.zeros((4, 128), np.uint8))
+    assert len(store) == 0 and not os.path.exists(store.objects_path)
+
+
+def test_interrupted_append_is_discarded(tmp_path):
+    store = DescriptorStore(str(tmp_path))
+    store.append("chiave", random_descriptors(4, 4), "20240101_120000")
+    # crash simulato: descrittori orfani e mezza riga in objects.bin
+    with open(store.descriptors_path, "ab") as f:
+        f.write(random_descriptors(6, 5).tobytes())
+    with open(store.objects_path, "ab") as f:
+        f.write(b"\0" * (OBJECT_DTYPE.itemsize // 2))
+    store = DescriptorStore(str(tmp_path))
+    assert len(store) == 1 and store.descriptor_count() == 4
+
+    b = random_descriptors(2, 6)
+    store.append("tazza", b, "20240101_120100")
+    assert os.path.getsize(store.descriptors_path) == 6 * 32
+    assert os.path.getsize(store.objects_path) == 2 * OBJECT_DTYPE.itemsize
+    assert (DescriptorStore(str(tmp_path)).object_descriptors(1) == b).all()
+
+
+def test_import_npz_folder_skips_known_objects(tmp_path):
+    folder = tmp_path / "known_objects"
+    folder.mkdir()
+    np.savez(folder / "chiave_20240101_120000.npz", des=random_descriptors(3, 7),
+             name="chiave", timestamp="20240101_120000", ref_filename="chiave_ref.png")
+    np.savez(folder / "tazza_20240101_120100.npz", des=random_descriptors(2, 8), name="tazza")
+    (folder / "rotto.npz").write_bytes(b"non un npz")
+
+    store = DescriptorStore(str(folder / "store"))
+    assert store.import_npz_folder(str(folder)) == 2
+    assert store.names == ["chiave", "tazza"]
+    # un secondo import non duplica nulla
+    assert store.import_npz_folder(str(folder)) == 0
+    assert len(DescriptorStore(str(folder / "store"))) == 2
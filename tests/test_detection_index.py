@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from detection_index import (DetectionIndexWriter, load_index, intervals, query, KIND_FACE,
+                             INDEX_HEADER, INDEX_DTYPE)
+
+
+def person(conf):
+    return {"cls": 0, "name": "person", "conf": conf, "x1": 1, "y1": 2, "x2": 30, "y2": 40}
+
+
+def write_index(path, frames, fps=10):
+    writer = DetectionIndexWriter(str(path), path.with_suffix(".mp4").name)
+    for t, faces, detections in frames:
+        writer.append(t, faces, detections)
+    writer.close(fps)
+    return writer
+
+
+def test_rows_and_trailer_round_trip(tmp_path):
+    path = tmp_path / "record_a.idx"
+    write_index(path, [(0.0, [(5, 5, 10, 10)], [person(0.9)]), (0.1, None, None)])
+    info, rows = load_index(str(path))
+    assert info["classes"] == {0: "person"} and info["fps"] == 10 and info["rows"] == 4
+    assert len(rows) == 4
+    face = rows[rows["kind"] == KIND_FACE][0]
+    assert (face["x2"], face["y2"]) == (15, 15)
+
+
+def test_unclosed_index_reads_complete_rows(tmp_path):
+    path = tmp_path / "record_a.idx"
+    write_index(path, [(0.0, None, [person(0.8)])])
+    # crash durante la registrazione: niente trailer, ultima riga a metà
+    with open(path, "r+b") as f:
+        f.truncate(INDEX_HEADER.size + 2 * INDEX_DTYPE.itemsize)
+        f.seek(0, 2)
+        f.write(b"\x01\x02\x03")
+    info, rows = load_index(str(path))
+    assert info["classes"] == {} and len(rows) == 2
+
+
+def test_intervals_split_on_gaps():
+    assert intervals(np.array([0.0, 0.5, 1.0, 5.0, 5.2]), gap=1.0) == [(0.0, 1.0), (5.0, 5.2)]
+    assert intervals(np.array([])) == []
+
+
+def test_query_returns_intervals_per_video_with_min_conf(tmp_path):
+    frames = [(t / 10, None, [person(0.9 if t < 5 else 0.3)]) for t in range(10)]
+    frames += [(3.0 + t / 10, None, [person(0.7)]) for t in range(3)]
+    write_index(tmp_path / "record_a.idx", frames)
+    write_index(tmp_path / "record_b.idx", [(0.0, [(0, 0, 5, 5)], None)])
+
+    found = query(str(tmp_path), "person", min_conf=0.5)
+    assert [(v, round(s, 1), round(e, 1)) for v, s, e, _ in found] == [
+        ("record_a.mp4", 0.0, 0.4), ("record_a.mp4", 3.0, 3.2)]
+    assert found[0][3] == pytest.approx(0.9, abs=1e-3)
+    assert [v for v, *_ in query(str(tmp_path), "face")] == ["record_b.mp4"]
+    assert query(str(tmp_path), "dog") == []
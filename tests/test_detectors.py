@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import detectors
+from detectors import DetectorBackend, create_backend, decode_yolov8, letterbox
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        DetectorBackend()
+
+
+def test_letterbox_keeps_aspect_and_centres():
+    frame = np.full((480, 640, 3), 255, np.uint8)
+    image, scale, pad_x, pad_y = letterbox(frame, 320)
+    assert image.shape == (320, 320, 3)
+    assert scale == 0.5 and pad_x == 0 and pad_y == 40
+    assert (image[pad_y:pad_y + 240] == 255).all()
+    assert (image[:pad_y] == detectors.LETTERBOX_COLOR).all()
+
+
+def test_decode_applies_confidence_and_nms():
+    # 3 ancore, 2 classi: due box quasi uguali della classe 0, uno sotto soglia
+    output = np.array([
+        [50, 51, 200],
+        [50, 50, 200],
+        [20, 20, 10],
+        [20, 20, 10],
+        [0.9, 0.8, 0.1],
+        [0.0, 0.1, 0.2],
+    ], np.float32)
+    boxes = decode_yolov8(output, conf=0.45, iou=0.45)
+    assert boxes.shape == (1, 6)
+    assert boxes[0].tolist() == pytest.approx([40, 40, 60, 60, 0.9, 0])
+
+
+class Broken(DetectorBackend):
+    def __init__(self, path, **kwargs):
+        raise RuntimeError("model file corrupted")
+
+    def infer(self, images):
+        return []
+
+
+class Working(DetectorBackend):
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+
+    def infer(self, images):
+        return [np.empty((0, 6), np.float32) for _ in images]
+
+
+def test_auto_falls_back_past_a_broken_backend(monkeypatch, tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"")
+    monkeypatch.setattr(detectors, "BACKENDS", {"broken": (Broken, str(model)), "working": (Working, str(model))})
+    monkeypatch.setattr(detectors, "BACKEND_PREFERENCE", ("broken", "working"))
+    backend = create_backend("auto", input_size=64)
+    assert isinstance(backend, Working) and backend.name == "working"
+
+
+def test_auto_reports_every_failure(monkeypatch, tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"")
+    monkeypatch.setattr(detectors, "BACKENDS", {"broken": (Broken, str(model))})
+    monkeypatch.setattr(detectors, "BACKEND_PREFERENCE", ("broken",))
+    with pytest.raises(RuntimeError, match="model file corrupted"):
+        create_backend("auto")
@@ -0,0 +1,46 @@
+import json
+
+import geolocation
+from geolocation import load_cached_location, resolve_location, save_cached_location, DEFAULT_LOCATION
+
+
+def write_cache(path, location, age):
+    path.write_text(json.dumps({"location": location, "timestamp": geolocation.time.time() - age}))
+
+
+def test_cache_freshness_follows_ttl(tmp_path):
+    path = tmp_path / "location.json"
+    write_cache(path, "Bologna, IT", age=10)
+    assert load_cached_location(str(path), ttl=60) == ("Bologna, IT", True)
+    write_cache(path, "Bologna, IT", age=120)
+    assert load_cached_location(str(path), ttl=60) == ("Bologna, IT", False)
+
+
+def test_missing_or_corrupt_cache(tmp_path):
+    path = tmp_path / "location.json"
+    assert load_cached_location(str(path)) == (None, False)
+    path.write_text("{")
+    assert load_cached_location(str(path)) == (None, False)
+
+
+def test_fresh_cache_skips_the_network(tmp_path, monkeypatch):
+    path = tmp_path / "location.json"
+    save_cached_location("Bologna, IT", str(path))
+    monkeypatch.setattr(geolocation, "fetch_location", lambda: (_ for _ in ()).throw(AssertionError("network")))
+    assert resolve_location(str(path)) == "Bologna, IT"
+
+
+def test_stale_cache_is_refreshed_and_saved(tmp_path, monkeypatch):
+    path = tmp_path / "location.json"
+    write_cache(path, "Bologna, IT", age=10_000)
+    monkeypatch.setattr(geolocation, "fetch_location", lambda: "Milano, IT")
+    assert resolve_location(str(path), ttl=60) == "Milano, IT"
+    assert load_cached_location(str(path), ttl=60) == ("Milano, IT", True)
+
+
+def test_lookup_failure_falls_back_to_stale_then_default(tmp_path, monkeypatch):
+    path = tmp_path / "location.json"
+    monkeypatch.setattr(geolocation, "fetch_location", lambda: None)
+    assert resolve_location(str(path)) == DEFAULT_LOCATION
+    write_cache(path, "Bologna, IT", age=10_000)
+    assert resolve_location(str(path), ttl=60) == "Bologna, IT"
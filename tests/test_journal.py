@@ -0,0 +1,62 @@
+import json
+
+from journal import EventJournal
+
+
+def journal(tmp_path):
+    return EventJournal(str(tmp_path / "events.jsonl"), str(tmp_path / "stats.json"))
+
+
+def test_events_update_stats_and_survive_a_restart(tmp_path):
+    j = journal(tmp_path)
+    j.start()
+    j.record("snapshot", file="a.png")
+    j.record("recording_start", file="r.mp4")
+    j.record("detection", cls="person")
+    j.record("detection", cls="person")
+    j.stop()
+    assert j.stats["photos"] == 1 and j.stats["videos"] == 1
+
+    reopened = journal(tmp_path)
+    assert reopened.stats["photos"] == 1 and reopened.stats["videos"] == 1
+    assert reopened.stats["detections"] == {"person": 2}
+
+
+def test_replays_only_events_after_the_checkpoint(tmp_path):
+    j = journal(tmp_path)
+    j.start()
+    j.record("snapshot", file="a.png")
+    j.stop()                          # checkpoint con l'offset a fine file
+    # eventi scritti dopo il checkpoint (crash prima del successivo)
+    with open(tmp_path / "events.jsonl", "ab") as f:
+        f.write(json.dumps({"t": 1.0, "event": "snapshot", "file": "b.png"}).encode() + b"\n")
+    assert journal(tmp_path).stats["photos"] == 2
+
+
+def test_crash_torn_last_line_is_truncated(tmp_path):
+    path = tmp_path / "events.jsonl"
+    good = json.dumps({"t": 1.0, "event": "snapshot", "file": "a.png"}).encode() + b"\n"
+    path.write_bytes(good + b'{"t": 2.0, "event": "snap')
+    j = journal(tmp_path)
+    assert j.stats["photos"] == 1
+    assert path.read_bytes() == good  # il prossimo evento non finisce attaccato alla riga rotta
+
+    j.start()
+    j.record("snapshot", file="c.png")
+    j.stop()
+    assert journal(tmp_path).stats["photos"] == 2
+
+
+def test_unreadable_complete_line_is_skipped(tmp_path):
+    path = tmp_path / "events.jsonl"
+    event = json.dumps({"t": 1.0, "event": "snapshot", "file": "a.png"}).encode() + b"\n"
+    path.write_bytes(event + b"not json\n" + event)
+    assert journal(tmp_path).stats["photos"] == 2
+
+
+def test_offset_past_the_end_after_rotation(tmp_path):
+    (tmp_path / "stats.json").write_text(json.dumps({"photos": 5, "journal_offset": 10_000}))
+    (tmp_path / "events.jsonl").write_bytes(
+        json.dumps({"t": 1.0, "event": "snapshot", "file": "a.png"}).encode() + b"\n")
+    # il checkpoint copre già tutto: nessun evento rigiocato due volte
+    assert journal(tmp_path).stats["photos"] == 5
@@ -0,0 +1,65 @@
+import numpy as np
+
+from recognition import DescriptorIndex, LSH_ORDER_FILE
+
+
+def library(tmp_path, rows, seed=0):
+    """A memory-mapped random library of `rows` descriptors, 100 per object."""
+    descriptors = np.random.default_rng(seed).integers(0, 256, (rows, 32), dtype=np.uint8)
+    path = tmp_path / f"descriptors_{rows}.npy"
+    np.save(path, descriptors)
+    owners = (np.arange(rows) // 100).astype(np.int32)
+    return np.load(path, mmap_mode="r"), owners, [str(i) for i in range(owners[-1] + 1)]
+
+
+def noisy(descriptors, rate, seed=1):
+    """Flip each bit with probability `rate`."""
+    bits = np.unpackbits(descriptors, axis=1)
+    flips = np.random.default_rng(seed).random(bits.shape) < rate
+    return np.packbits(bits ^ flips, axis=1)
+
+
+def test_matches_perturbed_library_rows(tmp_path):
+    descriptors, owners, names = library(tmp_path, 5000)
+    index = DescriptorIndex(descriptors, owners, names)
+    rows = np.arange(0, 5000, 25)
+    found = index.match(noisy(descriptors[rows], 0.08))
+    assert (found == owners[rows]).mean() > 0.95
+
+
+def test_unrelated_descriptors_do_not_match(tmp_path):
+    descriptors, owners, names = library(tmp_path, 5000)
+    index = DescriptorIndex(descriptors, owners, names)
+    live = np.random.default_rng(7).integers(0, 256, (200, 32), dtype=np.uint8)
+    assert (index.match(live) == -1).all()
+
+
+def test_candidates_per_query_stay_flat_as_library_grows(tmp_path):
+    checked = []
+    for rows in (4000, 64000):
+        descriptors, owners, names = library(tmp_path, rows)
+        index = DescriptorIndex(descriptors, owners, names)
+        index.match(noisy(descriptors[:300], 0.08))
+        checked.append(index.candidates)
+    # 16 volte più righe, ma i candidati confrontati restano dello stesso ordine
+    assert checked[1] < 2 * checked[0]
+
+
+def test_saved_tables_are_mapped_and_rebuilt_when_the_store_grows(tmp_path):
+    descriptors, owners, names = library(tmp_path, 3000)
+    first = DescriptorIndex(descriptors, owners, names, cache_dir=tmp_path)
+    assert (tmp_path / LSH_ORDER_FILE).exists()
+    reopened = DescriptorIndex(descriptors, owners, names, cache_dir=tmp_path)
+    assert isinstance(reopened.order, np.memmap)
+    live = noisy(descriptors[::50], 0.05)
+    assert (reopened.match(live) == first.match(live)).all()
+
+    grown, grown_owners, grown_names = library(tmp_path, 4000)
+    rebuilt = DescriptorIndex(grown, grown_owners, grown_names, cache_dir=tmp_path)
+    assert rebuilt.order.shape[1] == 4000
+
+
+def test_empty_library_matches_nothing():
+    index = DescriptorIndex(np.empty((0, 32), np.uint8), np.empty(0, np.int32), [])
+    assert (index.match(np.zeros((3, 32), np.uint8)) == -1).all()
+    assert index.match(None).size == 0
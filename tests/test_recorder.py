@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from recorder import RecordingWriter
+from detection_index import load_index
+
+SIZE = (64, 48)
+
+
+def frame(value=0):
+    return np.full((SIZE[1], SIZE[0], 3), value, np.uint8)
+
+
+def record(path, timestamps, **kwargs):
+    writer = RecordingWriter(str(path), SIZE, fps=10, **kwargs)
+    assert writer.isOpened()
+    writer.start()
+    for t in timestamps:
+        writer.write(frame(), t)
+    writer.close()
+    writer.join(10)
+    return writer
+
+
+def test_frames_are_placed_at_their_capture_time(tmp_path):
+    # 10 fps in uscita: un buco di 0.4 s diventa 3 frame ripetuti, un frame troppo vicino viene scartato
+    writer = record(tmp_path / "record_a.mp4", [100.0, 100.1, 100.5, 100.52])
+    assert writer.frames_written == 6
+    assert writer.frames_duplicated == 3
+    assert writer.frames_decimated == 1
+
+
+def test_index_times_follow_the_output_position(tmp_path):
+    record(tmp_path / "record_a.mp4", [0.0, 0.3])
+    _, rows = load_index(str(tmp_path / "record_a.idx"))
+    # i frame ripetuti nel buco non hanno righe: il secondo frame è al quarto posto
+    assert rows["t"].tolist() == pytest.approx([0.0, 0.3])
+
+
+def test_segments_roll_over_with_their_own_index(tmp_path):
+    # segmenti da 0.5 s a 10 fps: 5 frame ciascuno
+    writer = record(tmp_path / "record_a.mp4", [i / 10 for i in range(12)], segment_seconds=0.5)
+    names = [os.path.basename(p) for p in writer.segments]
+    assert names == ["record_a.mp4", "record_a_001.mp4", "record_a_002.mp4"]
+    assert writer.stats()["segments"] == 3
+    rows_per_segment = []
+    for path in writer.segments:
+        assert os.path.getsize(path) > 0
+        info, rows = load_index(os.path.splitext(path)[0] + ".idx")
+        assert info["video"] == os.path.basename(path)
+        rows_per_segment.append(len(rows))
+        # i tempi ripartono da zero in ogni segmento
+        assert rows["t"][0] == 0.0
+    assert rows_per_segment == [5, 5, 2]
+
+
+def test_no_segments_when_disabled(tmp_path):
+    writer = record(tmp_path / "record_a.mp4", [i / 10 for i in range(12)], segment_seconds=0)
+    assert writer.segments == [str(tmp_path / "record_a.mp4")]
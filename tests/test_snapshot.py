@@ -0,0 +1,49 @@
+import numpy as np
+
+from snapshot import ImageWriter, Burst
+
+
+def image():
+    return np.zeros((16, 16, 3), np.uint8)
+
+
+def test_writer_survives_failing_items(tmp_path):
+    writer = ImageWriter()
+    writer.start()
+    failed, saved = [], []
+
+    def broken(_):
+        raise ValueError("boom")
+
+    def bad_callback(_):
+        raise RuntimeError("callback")
+
+    writer.submit(str(tmp_path / "a.png"), image(), transform=broken, on_failed=failed.append)
+    writer.submit(str(tmp_path / "missing" / "b.png"), image(), on_failed=failed.append)
+    writer.submit(str(tmp_path / "c.png"), image(), on_saved=bad_callback)
+    writer.submit(str(tmp_path / "d.png"), image(), on_saved=saved.append)
+    writer.stop()
+
+    assert writer.failed == 2 and failed == [str(tmp_path / "a.png"), str(tmp_path / "missing" / "b.png")]
+    assert writer.written == 2 and saved == [str(tmp_path / "d.png")]
+    assert (tmp_path / "d.png").exists()
+    assert writer.last_error
+
+
+def test_full_queue_drops_and_reports(tmp_path):
+    writer = ImageWriter(queue_size=1)   # non avviato: la coda non si svuota
+    assert writer.submit(str(tmp_path / "a.png"), image())
+    assert not writer.submit(str(tmp_path / "b.png"), image())
+    assert writer.dropped == 1
+
+
+def test_burst_counts_its_own_frames(tmp_path):
+    writer = ImageWriter()
+    writer.start()
+    burst = Burst(writer, str(tmp_path / "burst"), seconds=1.0, start_time=100.0)
+    for t in (100.0, 100.5, 101.0):
+        assert burst.push(image(), t)
+    assert not burst.push(image(), 101.5)   # tempo scaduto: il burst si chiude
+    assert not burst.push(image(), 100.2)   # e non accetta più frame
+    writer.stop()
+    assert burst.frames == 3 and burst.saved == 3 and burst.failed == 0 and burst.finished
@@ -0,0 +1,60 @@
+import os
+
+from storage import evict, StorageEvictor
+
+NOW = 1_000_000.0
+DAY = 86400
+
+
+def segment(folder, name, size, age, sidecar=True):
+    """Create a segment of `size` bytes last modified `age` seconds before NOW."""
+    video = folder / name
+    video.write_bytes(b"\0" * size)
+    files = [video]
+    if sidecar:
+        index = video.with_suffix(".idx")
+        index.write_bytes(b"\0" * 10)
+        files.append(index)
+    for f in files:
+        os.utime(f, (NOW - age, NOW - age))
+    return video
+
+
+def test_disabled_limits_delete_nothing(tmp_path):
+    segment(tmp_path, "record_a.mp4", 1000, 30 * DAY)
+    assert evict(str(tmp_path), now=NOW)[0] == 0
+    assert (tmp_path / "record_a.mp4").exists()
+
+
+def test_retention_deletes_expired_segments_with_sidecars(tmp_path):
+    old = segment(tmp_path, "record_old.mp4", 100, 10 * DAY)
+    new = segment(tmp_path, "record_new.mp4", 100, 1 * DAY)
+    deleted, freed, used = evict(str(tmp_path), retention_seconds=7 * DAY, now=NOW)
+    assert deleted == 1 and freed == 110 and used == 110
+    assert not old.exists() and not old.with_suffix(".idx").exists()
+    assert new.exists()
+
+
+def test_quota_deletes_oldest_first_until_it_fits(tmp_path):
+    first = segment(tmp_path, "record_1.mp4", 1000, 3 * DAY, sidecar=False)
+    second = segment(tmp_path, "record_2.mp4", 1000, 2 * DAY, sidecar=False)
+    third = segment(tmp_path, "record_3.mp4", 1000, 1 * DAY, sidecar=False)
+    deleted, _, used = evict(str(tmp_path), quota_bytes=2000, now=NOW)
+    assert deleted == 1 and used == 2000
+    assert not first.exists() and second.exists() and third.exists()
+
+
+def test_segments_in_use_or_still_written_are_kept(tmp_path):
+    busy = segment(tmp_path, "record_busy.mp4", 1000, 5 * DAY, sidecar=False)
+    fresh = segment(tmp_path, "record_fresh.mp4", 1000, 10, sidecar=False)
+    deleted, _, used = evict(str(tmp_path), quota_bytes=1, retention_seconds=DAY, in_use=[str(busy)], now=NOW)
+    assert deleted == 0 and used == 2000
+    assert busy.exists() and fresh.exists()
+
+
+def test_evictor_does_not_scan_while_disabled(tmp_path):
+    segment(tmp_path, "record_a.mp4", 1000, 30 * DAY)
+    evictor = StorageEvictor(lambda: str(tmp_path))
+    assert not evictor.enabled
+    evictor.check()
+    assert evictor.deleted == 0 and (tmp_path / "record_a.mp4").exists()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from detectors import DetectorBackend
+from yolo_worker import YoloWorker, roi_crops
+
+
+class WhiteSquare(DetectorBackend):
+    """Finto modello: rileva il rettangolo bianco in ogni immagine in letterbox."""
+    name = "white"
+    dynamic = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sides = []
+
+    def infer(self, images):
+        self.sides.append([image.shape[0] for image in images])
+        outputs = []
+        for image in images:
+            ys, xs = np.nonzero((image > 200).all(axis=2))
+            if not len(xs):
+                outputs.append(np.empty((0, 6), np.float32))
+                continue
+            outputs.append(np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 0]], np.float32))
+        return outputs
+
+
+def frame_with_square(x1, y1, x2, y2, shape=(480, 640)):
+    frame = np.zeros((*shape, 3), np.uint8)
+    frame[y1:y2, x1:x2] = 255
+    return frame
+
+
+def test_roi_crops_pads_and_clips_to_the_frame():
+    crops = roi_crops([(10, 10, 40, 40)], (480, 640), padding=0.25, min_padding=24)
+    assert crops == [(0, 0, 74, 74)]
+    crops = roi_crops([(600, 440, 40, 40)], (480, 640), padding=0.25, min_padding=24)
+    assert crops == [(576, 416, 640, 480)]
+
+
+def test_roi_crops_merges_overlapping_regions_only():
+    regions = [(100, 100, 40, 40), (150, 100, 40, 40), (500, 350, 40, 40)]
+    crops = roi_crops(regions, (480, 640), padding=0.0, min_padding=10)
+    assert sorted(crops) == [(90, 90, 200, 150), (490, 340, 550, 400)]
+    # catena: A tocca B solo dopo che B è stato unito a C
+    regions = [(0, 0, 10, 10), (100, 0, 10, 10), (12, 0, 80, 10)]
+    assert roi_crops(regions, (480, 640), padding=0.0, min_padding=5) == [(0, 0, 115, 15)]
+
+
+def test_full_frame_boxes_map_back_to_frame_coordinates():
+    worker = YoloWorker(WhiteSquare(input_size=320))
+    result = worker.detect(frame_with_square(200, 120, 360, 280), 7, 1.5)
+    assert (result.frame_id, result.timestamp, result.crops) == (7, 1.5, [])
+    box = result.detections[0]
+    assert (box["x1"], box["y1"], box["x2"], box["y2"]) == pytest.approx((200, 120, 360, 280), abs=2)
+
+
+def test_crop_boxes_map_back_to_frame_coordinates():
+    model = WhiteSquare(input_size=640)
+    worker = YoloWorker(model)
+    result = worker.detect(frame_with_square(400, 300, 440, 340), 1, 0.0, regions=[(400, 300, 40, 40)])
+    # un solo ritaglio piccolo: ingresso ridotto, non il frame intero
+    assert len(result.crops) == 1 and model.sides[-1][0] < 640
+    assert worker.frames_roi == 1 and worker.roi_cost < 1.0
+    box = result.detections[0]
+    assert (box["x1"], box["y1"], box["x2"], box["y2"]) == pytest.approx((400, 300, 440, 340), abs=2)
+
+
+def test_objects_outside_the_regions_are_not_reported():
+    worker = YoloWorker(WhiteSquare(input_size=640))
+    result = worker.detect(frame_with_square(400, 300, 440, 340), 1, 0.0, regions=[(20, 20, 40, 40)])
+    assert result.crops and result.detections == []
+
+
+def test_too_many_regions_fall_back_to_the_full_frame():
+    worker = YoloWorker(WhiteSquare(input_size=640))
+    regions = [(x, 200, 10, 10) for x in (0, 120, 240, 360, 480)]
+    result = worker.detect(frame_with_square(400, 300, 440, 340), 1, 0.0, regions=regions)
+    assert result.crops == [] and len(result.detections) == 1
@@ -0,0 +1,161 @@
+# =============================================================================================
+# RILEVAMENTO WEBCAM - scansione parallela, cache su disco e hot-plug in background
+# =============================================================================================
+import json
+import time
+import logging
+import threading
+
+import cv2
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+WEBCAM_CACHE_FILE = "webcams.json"
+WEBCAM_MAX_INDEX = 10             # indici provati: 0..WEBCAM_MAX_INDEX-1
+WEBCAM_PROBE_TIMEOUT = 3.0        # secondi concessi a ogni device per aprirsi e dare un frame
+WEBCAM_RESCAN_SECONDS = 5.0       # intervallo tra due scansioni hot-plug dopo un cambiamento
+WEBCAM_RESCAN_MAX_SECONDS = 60.0  # senza cambiamenti l'intervallo raddoppia fino a questo valore
+
+_probe_threads = {}               # indice -> ultimo thread di probe (vivo = driver ancora bloccato)
+_probe_lock = threading.Lock()
+
+
+# =============================================================================================
+# SCANSIONE PARALLELA
+# =============================================================================================
+def probe_webcam(index, backend=cv2.CAP_MSMF):
+    """Return True if the device at index opens and delivers a frame."""
+    try:
+        cap = cv2.VideoCapture(index, backend)
+        try:
+            if not cap.isOpened():
+                return False
+            # Verify it's actually a working camera
+            ret, _ = cap.read()
+            return bool(ret)
+        finally:
+            cap.release()
+    except Exception as e:
+        logger.debug(f"Error scanning camera {index}: {e}")
+        return False
+
+
+def scan_webcams(indices=None, timeout=WEBCAM_PROBE_TIMEOUT, backend=cv2.CAP_MSMF):
+    """Probe all indices concurrently and return (indices, names) of the working webcams.
+
+    Each device gets its own daemon thread; a device that has not answered within
+    `timeout` is reported as absent and its thread is left to die with the driver call.
+    While that thread is still alive the device is not probed again, so a hung driver
+    costs one thread, never one per scan.
+    """
+    if indices is None:
+        indices = range(WEBCAM_MAX_INDEX)
+    results = {}
+
+    def probe(i):
+        results[i] = probe_webcam(i, backend)
+
+    threads = []
+    with _probe_lock:
+        for i in indices:
+            previous = _probe_threads.get(i)
+            if previous is not None and previous.is_alive():
+                logger.debug(f"Webcam {i}: previous probe still blocked, skipped")
+                continue
+            t = threading.Thread(target=probe, args=(i,), name=f"probe-{i}", daemon=True)
+            _probe_threads[i] = t
+            threads.append(t)
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+    found = sorted(i for i, ok in results.items() if ok)
+    return found, [f"Webcam {i}" for i in found]
+
+
+def blocked_probes():
+    """Return the indices whose last probe has not returned yet."""
+    with _probe_lock:
+        return {i for i, t in _probe_threads.items() if t.is_alive()}
+
+
+# =============================================================================================
+# CACHE SU DISCO
+# =============================================================================================
+def load_cached_webcams(path=WEBCAM_CACHE_FILE):
+    """Return the (indices, names) saved by the last scan, or ([], []) if unavailable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return list(data["indices"]), list(data["names"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return [], []
+
+
+def save_cached_webcams(indices, names, path=WEBCAM_CACHE_FILE):
+    """Persist the last known good device list."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"indices": indices, "names": names, "timestamp": time.time()}, f, indent=4)
+    except OSError as e:
+        logger.warning(f"Failed to save webcam cache: {e}")
+
+
+# =============================================================================================
+# HOT-PLUG
+# =============================================================================================
+class WebcamWatcher(threading.Thread):
+    """Rescan the webcams periodically and publish the list when it changes.
+
+    `in_use` returns the indices currently opened by the application: they are not
+    probed again (opening a busy device can fail or disturb the stream) and are
+    considered present. The interval doubles after every scan that finds no change, up
+    to WEBCAM_RESCAN_MAX_SECONDS, and drops back to `interval` as soon as one does.
+    """
+
+    def __init__(self, in_use=lambda: set(), interval=WEBCAM_RESCAN_SECONDS, backend=cv2.CAP_MSMF):
+        super().__init__(name="webcam-watcher", daemon=True)
+        self.in_use = in_use
+        self.interval = interval
+        self.backend = backend
+        self.indices = None
+        self.names = None
+        self.version = 0              # incrementato a ogni cambiamento della lista
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def latest(self):
+        """Return (version, indices, names) of the last published list."""
+        with self._lock:
+            return self.version, self.indices, self.names
+
+    def run(self):
+        """Scan immediately, then with a growing interval while nothing changes."""
+        wait = self.interval
+        while not self._stop_event.is_set():
+            busy = set(self.in_use())
+            free = [i for i in range(WEBCAM_MAX_INDEX) if i not in busy]
+            found, _ = scan_webcams(free, backend=self.backend)
+            # un device col probe ancora bloccato mantiene lo stato della scansione precedente
+            stuck = {i for i in blocked_probes() if i in (self.indices or ())}
+            indices = sorted(set(found) | busy | stuck)
+            names = [f"Webcam {i}" for i in indices]
+            with self._lock:
+                changed = indices != self.indices
+                if changed:
+                    if self.indices is not None:
+                        logger.info(f"Webcam collegate cambiate: {self.indices} -> {indices}")
+                    self.indices, self.names = indices, names
+                    self.version += 1
+                    save_cached_webcams(indices, names)
+            wait = self.interval if changed else min(wait * 2, WEBCAM_RESCAN_MAX_SECONDS)
+            self._stop_event.wait(wait)
+
+    def stop(self):
+        """Stop rescanning (a scan in progress is abandoned)."""
+        self._stop_event.set()
@@ -0,0 +1,240 @@
+# =============================================================================================
+# YOLO WORKER - inferenza in background con risultati etichettati per frame
+# =============================================================================================
+#   Il modello è un backend di detectors.py (PyTorch, ONNX Runtime, OpenVINO, OpenCV DNN):
+#   qui ogni frame viene portato in letterbox al lato d'ingresso del backend, senza
+#   deformarlo, e i box restituiti vengono riportati alle coordinate del frame originale.
+#   Con le regioni di movimento il modello vede solo ritagli (con margine) delle zone
+#   attive, ciascuno su un ingresso proporzionato alla sua dimensione: il costo segue la
+#   parte di scena che cambia. Se i ritagli costerebbero quanto il frame intero, si usa quello.
+# =============================================================================================
+import time
+import logging
+import threading
+
+from dataclasses import dataclass, field
+
+from detectors import letterbox
+
+logger = logging.getLogger("FaceApp")
+
+# =============================================================================================
+# CONSTANTS
+# =============================================================================================
+YOLO_MAX_BATCH = 8                # frame (uno per camera) processati in una sola chiamata al modello
+MAIN_SOURCE = "main"              # sorgente della camera principale
+YOLO_ROI_PADDING = 0.25           # margine attorno a una regione di movimento, in frazione del suo lato
+YOLO_ROI_MIN_PADDING = 24         # margine minimo in pixel del frame
+YOLO_ROI_MIN_SIDE = 160           # lato minimo dell'ingresso di un ritaglio
+YOLO_ROI_MAX_REGIONS = 4          # oltre, un solo passaggio sul frame intero
+YOLO_ROI_MAX_COST = 0.7           # ritagli usati solo se costano meno di questa frazione del frame intero
+
+
+@dataclass
+class YoloResult:
+    """Detections for one frame, tagged with the id and capture time of that frame."""
+    frame_id: int
+    timestamp: float
+    source: object = MAIN_SOURCE
+    detections: list = field(default_factory=list)   # dict con x1, y1, x2, y2, cls, name, conf, label
+    inference_time: float = 0.0
+    crops: list = field(default_factory=list)        # (x1, y1, x2, y2) analizzati, vuoto = frame intero
+
+
+def roi_crops(regions, frame_shape, padding=YOLO_ROI_PADDING, min_padding=YOLO_ROI_MIN_PADDING):
+    """Pad motion regions (x, y, w, h) and merge the overlapping ones into (x1, y1, x2, y2) crops."""
+    h, w = frame_shape[:2]
+    rects = []
+    for x, y, rw, rh in regions:
+        pad = max(int(max(rw, rh) * padding), min_padding)
+        rects.append((max(x - pad, 0), max(y - pad, 0), min(x + rw + pad, w), min(y + rh + pad, h)))
+    # unione ripetuta finché nessuna coppia si sovrappone più
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+# =============================================================================================
+# THREAD DI INFERENZA
+# =============================================================================================
+class YoloWorker(threading.Thread):
+    """Run YOLO on the most recently submitted frame of each source whenever the model is free.
+
+    `model` is a detectors.DetectorBackend (see detectors.create_backend). A frame may
+    come with its motion regions: only padded crops of them are then analysed, batched
+    together, and objects outside them are not reported for that frame.
+
+    Every camera submits under its own `source` key; the frames waiting when the model
+    becomes free are batched into a single call, so one model instance serves all cameras.
+    If `loader` is given the model is loaded on the worker thread itself, so the caller
+    never waits for it; frames submitted meanwhile are simply held until it is ready.
+    """
+
+    def __init__(self, model=None, max_batch=YOLO_MAX_BATCH, loader=None):
+        super().__init__(name="yolo", daemon=True)
+        self.model = model
+        self.loader = loader
+        self.ready = threading.Event()
+        self.load_error = None
+        self.load_time = 0.0
+        self.max_batch = max_batch
+        self.frames_submitted = 0
+        self.frames_skipped = 0       # frame sostituiti da uno più recente prima dell'inferenza
+        self.frames_processed = 0
+        self.frames_roi = 0           # frame analizzati solo nelle regioni di movimento
+        self.roi_cost = 1.0           # costo dell'ultima inferenza rispetto al frame intero
+        self.batches_processed = 0
+        self._pending = {}            # source -> (frame, frame_id, timestamp)
+        self._results = {}            # source -> YoloResult
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def submit(self, frame, frame_id, timestamp, source=MAIN_SOURCE, regions=None):
+        """Offer a frame for inference; replaces any frame of the same source still waiting.
+
+        `regions` are the (x, y, w, h) motion regions of the frame; None or empty means
+        the whole frame.
+        """
+        with self._cond:
+            if source in self._pending:
+                self.frames_skipped += 1
+            self._pending[source] = (frame, frame_id, timestamp, regions)
+            self.frames_submitted += 1
+            self._cond.notify()
+
+    def latest_result(self, source=MAIN_SOURCE):
+        """Return the last published YoloResult for a source without waiting for inference."""
+        return self._results.get(source)
+
+    def clear(self, source=MAIN_SOURCE):
+        """Forget the pending frame and the last result of a source (e.g. YOLO switched off)."""
+        with self._cond:
+            self._pending.pop(source, None)
+        self._results.pop(source, None)
+
+    def run(self):
+        """Wait for frames and publish one YoloResult per frame, batching across sources."""
+        if self.model is None and self.loader is not None:
+            start = time.monotonic()
+            try:
+                self.model = self.loader()
+            except Exception as e:
+                self.load_error = str(e)
+                logger.error(f"YOLO model loading failed: {e}")
+                return
+            self.load_time = time.monotonic() - start
+        self.ready.set()
+
+        while not self._stop_event.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    break
+                sources = list(self._pending)[:self.max_batch]
+                batch = [(source, *self._pending.pop(source)) for source in sources]
+            try:
+                for result in self.detect_batch(batch):
+                    self._results[result.source] = result
+                self.frames_processed += len(batch)
+                self.batches_processed += 1
+            except Exception as e:
+                logger.error(f"YOLO inference failed: {e}")
+
+    def detect(self, frame, frame_id, timestamp, source=MAIN_SOURCE, regions=None):
+        """Run the model on one frame and map the boxes back to its resolution."""
+        return self.detect_batch([(source, frame, frame_id, timestamp, regions)])[0]
+
+    def plan_crops(self, frame, regions):
+        """Return (crops, input side) for the motion regions, or None to analyse the whole frame."""
+        if not regions:
+            return None
+        crops = roi_crops(regions, frame.shape)
+        if len(crops) > YOLO_ROI_MAX_REGIONS:
+            return None
+        size = self.model.input_size
+        if self.model.dynamic:
+            # stessa risoluzione del frame intero, arrotondata ai multipli di 32 richiesti da YOLO
+            scale = size / float(max(frame.shape[:2]))
+            longest = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in crops) * scale
+            side = min(max(-(-int(longest) // 32) * 32, YOLO_ROI_MIN_SIDE), size)
+        else:
+            side = size               # modello esportato a dimensione fissa
+        cost = len(crops) * side * side / float(size * size)
+        if cost >= YOLO_ROI_MAX_COST:
+            return None
+        return crops, side
+
+    def detect_batch(self, batch):
+        """Run the model on (source, frame, frame_id, timestamp, regions) items.
+
+        Every full frame and every crop becomes one letterboxed image; images of the same
+        side share a single call to the model.
+        """
+        start = time.monotonic()
+        size = self.model.input_size
+        jobs = []                     # (elemento, immagine, scala, pad_x, pad_y, off_x, off_y)
+        crops_of = []
+        cost = 0.0
+        for n, (_, frame, _, _, regions) in enumerate(batch):
+            plan = self.plan_crops(frame, regions)
+            if plan is None:
+                jobs.append((n, *letterbox(frame, size), 0, 0))
+                crops_of.append([])
+                cost += 1.0
+                continue
+            crops, side = plan
+            for x1, y1, x2, y2 in crops:
+                jobs.append((n, *letterbox(frame[y1:y2, x1:x2], side), x1, y1))
+            crops_of.append(crops)
+            cost += len(crops) * side * side / float(size * size)
+            self.frames_roi += 1
+
+        outputs = [None] * len(jobs)
+        by_side = {}
+        for j, job in enumerate(jobs):
+            by_side.setdefault(job[1].shape[0], []).append(j)
+        for indices in by_side.values():
+            for j, boxes in zip(indices, self.model.infer([jobs[j][1] for j in indices])):
+                outputs[j] = boxes
+        elapsed = time.monotonic() - start
+        self.roi_cost = cost / len(batch)
+        names = self.model.names
+
+        detections = [[] for _ in batch]
+        for (n, _, scale, pad_x, pad_y, off_x, off_y), boxes in zip(jobs, outputs):
+            # dal letterbox al frame originale: si toglie il bordo, si annulla la scala e si sposta il ritaglio
+            h_orig, w_orig = batch[n][1].shape[:2]
+            for x1, y1, x2, y2, conf, cls in boxes:
+                cls, conf = int(cls), float(conf)
+                name = names.get(cls, str(cls))
+                detections[n].append({
+                    'x1': int(min(max((x1 - pad_x) / scale + off_x, 0), w_orig - 1)),
+                    'y1': int(min(max((y1 - pad_y) / scale + off_y, 0), h_orig - 1)),
+                    'x2': int(min(max((x2 - pad_x) / scale + off_x, 0), w_orig - 1)),
+                    'y2': int(min(max((y2 - pad_y) / scale + off_y, 0), h_orig - 1)),
+                    'cls': cls, 'name': name, 'conf': conf,
+                    'label': f"{name} {conf:.2f}"
+                })
+        return [
+            YoloResult(frame_id, timestamp, source, found, elapsed, crops)
+            for (source, _, frame_id, timestamp, _), found, crops in zip(batch, detections, crops_of)
+        ]
+
+    def stop(self, timeout=2.0):
+        """Stop the worker; an inference already running is allowed to finish."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout)